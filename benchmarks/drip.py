@@ -0,0 +1,58 @@
+"""Memory and scheduling cost of drip subscriptions.
+
+Subscribes synthetic chats without touching the network or the journal file
+and reports bytes per subscriber (``tracemalloc``) and the time to schedule
+and pop every subscription.
+
+Usage: python -m benchmarks.drip [--subscribers 100000] [--sections 20]
+"""
+
+import argparse
+import gc
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from bot import DripScheduler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=100_000)
+    parser.add_argument("--sections", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scheduler = DripScheduler(None, None, None, None, Path(tmp) / "drip.jsonl")
+        now = int(time.time())
+        gc.collect()
+        tracemalloc.start()
+        started = time.perf_counter()
+        for chat_id in range(args.subscribers):
+            section_id = f"s{chat_id % args.sections}"
+            key = scheduler._key(chat_id, section_id)
+            due = now + chat_id % 86_400
+            scheduler._schedule(scheduler._allocate(key, chat_id, section_id, 0, due), due)
+        scheduled = time.perf_counter() - started
+        gc.collect()
+        allocated = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        popped = 0
+        while True:
+            batch = scheduler._pop_due(now + 86_400)
+            if not batch:
+                break
+            popped += len(batch)
+        drained = time.perf_counter() - started
+
+    print(f"{args.subscribers} subscribers in {args.sections} sections")
+    print(f"memory    {allocated / 1024 / 1024:8.1f} MiB  {allocated / args.subscribers:6.1f} bytes/subscriber")
+    print(f"schedule  {scheduled / args.subscribers * 1e6:8.2f} µs/subscriber")
+    print(f"pop       {drained / max(popped, 1) * 1e6:8.2f} µs/delivery ({popped} popped)")
+
+
+if __name__ == "__main__":
+    main()
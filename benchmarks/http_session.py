@@ -0,0 +1,105 @@
+"""Control-call latency while large uploads are in flight.
+
+Starts a local mock of the Bot API where ``sendVideo`` is slow and
+``answerCallbackQuery`` is instant, then measures callback answers under
+concurrent uploads with the stock ``AiohttpSession`` and ``PooledSession``.
+
+Usage: python -m benchmarks.http_session [--uploads 40] [--answers 200]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import BufferedInputFile
+from aiohttp import web
+
+from bot import PooledSession
+
+TOKEN = "42:benchmark"
+UPLOAD_DELAY = 0.5
+VIDEO = b"\0" * (512 * 1024)
+
+_MESSAGE = {
+    "message_id": 1,
+    "date": 0,
+    "chat": {"id": 1, "type": "private"},
+}
+
+
+async def handle(request: web.Request) -> web.Response:
+    method = request.match_info["method"]
+    await request.read()
+    if method == "sendVideo":
+        await asyncio.sleep(UPLOAD_DELAY)
+        return web.json_response({"ok": True, "result": _MESSAGE})
+    return web.json_response({"ok": True, "result": True})
+
+
+async def measure(session: AiohttpSession, base: str, uploads: int, answers: int) -> list[float]:
+    session.api = TelegramAPIServer.from_base(base)
+    bot = Bot(token=TOKEN, session=session)
+
+    async def upload() -> None:
+        await bot.send_video(1, BufferedInputFile(VIDEO, filename="video.mp4"))
+
+    async def answer() -> float:
+        started = time.perf_counter()
+        await bot.answer_callback_query("1")
+        return time.perf_counter() - started
+
+    upload_tasks = [asyncio.create_task(upload()) for _ in range(uploads)]
+    await asyncio.sleep(0.05)
+    latencies = await asyncio.gather(*(answer() for _ in range(answers)))
+    await asyncio.gather(*upload_tasks)
+    await session.close()
+    return latencies
+
+
+def report(name: str, latencies: list[float]) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"{name:<16} avg {statistics.mean(ordered) * 1000:8.1f} ms"
+        f"  p95 {p95 * 1000:8.1f} ms  max {ordered[-1] * 1000:8.1f} ms"
+    )
+
+
+async def run(uploads: int, answers: int) -> None:
+    app = web.Application(client_max_size=len(VIDEO) * 2)
+    app.router.add_post("/bot{token}/{method}", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+    try:
+        print(f"{uploads} concurrent uploads, {answers} callback answers")
+        report("AiohttpSession", await measure(AiohttpSession(), base, uploads, answers))
+        pooled = PooledSession()
+        report("PooledSession", await measure(pooled, base, uploads, answers))
+        for pool, stats in pooled.stats.items():
+            print(
+                f"  {pool:<8} requests {stats.requests:5d}  peak {stats.peak_in_flight:3d}"
+                f"  connections {stats.connections_created:3d} new"
+                f" / {stats.connections_reused:5d} reused"
+            )
+    finally:
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=40)
+    parser.add_argument("--answers", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.uploads, args.answers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Memory per menu mode: the original dataclass model against the compact one.
+
+Builds the same synthetic catalogue twice from parsed JSON and reports the
+bytes allocated per mode with ``tracemalloc``.
+
+Usage: python -m benchmarks.menu_memory [--sections 5000] [--modes 20]
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, List
+
+from bot import MenuMode, MenuSection
+
+# Typical mode names repeat across zones.
+MODE_NAMES = ["Щадящий режим", "Базовый режим", "Интенсивный режим", "Растяжка", "Разминка"]
+
+
+@dataclass(frozen=True)
+class LegacyMode:
+    id: str
+    name: str
+
+
+@dataclass(frozen=True)
+class LegacySection:
+    id: str
+    name: str
+    modes: List[LegacyMode]
+
+
+def build_legacy(raw: list) -> list:
+    return [
+        LegacySection(
+            id=entry["id"],
+            name=entry["name"],
+            modes=[LegacyMode(id=mode["id"], name=mode["name"]) for mode in entry["modes"]],
+        )
+        for entry in raw
+    ]
+
+
+def build_compact(raw: list) -> list:
+    return [
+        MenuSection(
+            id=entry["id"],
+            name=entry["name"],
+            modes=[MenuMode(id=mode["id"], name=mode["name"]) for mode in entry["modes"]],
+        )
+        for entry in raw
+    ]
+
+
+def catalogue_json(sections: int, modes: int) -> str:
+    return json.dumps(
+        [
+            {
+                "id": f"s{s:06x}",
+                "name": f"Зона {s}",
+                "modes": [
+                    {"id": f"m{s:05x}{m:03x}", "name": MODE_NAMES[m % len(MODE_NAMES)]}
+                    for m in range(modes)
+                ],
+            }
+            for s in range(sections)
+        ],
+        ensure_ascii=False,
+    )
+
+
+def measure(build: Callable[[list], list], payload: str) -> int:
+    # Parsing is measured too: json.loads creates a new string per name, just
+    # like loading menu.json, and whatever the model keeps of it stays alive.
+    gc.collect()
+    tracemalloc.start()
+    raw = json.loads(payload)
+    model = build(raw)
+    del raw
+    gc.collect()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del model
+    return allocated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sections", type=int, default=5000)
+    parser.add_argument("--modes", type=int, default=20)
+    args = parser.parse_args()
+
+    payload = catalogue_json(args.sections, args.modes)
+    total = args.sections * args.modes
+    print(f"{total} modes in {args.sections} sections")
+    for name, build in (("dataclass + list", build_legacy), ("tuples + intern", build_compact)):
+        allocated = measure(build, payload)
+        print(f"{name:<24} {allocated / 1024 / 1024:8.1f} MiB  {allocated / total:6.1f} bytes/mode")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""Mock Telegram Bot API server for load and fault-injection tests.
+
+Emulates the methods the bot relies on: ``getMe``, ``getUpdates`` (long
+polling), ``sendMessage``, ``editMessageText``, ``answerCallbackQuery``,
+``sendVideo``/``sendMediaGroup`` (multipart uploads get synthetic
+``file_id``s) and ``getFile``. Any other method answers ``true``. Every call
+can be delayed, rejected with 429 ``retry_after`` or failed with a random 5xx.
+
+Simulated users push updates with :meth:`MockBotAPI.push_update` and wait for
+the bot's reply with :meth:`MockBotAPI.wait_reply`.
+
+Usage: python -m benchmarks.mock_bot_api [--port 8081] [--latency-ms 30]
+       [--rate-limit 0.01] [--errors 0.005]
+
+then start the bot with ``BOT_API_URL=http://127.0.0.1:8081``.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+BOT_ID = 42
+BOT_USERNAME = "mock_video_bot"
+MAX_UPDATES = 100
+
+
+@dataclass
+class Faults:
+    latency: float = 0.0
+    jitter: float = 0.0
+    rate_limit: float = 0.0
+    retry_after: int = 1
+    errors: float = 0.0
+
+
+class MockBotAPI:
+    def __init__(self, faults: Optional[Faults] = None, seed: Optional[int] = None) -> None:
+        self.faults = faults or Faults()
+        self._random = random.Random(seed)
+        self._updates: List[dict] = []
+        self._first_update_id = 1
+        self._new_updates = asyncio.Condition()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+        self._files: Dict[str, int] = {}
+        self._waiters: Dict[int, asyncio.Future] = {}
+        self._callback_chats: Dict[str, int] = {}
+        self.calls: Counter = Counter()
+        self.injected: Counter = Counter()
+        self.uploaded_bytes = 0
+        self.polling = asyncio.Event()
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_route("*", "/bot{token}/{method}", self._handle)
+        app.router.add_get("/file/bot{token}/{path:.*}", self._download)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def push_update(self, update: dict) -> int:
+        """Queue an update for ``getUpdates``; ``update_id`` is assigned here."""
+        update_id = next(self._update_ids)
+        async with self._new_updates:
+            self._updates.append({"update_id": update_id, **update})
+            self._new_updates.notify_all()
+        return update_id
+
+    def wait_reply(self, chat_id: int) -> asyncio.Future:
+        """Future resolved by the next message, edit or callback answer for ``chat_id``."""
+        future = asyncio.get_running_loop().create_future()
+        previous = self._waiters.get(chat_id)
+        if previous is not None and not previous.done():
+            previous.cancel()
+        self._waiters[chat_id] = future
+        return future
+
+    def message_update(self, user_id: int, text: str) -> dict:
+        return {
+            "message": {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": _user(user_id),
+                "text": text,
+                **(
+                    {"entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]}
+                    if text.startswith("/")
+                    else {}
+                ),
+            }
+        }
+
+    def callback_update(self, user_id: int, data: str) -> dict:
+        callback_id = f"{user_id}-{next(self._message_ids)}"
+        self._callback_chats[callback_id] = user_id
+        return {
+            "callback_query": {
+                "id": callback_id,
+                "from": _user(user_id),
+                "chat_instance": str(user_id),
+                "data": data,
+                "message": {
+                    "message_id": 1,
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private"},
+                    "from": _user(BOT_ID, is_bot=True),
+                    "text": "menu",
+                },
+            }
+        }
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = await self._params(request)
+        self.calls[method] += 1
+        if method != "getUpdates":
+            fault = await self._inject()
+            if fault is not None:
+                self.injected[fault.status] += 1
+                return fault
+        handler = getattr(self, f"_on_{method}", None)
+        result = await handler(params) if handler is not None else True
+        return web.json_response({"ok": True, "result": result})
+
+    async def _params(self, request: web.Request) -> Dict[str, Any]:
+        if request.content_type.startswith("multipart/"):
+            params: Dict[str, Any] = {}
+            reader = await request.multipart()
+            async for part in reader:
+                if part.filename:
+                    size = 0
+                    while chunk := await part.read_chunk():
+                        size += len(chunk)
+                    params[part.name] = _Upload(part.filename, size)
+                else:
+                    params[part.name] = await part.text()
+            return params
+        if request.content_type == "application/json":
+            return await request.json()
+        return dict(await request.post()) or dict(request.query)
+
+    async def _inject(self) -> Optional[web.Response]:
+        faults = self.faults
+        if faults.latency or faults.jitter:
+            await asyncio.sleep(max(0.0, self._random.gauss(faults.latency, faults.jitter)))
+        roll = self._random.random()
+        if roll < faults.rate_limit:
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {faults.retry_after}",
+                    "parameters": {"retry_after": faults.retry_after},
+                },
+                status=429,
+            )
+        if roll < faults.rate_limit + faults.errors:
+            status = self._random.choice((500, 502, 503))
+            return web.json_response(
+                {"ok": False, "error_code": status, "description": "Internal Server Error"},
+                status=status,
+            )
+        return None
+
+    def _reply(self, chat_id: Any) -> None:
+        try:
+            future = self._waiters.pop(int(chat_id))
+        except (KeyError, TypeError, ValueError):
+            return
+        if not future.done():
+            future.set_result(time.perf_counter())
+
+    def _message(self, chat_id: Any, **fields: Any) -> dict:
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id), "type": "private"},
+            "from": _user(BOT_ID, is_bot=True),
+            **fields,
+        }
+
+    def _video(self, value: Any) -> dict:
+        if isinstance(value, _Upload):
+            self.uploaded_bytes += value.size
+            file_id = f"MOCK{next(self._file_ids):08d}"
+            self._files[file_id] = value.size
+        else:
+            file_id = str(value)
+        return {
+            "file_id": file_id,
+            "file_unique_id": file_id[-16:],
+            "width": 1280,
+            "height": 720,
+            "duration": 60,
+            "file_size": self._files.get(file_id, 0),
+        }
+
+    async def _on_getMe(self, params: dict) -> dict:
+        return {**_user(BOT_ID, is_bot=True), "username": BOT_USERNAME}
+
+    async def _on_getUpdates(self, params: dict) -> list:
+        offset = int(params.get("offset") or 0)
+        limit = min(int(params.get("limit") or MAX_UPDATES), MAX_UPDATES)
+        timeout = float(params.get("timeout") or 0)
+        self.polling.set()
+        async with self._new_updates:
+            if offset > self._first_update_id:
+                # Updates before the offset are confirmed and can be dropped.
+                drop = min(offset - self._first_update_id, len(self._updates))
+                del self._updates[:drop]
+                self._first_update_id += drop
+            if not self._updates and timeout > 0:
+                try:
+                    await asyncio.wait_for(self._new_updates.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            return self._updates[:limit]
+
+    async def _on_sendMessage(self, params: dict) -> dict:
+        self._reply(params.get("chat_id"))
+        return self._message(params.get("chat_id"), text=params.get("text", ""))
+
+    async def _on_editMessageText(self, params: dict) -> dict:
+        self._reply(params.get("chat_id"))
+        return self._message(params.get("chat_id"), text=params.get("text", ""))
+
+    async def _on_answerCallbackQuery(self, params: dict) -> bool:
+        self._reply(self._callback_chats.pop(str(params.get("callback_query_id")), None))
+        return True
+
+    async def _on_sendVideo(self, params: dict) -> dict:
+        self._reply(params.get("chat_id"))
+        return self._message(params.get("chat_id"), video=self._video(params.get("video")))
+
+    async def _on_sendMediaGroup(self, params: dict) -> list:
+        self._reply(params.get("chat_id"))
+        media = params.get("media")
+        if isinstance(media, str):
+            media = json.loads(media)
+        messages = []
+        for item in media or []:
+            value = item.get("media", "")
+            if isinstance(value, str) and value.startswith("attach://"):
+                value = params.get(value[len("attach://") :], value)
+            messages.append(self._message(params.get("chat_id"), video=self._video(value)))
+        return messages
+
+    async def _on_getFile(self, params: dict) -> dict:
+        file_id = str(params.get("file_id"))
+        return {
+            "file_id": file_id,
+            "file_unique_id": file_id[-16:],
+            "file_size": self._files.get(file_id, 0),
+            "file_path": f"videos/{file_id}.mp4",
+        }
+
+    async def _download(self, request: web.Request) -> web.Response:
+        file_id = request.match_info["path"].rsplit("/", 1)[-1].split(".", 1)[0]
+        return web.Response(body=b"\0" * self._files.get(file_id, 0))
+
+
+@dataclass(frozen=True)
+class _Upload:
+    filename: str
+    size: int
+
+
+def _user(user_id: int, is_bot: bool = False) -> dict:
+    return {"id": user_id, "is_bot": is_bot, "first_name": "Bot" if is_bot else f"User {user_id}"}
+
+
+async def serve(port: int, faults: Faults) -> None:
+    api = MockBotAPI(faults)
+    url = await api.start(port=port)
+    print(f"Mock Bot API on {url} (any token)")
+    try:
+        while True:
+            await asyncio.sleep(60)
+            print(f"calls: {dict(api.calls)}  injected: {dict(api.injected)}")
+    finally:
+        await api.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="share of calls answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--errors", type=float, default=0.0, help="share of calls failed with 5xx")
+    args = parser.parse_args()
+    faults = Faults(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        rate_limit=args.rate_limit,
+        retry_after=args.retry_after,
+        errors=args.errors,
+    )
+    try:
+        asyncio.run(serve(args.port, faults))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
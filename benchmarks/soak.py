@@ -0,0 +1,222 @@
+"""Soak test of the whole bot against the mock Bot API.
+
+Starts :mod:`benchmarks.mock_bot_api` in-process and ``main.py`` as a child
+process pointed at it (``BOT_API_URL``) with a copy of ``data/``. Simulated
+users then loop ``/start`` → section → mode with a random think time. For
+every update the runner measures the time until the bot's first reply
+(message, edit, video or callback answer) and reports, every ``--report``
+seconds and at the end: throughput, p50/p95/p99/max latency, updates left
+unanswered, injected faults and the bot's resident memory.
+
+Usage: python -m benchmarks.soak [--users 2000] [--duration 3600]
+       [--latency-ms 30] [--rate-limit 0.01] [--errors 0.005]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from benchmarks.mock_bot_api import Faults, MockBotAPI
+from bot.keyboards import UserMenuCallback
+
+ROOT = Path(__file__).resolve().parent.parent
+TOKEN = "123456:SOAK"
+FIRST_USER_ID = 10_000_000
+
+
+@dataclass
+class Window:
+    latencies: List[float] = field(default_factory=list)
+    timeouts: int = 0
+
+    def add(self, other: "Window") -> None:
+        self.latencies.extend(other.latencies)
+        self.timeouts += other.timeouts
+
+
+def percentile(ordered: List[float], share: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def resident_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def load_catalogue(data_dir: Path) -> List[Tuple[str, List[str]]]:
+    sections = json.loads((data_dir / "menu.json").read_text(encoding="utf-8"))
+    return [
+        (section["id"], [mode["id"] for mode in section.get("modes", [])])
+        for section in sections
+        if section.get("modes")
+    ]
+
+
+class Soak:
+    def __init__(self, api: MockBotAPI, catalogue, args: argparse.Namespace) -> None:
+        self.api = api
+        self.catalogue = catalogue
+        self.args = args
+        self.window = Window()
+        self.total = Window()
+        self.started = time.monotonic()
+        self.deadline = self.started + args.duration
+
+    async def user(self, user_id: int) -> None:
+        rng = random.Random(user_id)
+        # Spread the first /start of every user over the ramp-up period.
+        await asyncio.sleep(rng.uniform(0, self.args.ramp_up))
+        while time.monotonic() < self.deadline:
+            section_id, modes = rng.choice(self.catalogue)
+            steps = [
+                self.api.message_update(user_id, "/start"),
+                self.api.callback_update(
+                    user_id, UserMenuCallback(action="category", section_id=section_id).pack()
+                ),
+                self.api.callback_update(
+                    user_id,
+                    UserMenuCallback(
+                        action="mode", section_id=section_id, mode_id=rng.choice(modes)
+                    ).pack(),
+                ),
+            ]
+            for update in steps:
+                if time.monotonic() >= self.deadline:
+                    return
+                await self.step(user_id, update)
+                await asyncio.sleep(rng.uniform(self.args.think_min, self.args.think_max))
+
+    async def step(self, user_id: int, update: dict) -> None:
+        reply = self.api.wait_reply(user_id)
+        pushed = time.perf_counter()
+        await self.api.push_update(update)
+        try:
+            answered = await asyncio.wait_for(reply, self.args.timeout)
+        except asyncio.TimeoutError:
+            self.window.timeouts += 1
+            return
+        self.window.latencies.append(answered - pushed)
+
+    def report(self, pid: int, final: bool = False) -> None:
+        window, self.window = self.window, Window()
+        self.total.add(window)
+        shown = self.total if final else window
+        ordered = sorted(shown.latencies)
+        elapsed = time.monotonic() - self.started
+        span = elapsed if final else self.args.report
+        rss = resident_mb(pid)
+        print(
+            f"{'TOTAL' if final else f'{elapsed:7.0f}s'}  "
+            f"{len(ordered) / max(span, 1e-9):7.1f} upd/s  "
+            f"p50 {percentile(ordered, 0.50) * 1000:6.0f} ms  "
+            f"p95 {percentile(ordered, 0.95) * 1000:6.0f} ms  "
+            f"p99 {percentile(ordered, 0.99) * 1000:6.0f} ms  "
+            f"max {(ordered[-1] if ordered else 0) * 1000:6.0f} ms  "
+            f"unanswered {shown.timeouts:5d}  "
+            f"429 {self.api.injected[429]:5d}  "
+            f"5xx {sum(n for status, n in self.api.injected.items() if status >= 500):5d}  "
+            f"rss {f'{rss:.0f} MB' if rss is not None else 'n/a'}",
+            flush=True,
+        )
+
+
+async def run(args: argparse.Namespace) -> int:
+    faults = Faults(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        rate_limit=args.rate_limit,
+        retry_after=args.retry_after,
+        errors=args.errors,
+    )
+    api = MockBotAPI(faults, seed=args.seed)
+    url = await api.start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp) / "data"
+        shutil.copytree(args.data, data_dir)
+        catalogue = load_catalogue(data_dir)
+        if not catalogue:
+            print(f"{args.data}/menu.json has no modes to click", file=sys.stderr)
+            return 1
+        env = {
+            **os.environ,
+            "TENANTS": "",
+            "BOT_TOKEN": TOKEN,
+            "ADMIN_IDS": "1",
+            "DATA_DIR": str(data_dir),
+            "BOT_API_URL": url,
+        }
+        bot = await asyncio.create_subprocess_exec(
+            sys.executable,
+            str(ROOT / "main.py"),
+            cwd=ROOT,
+            env=env,
+            stdout=asyncio.subprocess.DEVNULL if args.quiet else None,
+            stderr=asyncio.subprocess.DEVNULL if args.quiet else None,
+        )
+        await asyncio.wait_for(api.polling.wait(), args.timeout)
+        soak = Soak(api, catalogue, args)
+        print(f"Soak: {args.users} users for {args.duration:.0f}s, bot pid {bot.pid}, mock {url}")
+        users = [
+            asyncio.create_task(soak.user(FIRST_USER_ID + index)) for index in range(args.users)
+        ]
+        all_users = asyncio.gather(*users)
+        try:
+            while not all_users.done():
+                await asyncio.wait([all_users], timeout=args.report)
+                if bot.returncode is not None:
+                    print(f"Bot exited with code {bot.returncode}", file=sys.stderr)
+                    all_users.cancel()
+                    break
+                if not all_users.done():
+                    soak.report(bot.pid)
+        finally:
+            soak.report(bot.pid, final=True)
+            if bot.returncode is None:
+                bot.terminate()
+                await bot.wait()
+            await api.stop()
+            print(f"API calls: {dict(api.calls.most_common())}")
+    return 0 if soak.total.timeouts == 0 else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--duration", type=float, default=3600.0, help="seconds")
+    parser.add_argument("--ramp-up", type=float, default=60.0, help="seconds")
+    parser.add_argument("--think-min", type=float, default=1.0)
+    parser.add_argument("--think-max", type=float, default=5.0)
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for a reply")
+    parser.add_argument("--report", type=float, default=30.0, help="seconds between reports")
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="share of calls answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--errors", type=float, default=0.0, help="share of calls failed with 5xx")
+    parser.add_argument("--data", type=Path, default=ROOT / "data")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--quiet", action="store_true", help="hide the bot's own log")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
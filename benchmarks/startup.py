@@ -0,0 +1,69 @@
+"""Cold-start benchmark: load a synthetic catalogue and build the dispatcher.
+
+Usage: python -m benchmarks.startup [--sections 500] [--modes 20]
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from aiogram import Bot
+
+from bot import Config, StartupTimer, config_for_data_dir
+from main import build_dispatcher, load_tenant
+
+
+def write_catalogue(data_dir: Path, sections: int, modes: int) -> None:
+    menu = []
+    videos = {}
+    for s in range(sections):
+        section_name = f"Раздел {s}"
+        mode_entries = [
+            {"id": f"m{s:05d}{m:04d}", "name": f"Режим {m}"} for m in range(modes)
+        ]
+        menu.append({"id": f"s{s:06d}", "name": section_name, "modes": mode_entries})
+        videos[section_name] = {
+            entry["name"]: f"BAACAgIAAxkDAAJ{s:05d}{m:04d}" for m, entry in enumerate(mode_entries)
+        }
+    (data_dir / "menu.json").write_text(
+        json.dumps(menu, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    (data_dir / "videos.json").write_text(
+        json.dumps(videos, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+
+
+async def cold_start(config: Config) -> StartupTimer:
+    timer = StartupTimer()
+    tenant = await load_tenant(config, Bot(token=config.bot_token), timer)
+    with timer.phase("routers"):
+        build_dispatcher([tenant])
+    return timer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, default=500)
+    parser.add_argument("--modes", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        write_catalogue(data_dir, args.sections, args.modes)
+        config = config_for_data_dir("benchmark", "0:benchmark", set(), data_dir)
+        print(f"{args.sections * args.modes} modes in {args.sections} sections")
+        timings = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            timer = asyncio.run(cold_start(config))
+            timings.append(time.perf_counter() - started)
+            print(timer.report())
+        print(f"best {min(timings) * 1000:.1f} ms, worst {max(timings) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,63 @@
-"""Bot package initialization."""
+"""Bot package initialization.
 
-from .config import Config, MenuMode, MenuSection, load_config
-from .handlers import create_admin_router, create_user_router
-from .services.menu_repository import MenuRepository
-from .services.storage import VideoStorage
+Exports are resolved lazily so that importing a single service does not pull
+in aiogram routers and keyboard models.
+"""
 
-__all__ = [
-    "Config",
-    "MenuSection",
-    "MenuMode",
-    "MenuRepository",
-    "VideoStorage",
-    "load_config",
-    "create_user_router",
-    "create_admin_router",
-]
+from importlib import import_module
+from typing import Any
+
+_EXPORTS = {
+    "Config": ".config",
+    "MenuSection": ".config",
+    "MenuMode": ".config",
+    "HttpSettings": ".config",
+    "PoolSettings": ".config",
+    "TracingSettings": ".config",
+    "MonitorSettings": ".config",
+    "ExecutorSettings": ".config",
+    "MenuRepository": ".services.menu_repository",
+    "VideoStorage": ".services.storage",
+    "VideoMetadata": ".services.video_meta",
+    "Catalogue": ".services.catalogue",
+    "CatalogueLock": ".services.file_lock",
+    "UserRegistry": ".services.users",
+    "Broadcaster": ".services.broadcast",
+    "Analytics": ".services.analytics",
+    "DripScheduler": ".services.drip",
+    "RenderCache": ".services.render_cache",
+    "ResponsePipeline": ".services.response",
+    "StartupTimer": ".services.startup",
+    "FileWatcher": ".services.watcher",
+    "CatalogueReloader": ".services.reload",
+    "MenuHistory": ".services.history",
+    "PooledSession": ".services.http_session",
+    "Tracer": ".services.tracing",
+    "LoopMonitor": ".services.loop_monitor",
+    "UpdateExecutor": ".services.executor",
+    "OrderedDispatcher": ".services.executor",
+    "UpdateOffset": ".services.offsets",
+    "Tenant": ".tenancy",
+    "load_config": ".config",
+    "load_http_settings": ".config",
+    "load_tracing_settings": ".config",
+    "load_monitor_settings": ".config",
+    "load_executor_settings": ".config",
+    "config_for_data_dir": ".config",
+    "create_user_router": ".handlers",
+    "create_admin_router": ".handlers",
+    "create_tenant_router": ".handlers",
+    "ThrottlingMiddleware": ".middlewares",
+    "TracingMiddleware": ".middlewares",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,300 @@
+"""Offline catalogue management: ``python -m bot.cli <command>``.
+
+Uses the bot's own ``MenuRepository``, ``VideoStorage`` and ``Catalogue``,
+so edits are validated and written exactly as the admin panel does. The
+command holds ``catalogue.lock`` from reading the files to the commit; a
+running bot waits for it before touching ``menu.json``/``videos.json`` and
+then picks the change up through its file watcher, without a restart.
+
+Every invocation is one unit of work written once, including ``apply``,
+which takes a JSON list of operations::
+
+    [{"op": "add-section", "name": "Плечи"},
+     {"op": "add-mode", "section": "Плечи", "name": "Разминка"},
+     {"op": "attach", "target": "Плечи/Разминка", "files": ["videos/warmup.mp4"]},
+     {"op": "rename", "target": "s9ff3cb", "name": "Поясница"},
+     {"op": "delete", "target": "me89771"}]
+
+A ``target`` is a section or mode ID, a section name or ``Section/Mode``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from .config import BASE_DIR, MenuMode, MenuSection, config_for_data_dir
+from .services.catalogue import Catalogue, CatalogueConflict, UnitOfWork
+from .services.file_lock import CatalogueLock, CatalogueLockTimeout
+from .services.menu_repository import MenuRepository
+from .services.storage import VideoStorage, _as_list
+
+DEFAULT_WAIT = 30.0
+
+Operation = dict
+
+
+class CliError(Exception):
+    pass
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    try:
+        operations = _operations(args)
+    except CliError as exc:
+        parser.error(str(exc))
+
+    config = config_for_data_dir("cli", "", set(), _data_dir(args.data))
+    lock = CatalogueLock(config.lock_path)
+    try:
+        lock.acquire(timeout=args.wait)
+    except CatalogueLockTimeout:
+        print(f"{config.lock_path} is still locked after {args.wait:.0f}s", file=sys.stderr)
+        return 1
+    try:
+        return asyncio.run(_run(config, lock, operations, args))
+    except CliError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        lock.release()
+        lock.close()
+
+
+async def _run(config, lock: CatalogueLock, operations: List[Operation], args) -> int:
+    menu_repo = MenuRepository(config.menu_path, lock)
+    storage = VideoStorage(config.videos_path, lock)
+    catalogue = Catalogue(
+        menu_repo, storage, config.menu_path, config.videos_path, config.journal_path
+    )
+    await catalogue.recover()
+    await menu_repo.load()
+    await storage.load(await menu_repo.get_sections())
+
+    if args.command == "list":
+        _print_catalogue(catalogue.begin(), args.json)
+        return 0
+
+    work = catalogue.begin()
+    for index, operation in enumerate(operations):
+        try:
+            _apply(work, operation)
+        except (KeyError, ValueError, TypeError) as exc:
+            raise CliError(f"operation {index + 1} ({operation.get('op')}): {exc}") from exc
+    if args.dry_run:
+        print("\n".join(work.changes) or "No changes")
+        return 0
+    try:
+        await work.commit()
+    except CatalogueConflict as exc:
+        raise CliError(str(exc)) from exc
+    print("\n".join(work.changes) or "No changes")
+    return 0
+
+
+def _apply(work: UnitOfWork, operation: Operation) -> None:
+    op = operation.get("op")
+    if op == "add-section":
+        work.add_section(_name(operation))
+    elif op == "add-mode":
+        section, mode = _resolve(work, operation["section"])
+        if mode is not None:
+            raise ValueError(f"{operation['section']!r} is a mode, not a section")
+        work.add_mode(section.id, _name(operation))
+    elif op == "rename":
+        section, mode = _resolve(work, operation["target"])
+        if mode is None:
+            work.rename_section(section.id, _name(operation))
+        else:
+            work.rename_mode(section.id, mode.id, _name(operation))
+    elif op == "delete":
+        section, mode = _resolve(work, operation["target"])
+        if mode is None:
+            work.delete_section(section.id)
+        else:
+            work.delete_mode(section.id, mode.id)
+    elif op in ("attach", "detach"):
+        section, mode = _resolve(work, operation["target"])
+        if mode is None:
+            raise ValueError(f"{operation['target']!r} is a section, not a mode")
+        videos: List[str] = []
+        if op == "attach":
+            if operation.get("append"):
+                videos = _as_list(work.videos.get(section.name, {}).get(mode.name))
+            videos += [_video_reference(value) for value in operation["files"]]
+        work.set_videos(section.id, mode.id, videos)
+    else:
+        raise ValueError(f"unknown operation {op!r}")
+
+
+def _name(operation: Operation) -> str:
+    name = str(operation["name"]).strip()
+    if not name:
+        raise ValueError("name must not be empty")
+    return name
+
+
+def _resolve(work: UnitOfWork, target: str) -> Tuple[MenuSection, Optional[MenuMode]]:
+    sections = work.sections
+    for section in sections:
+        if section.id == target:
+            return section, None
+        for mode in section.modes:
+            if mode.id == target:
+                return section, mode
+    section_name, separator, mode_name = target.partition("/")
+    for section in sections:
+        if section.name != section_name:
+            continue
+        if not separator:
+            return section, None
+        for mode in section.modes:
+            if mode.name == mode_name:
+                return section, mode
+    raise KeyError(f"nothing matches {target!r}")
+
+
+def _video_reference(value: str) -> str:
+    """Keep file_ids and URLs; check local files and store them relative to the project."""
+    lowered = value.lower()
+    if lowered.startswith(("http://", "https://")):
+        return value
+    path = Path(value).expanduser()
+    if not path.exists() and not path.is_absolute() and (BASE_DIR / path).exists():
+        path = BASE_DIR / path
+    if not path.exists():
+        if os.sep in value or "/" in value or "." in value:
+            raise ValueError(f"file not found: {value}")
+        # No path separators or extension: a Telegram file_id.
+        return value
+    if not path.is_file():
+        raise ValueError(f"not a file: {value}")
+    path = path.resolve()
+    try:
+        return path.relative_to(BASE_DIR).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def _print_catalogue(work: UnitOfWork, as_json: bool) -> None:
+    if as_json:
+        print(
+            json.dumps(
+                [
+                    {
+                        "id": section.id,
+                        "name": section.name,
+                        "modes": [
+                            {
+                                "id": mode.id,
+                                "name": mode.name,
+                                "videos": _as_list(
+                                    work.videos.get(section.name, {}).get(mode.name)
+                                ),
+                            }
+                            for mode in section.modes
+                        ],
+                    }
+                    for section in work.sections
+                ],
+                ensure_ascii=False,
+                indent=2,
+            )
+        )
+        return
+    for section in work.sections:
+        print(f"{section.id}  {section.name}")
+        for mode in section.modes:
+            videos = _as_list(work.videos.get(section.name, {}).get(mode.name))
+            shown = ", ".join(_shorten(video) for video in videos) or "—"
+            print(f"  {mode.id}  {mode.name}  [{shown}]")
+
+
+def _shorten(video: str, limit: int = 24) -> str:
+    return video if len(video) <= limit else video[: limit - 1] + "…"
+
+
+def _operations(args: argparse.Namespace) -> List[Operation]:
+    command = args.command
+    if command == "list":
+        return []
+    if command == "add-section":
+        return [{"op": command, "name": args.name}]
+    if command == "add-mode":
+        return [{"op": command, "section": args.section, "name": args.name}]
+    if command == "rename":
+        return [{"op": command, "target": args.target, "name": args.name}]
+    if command == "delete":
+        return [{"op": command, "target": target} for target in args.targets]
+    if command == "attach":
+        return [{"op": command, "target": args.target, "files": args.files, "append": args.append}]
+    if command == "detach":
+        return [{"op": command, "target": args.target}]
+    try:
+        if args.file == "-":
+            operations = json.load(sys.stdin)
+        else:
+            with open(args.file, encoding="utf-8") as f:
+                operations = json.load(f)
+    except OSError as exc:
+        raise CliError(f"cannot read {args.file}: {exc.strerror}") from exc
+    except ValueError as exc:
+        raise CliError(f"{args.file} is not valid JSON: {exc}") from exc
+    if not isinstance(operations, list) or not all(isinstance(op, dict) for op in operations):
+        raise CliError(f"{args.file} must contain a JSON list of operations")
+    return operations
+
+
+def _data_dir(value: Optional[str]) -> Path:
+    path = Path(value or os.getenv("DATA_DIR") or "data")
+    return path if path.is_absolute() else BASE_DIR / path
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m bot.cli", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("--data", help="data directory (DATA_DIR or data/ by default)")
+    parser.add_argument(
+        "--wait", type=float, default=DEFAULT_WAIT, help="seconds to wait for the lock"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="show the changes, write nothing")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    listing = commands.add_parser("list", help="print sections, modes and videos")
+    listing.add_argument("--json", action="store_true")
+
+    add_section = commands.add_parser("add-section", help="add a section")
+    add_section.add_argument("name")
+
+    add_mode = commands.add_parser("add-mode", help="add a mode to a section")
+    add_mode.add_argument("section", help="section ID or name")
+    add_mode.add_argument("name")
+
+    rename = commands.add_parser("rename", help="rename a section or mode")
+    rename.add_argument("target")
+    rename.add_argument("name")
+
+    delete = commands.add_parser("delete", help="delete sections or modes")
+    delete.add_argument("targets", nargs="+")
+
+    attach = commands.add_parser("attach", help="set the videos of a mode")
+    attach.add_argument("target", help="mode ID or Section/Mode")
+    attach.add_argument("files", nargs="+", help="local files, URLs or file_ids")
+    attach.add_argument("--append", action="store_true", help="keep the current videos")
+
+    detach = commands.add_parser("detach", help="remove all videos of a mode")
+    detach.add_argument("target")
+
+    apply = commands.add_parser("apply", help="apply a JSON list of operations in one commit")
+    apply.add_argument("file", help="JSON file, or - for stdin")
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,33 +1,120 @@
 import os
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List
+from typing import List, Mapping, NamedTuple, Optional, Tuple
 
 from dotenv import load_dotenv
 
+# Project root: relative data and video paths, including those stored in
+# videos.json by the CLI, are resolved against it.
+BASE_DIR = Path(__file__).resolve().parent.parent
 
-@dataclass(frozen=True)
-class MenuMode:
+
+class _MenuModeFields(NamedTuple):
     id: str
     name: str
 
 
-@dataclass(frozen=True)
+class MenuMode(_MenuModeFields):
+    """Tuple-backed: catalogues hold 100k+ modes, and tuples are the cheapest
+    records to build. ``name`` is interned, since names such as
+    "Щадящий режим" repeat across sections."""
+
+    __slots__ = ()
+
+    def __new__(cls, id: str, name: str) -> "MenuMode":
+        return super().__new__(cls, id, sys.intern(name))
+
+
+@dataclass(frozen=True, slots=True)
 class MenuSection:
+    """Immutable section; ``modes`` is always a tuple, so sections can be shared freely."""
+
     id: str
     name: str
-    modes: List[MenuMode]
+    modes: Tuple[MenuMode, ...] = ()
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "name", sys.intern(self.name))
+        if not isinstance(self.modes, tuple):
+            object.__setattr__(self, "modes", tuple(self.modes))
+
+
+DEFAULT_TENANT = "default"
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    limit: int
+    timeout: float
+
+
+@dataclass(frozen=True)
+class HttpSettings:
+    """Connection pools of the Bot API client.
+
+    Small calls (``answerCallbackQuery``, ``editMessageText``...) never wait
+    behind multi-megabyte uploads because each class of request has its own
+    connector. ``method_timeouts`` overrides the pool timeout per API method.
+    ``api_url`` points the client at a self-hosted ``telegram-bot-api``
+    server; with ``api_local`` it runs in ``--local`` mode and reads files
+    from disk by path.
+    """
+
+    control: PoolSettings = PoolSettings(limit=64, timeout=10.0)
+    upload: PoolSettings = PoolSettings(limit=8, timeout=300.0)
+    polling: PoolSettings = PoolSettings(limit=4, timeout=60.0)
+    keepalive: float = 60.0
+    dns_ttl: int = 600
+    method_timeouts: Mapping[str, float] = field(default_factory=dict)
+    api_url: Optional[str] = None
+    api_local: bool = False
+
+
+@dataclass(frozen=True)
+class TracingSettings:
+    path: Path
+    sample_rate: float = 0.0
+    slow_threshold: Optional[float] = None
+    max_bytes: int = 10 * 1024 * 1024
+    backups: int = 3
+
+
+@dataclass(frozen=True)
+class MonitorSettings:
+    interval: float = 0.1
+    threshold: float = 0.25
+    debug: bool = False
+
+
+@dataclass(frozen=True)
+class ExecutorSettings:
+    concurrency: int = 32
+    queue_limit: int = 256
+    drain_timeout: float = 30.0
+    callback_ttl: float = 60.0
 
 
 @dataclass(frozen=True)
 class Config:
+    name: str
     bot_token: str
     admin_ids: set[int]
     menu_path: Path
     videos_path: Path
+    users_path: Path
+    broadcast_path: Path
+    analytics_path: Path
+    history_path: Path
+    drip_path: Path
+    journal_path: Path
+    video_meta_path: Path
+    lock_path: Path
+    offset_path: Path
 
 
-def _parse_admin_ids(value: str | None) -> set[int]:
+def _parse_admin_ids(value: str | None, variable: str = "ADMIN_IDS") -> set[int]:
     if not value:
         return set()
     ids: set[int] = set()
@@ -38,26 +125,183 @@ def _parse_admin_ids(value: str | None) -> set[int]:
         try:
             ids.add(int(chunk))
         except ValueError as exc:
-            raise ValueError(f"ADMIN_IDS contains a non-integer value: {chunk}") from exc
+            raise ValueError(f"{variable} contains a non-integer value: {chunk}") from exc
     return ids
 
 
-def load_config() -> Config:
-    load_dotenv()
+def config_for_data_dir(name: str, bot_token: str, admin_ids: set[int], data_dir: Path) -> Config:
+    return Config(
+        name=name,
+        bot_token=bot_token,
+        admin_ids=admin_ids,
+        menu_path=data_dir / "menu.json",
+        videos_path=data_dir / "videos.json",
+        users_path=data_dir / "users.bin",
+        broadcast_path=data_dir / "broadcast.json",
+        analytics_path=data_dir / "analytics.jsonl",
+        history_path=data_dir / "history.jsonl",
+        drip_path=data_dir / "drip.jsonl",
+        journal_path=data_dir / "catalogue.journal",
+        video_meta_path=data_dir / "video_meta.json",
+        lock_path=data_dir / "catalogue.lock",
+        offset_path=data_dir / "update_offset.json",
+    )
+
 
-    bot_token = os.getenv("BOT_TOKEN")
+def _load_tenant(name: str, base_dir: Path) -> Config:
+    if name == DEFAULT_TENANT:
+        prefix = ""
+        default_dir = base_dir / "data"
+    else:
+        prefix = f"{name.upper()}_"
+        default_dir = base_dir / "data" / name
+
+    bot_token = os.getenv(f"{prefix}BOT_TOKEN")
     if not bot_token:
-        raise RuntimeError("BOT_TOKEN environment variable is required")
+        raise RuntimeError(f"{prefix}BOT_TOKEN environment variable is required")
 
-    admin_ids = _parse_admin_ids(os.getenv("ADMIN_IDS"))
+    admin_ids = _parse_admin_ids(os.getenv(f"{prefix}ADMIN_IDS"), f"{prefix}ADMIN_IDS")
 
-    base_dir = Path(__file__).resolve().parent.parent
-    menu_path = base_dir / "data" / "menu.json"
-    videos_path = base_dir / "data" / "videos.json"
+    data_dir = os.getenv(f"{prefix}DATA_DIR")
+    if data_dir:
+        data_path = Path(data_dir)
+        if not data_path.is_absolute():
+            data_path = base_dir / data_path
+    else:
+        data_path = default_dir
 
-    return Config(
-        bot_token=bot_token,
-        admin_ids=admin_ids,
-        menu_path=menu_path,
-        videos_path=videos_path,
+    return config_for_data_dir(name, bot_token, admin_ids, data_path)
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be a number") from exc
+
+
+def _env_flag(name: str) -> bool:
+    return (os.getenv(name) or "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _parse_method_timeouts(value: str | None) -> dict[str, float]:
+    # Format: "answerCallbackQuery=5,sendVideo=600"
+    timeouts: dict[str, float] = {}
+    for chunk in (value or "").split(","):
+        if not chunk.strip():
+            continue
+        method, _, seconds = chunk.partition("=")
+        try:
+            timeouts[method.strip()] = float(seconds)
+        except ValueError as exc:
+            raise ValueError(f"HTTP_METHOD_TIMEOUTS has an invalid entry: {chunk}") from exc
+    return timeouts
+
+
+def load_http_settings() -> HttpSettings:
+    """HTTP settings shared by all tenants (``HTTP_*`` and ``BOT_API_*`` variables)."""
+    load_dotenv()
+    defaults = HttpSettings()
+    api_url = (os.getenv("BOT_API_URL") or "").strip().rstrip("/") or None
+    api_local = _env_flag("BOT_API_LOCAL")
+    if api_local and api_url is None:
+        raise ValueError("BOT_API_LOCAL requires BOT_API_URL of a self-hosted server")
+    return HttpSettings(
+        control=PoolSettings(
+            limit=int(_env_float("HTTP_CONTROL_POOL", defaults.control.limit)),
+            timeout=_env_float("HTTP_CONTROL_TIMEOUT", defaults.control.timeout),
+        ),
+        upload=PoolSettings(
+            limit=int(_env_float("HTTP_UPLOAD_POOL", defaults.upload.limit)),
+            timeout=_env_float("HTTP_UPLOAD_TIMEOUT", defaults.upload.timeout),
+        ),
+        polling=PoolSettings(
+            limit=int(_env_float("HTTP_POLLING_POOL", defaults.polling.limit)),
+            timeout=_env_float("HTTP_POLLING_TIMEOUT", defaults.polling.timeout),
+        ),
+        keepalive=_env_float("HTTP_KEEPALIVE", defaults.keepalive),
+        dns_ttl=int(_env_float("HTTP_DNS_TTL", defaults.dns_ttl)),
+        method_timeouts=_parse_method_timeouts(os.getenv("HTTP_METHOD_TIMEOUTS")),
+        api_url=api_url,
+        api_local=api_local,
     )
+
+
+def load_tracing_settings() -> TracingSettings:
+    """Tracing settings (``TRACE_*`` variables); everything is off by default."""
+    load_dotenv()
+    base_dir = BASE_DIR
+    sample_rate = _env_float("TRACE_SAMPLE_RATE", 0.0)
+    if not 0 <= sample_rate <= 1:
+        raise ValueError("TRACE_SAMPLE_RATE must be between 0 and 1")
+    slow_ms = _env_float("TRACE_SLOW_MS", -1.0)
+    path = Path(os.getenv("TRACE_PATH") or "data/traces.jsonl")
+    if not path.is_absolute():
+        path = base_dir / path
+    return TracingSettings(
+        path=path,
+        sample_rate=sample_rate,
+        slow_threshold=slow_ms / 1000 if slow_ms >= 0 else None,
+        max_bytes=int(_env_float("TRACE_MAX_BYTES", 10 * 1024 * 1024)),
+        backups=int(_env_float("TRACE_BACKUPS", 3)),
+    )
+
+
+def load_monitor_settings() -> MonitorSettings:
+    """Event-loop watchdog settings (``LOOP_*`` variables)."""
+    load_dotenv()
+    defaults = MonitorSettings()
+    threshold_ms = _env_float("LOOP_LAG_THRESHOLD_MS", defaults.threshold * 1000)
+    if threshold_ms <= 0:
+        raise ValueError("LOOP_LAG_THRESHOLD_MS must be positive")
+    return MonitorSettings(
+        interval=defaults.interval,
+        threshold=threshold_ms / 1000,
+        debug=_env_flag("LOOP_DEBUG"),
+    )
+
+
+def load_executor_settings() -> ExecutorSettings:
+    """Update executor settings (``UPDATE_*`` variables)."""
+    load_dotenv()
+    defaults = ExecutorSettings()
+    concurrency = int(_env_float("UPDATE_CONCURRENCY", defaults.concurrency))
+    queue_limit = int(_env_float("UPDATE_QUEUE_LIMIT", defaults.queue_limit))
+    if concurrency < 1 or queue_limit < 1:
+        raise ValueError("UPDATE_CONCURRENCY and UPDATE_QUEUE_LIMIT must be positive")
+    return ExecutorSettings(
+        concurrency=concurrency,
+        queue_limit=queue_limit,
+        drain_timeout=_env_float("UPDATE_DRAIN_TIMEOUT", defaults.drain_timeout),
+        callback_ttl=_env_float("UPDATE_CALLBACK_TTL", defaults.callback_ttl),
+    )
+
+
+def load_config() -> List[Config]:
+    """Read one config per tenant.
+
+    Without ``TENANTS`` a single tenant is built from ``BOT_TOKEN``/``ADMIN_IDS``
+    with data in ``data/``. ``TENANTS=alpha,beta`` reads ``ALPHA_BOT_TOKEN``,
+    ``ALPHA_ADMIN_IDS`` and an optional ``ALPHA_DATA_DIR`` (``data/alpha`` by
+    default) for every listed name; ``default`` refers to the unprefixed values.
+    """
+    load_dotenv()
+
+    base_dir = BASE_DIR
+    names = [chunk.strip() for chunk in (os.getenv("TENANTS") or "").split(",") if chunk.strip()]
+    if not names:
+        names = [DEFAULT_TENANT]
+    if len(set(names)) != len(names):
+        raise ValueError("TENANTS contains duplicate names")
+
+    configs = [_load_tenant(name, base_dir) for name in names]
+    tokens = [config.bot_token for config in configs]
+    if len(set(tokens)) != len(tokens):
+        raise ValueError("Each tenant needs its own bot token")
+    data_dirs = [config.menu_path.parent.resolve() for config in configs]
+    if len(set(data_dirs)) != len(data_dirs):
+        raise ValueError("Each tenant needs its own data directory")
+    return configs
@@ -1,4 +1,66 @@
+from typing import Optional
+
+from aiogram import Bot, Router
+from aiogram.types import TelegramObject
+
+from ..services.executor import UpdateExecutor
+from ..services.loop_monitor import LoopMonitor
+from ..services.profiler import SamplingProfiler
+from ..tenancy import Tenant
 from .admin import create_admin_router
 from .user import create_user_router
 
-__all__ = ["create_user_router", "create_admin_router"]
+
+def create_tenant_router(
+    tenant: Tenant,
+    profiler: SamplingProfiler,
+    monitor: Optional[LoopMonitor] = None,
+    executor: Optional[UpdateExecutor] = None,
+) -> Router:
+    """User and admin routers of one tenant, reachable only by updates of its bot.
+
+    ``profiler``, ``monitor`` and ``executor`` are shared by all tenants: they
+    watch the whole process.
+    """
+    router = Router(name=f"tenant-{tenant.config.name}")
+    bot_id = tenant.bot.id
+
+    def from_tenant_bot(_: TelegramObject, bot: Bot) -> bool:
+        return bot.id == bot_id
+
+    router.message.filter(from_tenant_bot)
+    router.callback_query.filter(from_tenant_bot)
+
+    router.include_router(
+        create_user_router(
+            tenant.menu_repo,
+            tenant.storage,
+            tenant.metadata,
+            tenant.users,
+            tenant.analytics,
+            tenant.render_cache,
+            tenant.pipeline,
+            tenant.drip,
+        )
+    )
+    router.include_router(
+        create_admin_router(
+            tenant.config.admin_ids,
+            tenant.menu_repo,
+            tenant.storage,
+            tenant.metadata,
+            tenant.catalogue,
+            tenant.broadcaster,
+            tenant.analytics,
+            tenant.render_cache,
+            tenant.pipeline,
+            tenant.history,
+            profiler,
+            monitor,
+            executor,
+        )
+    )
+    return router
+
+
+__all__ = ["create_user_router", "create_admin_router", "create_tenant_router"]
@@ -1,22 +1,49 @@
+import asyncio
+import html
+import logging
+from datetime import datetime
+from typing import Optional
+
 from aiogram import F, Router
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import BufferedInputFile, CallbackQuery, Message, Video
+from aiogram.utils.deep_linking import create_start_link
 
 from ..keyboards import (
     AdminActions,
     AdminMenuCallback,
+    build_admin_history,
     build_admin_menu_mode,
     build_admin_menu_section,
     build_admin_menu_sections,
     build_admin_root_menu,
+    build_admin_stats,
     build_admin_video_categories,
     build_admin_video_modes,
     build_confirmation_keyboard,
 )
+from ..config import MenuSection
+from ..services import analytics as events
+from ..services.analytics import Analytics
+from ..services.broadcast import Broadcaster
+from ..services.catalogue import Catalogue, CatalogueConflict
+from ..services.executor import UpdateExecutor
+from ..services.history import MenuHistory, Version
+from ..services.loop_monitor import LoopMonitor
 from ..services.menu_repository import MenuRepository
+from ..services.profiler import ProfileReport, SamplingProfiler
+from ..services.render_cache import RenderCache
+from ..services.response import ResponsePipeline
 from ..services.storage import VideoStorage
+from ..services.video_meta import VideoMetadata
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_SECONDS = 30
+ALBUM_COLLECT_DELAY = 1.0
+CONFLICT_TEXT = "Меню только что изменил кто-то другой. Проверьте его и повторите действие."
 
 
 class AdminStates(StatesGroup):
@@ -29,13 +56,28 @@ class AdminStates(StatesGroup):
     menu_mode_detail = State()
     menu_waiting_input = State()
     menu_confirm = State()
+    waiting_broadcast = State()
 
 
 def create_admin_router(
-    admin_ids: set[int], menu_repo: MenuRepository, storage: VideoStorage
+    admin_ids: set[int],
+    menu_repo: MenuRepository,
+    storage: VideoStorage,
+    metadata: VideoMetadata,
+    catalogue: Catalogue,
+    broadcaster: Broadcaster,
+    analytics: Analytics,
+    render_cache: RenderCache,
+    pipeline: ResponsePipeline,
+    history: MenuHistory,
+    profiler: SamplingProfiler,
+    monitor: Optional[LoopMonitor] = None,
+    executor: Optional[UpdateExecutor] = None,
 ) -> Router:
     router = Router(name="admin")
 
+    albums: dict[tuple[int, str], list[Message]] = {}
+
     def is_admin(user_id: int | None) -> bool:
         return bool(user_id and user_id in admin_ids)
 
@@ -43,9 +85,10 @@ def create_admin_router(
         markup = build_admin_root_menu()
         text = "Выберите режим администрирования:"
         if isinstance(message, Message):
-            await message.answer(text, reply_markup=markup)
+            sent = await message.answer(text, reply_markup=markup)
+            render_cache.remember(sent, text, markup)
         else:
-            await message.message.edit_text(text, reply_markup=markup)
+            await render_cache.edit_text(message.message, text, reply_markup=markup)
 
     @router.message(Command("admin"))
     async def admin_entry(message: Message, state: FSMContext) -> None:
@@ -65,6 +108,69 @@ def create_admin_router(
         await state.clear()
         await message.answer("Настройка отменена.")
 
+    @router.message(Command("broadcast"))
+    async def broadcast_entry(message: Message, state: FSMContext) -> None:
+        if not is_admin(message.from_user.id if message.from_user else None):
+            await message.answer("Доступ запрещен")
+            return
+
+        if broadcaster.is_running:
+            job = broadcaster.job
+            await message.answer(
+                "Рассылка уже идет. "
+                f"Доставлено: {job.sent}, ошибок: {job.failed}, заблокировали: {job.blocked}."
+            )
+            return
+
+        await state.set_state(AdminStates.waiting_broadcast)
+        await message.answer(
+            "Отправьте текст или видео для рассылки всем пользователям.\n"
+            "Для отмены используйте /cancel."
+        )
+
+    @router.message(Command("profile"))
+    async def profile_entry(message: Message, command: CommandObject) -> None:
+        if not is_admin(message.from_user.id if message.from_user else None):
+            await message.answer("Доступ запрещен")
+            return
+
+        seconds = DEFAULT_PROFILE_SECONDS
+        if command.args:
+            try:
+                seconds = int(command.args.strip())
+            except ValueError:
+                seconds = 0
+            if not 1 <= seconds <= profiler.max_duration:
+                await message.answer(
+                    f"Укажите длительность от 1 до {profiler.max_duration:.0f} секунд: /profile 30"
+                )
+                return
+
+        if profiler.is_running:
+            await message.answer("Профилирование уже идет. Дождитесь отчета.")
+            return
+
+        await message.answer(f"Профилирую процесс {seconds} с. Пришлю отчет по завершении.")
+        pipeline.run_in_background(run_profile(message, seconds))
+
+    async def run_profile(message: Message, seconds: int) -> None:
+        try:
+            report = await profiler.run(seconds)
+        except RuntimeError:
+            await message.answer("Профилирование уже идет. Дождитесь отчета.")
+            return
+        except Exception:
+            logger.exception("Profiling failed")
+            await message.answer("Не удалось выполнить профилирование.")
+            return
+
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        await message.answer(_format_profile(report))
+        await message.answer_document(
+            BufferedInputFile(report.folded.encode("utf-8"), filename=f"profile-{stamp}.folded"),
+            caption="Стеки в формате flamegraph (flamegraph.pl, speedscope).",
+        )
+
     @router.callback_query(AdminMenuCallback.filter())
     async def handle_callbacks(
         callback: CallbackQuery, callback_data: AdminMenuCallback, state: FSMContext
@@ -81,7 +187,8 @@ def create_admin_router(
                 await callback.answer("Меню пустое. Добавьте разделы в настройках меню.", show_alert=True)
                 return
             await state.set_state(AdminStates.choosing_category)
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 "Выберите раздел для обновления видео:",
                 reply_markup=build_admin_video_categories(menu),
             )
@@ -96,7 +203,8 @@ def create_admin_router(
             else:
                 menu = await menu_repo.get_sections()
                 await state.set_state(AdminStates.choosing_category)
-                await callback.message.edit_text(
+                await render_cache.edit_text(
+                    callback.message,
                     "Выберите раздел для обновления видео:",
                     reply_markup=build_admin_video_categories(menu),
                 )
@@ -110,7 +218,8 @@ def create_admin_router(
                 return
             await state.update_data(video_section_id=section.id)
             await state.set_state(AdminStates.choosing_mode)
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 f"{section.name}: выберите режим для изменения видео",
                 reply_markup=build_admin_video_modes(section),
             )
@@ -128,23 +237,93 @@ def create_admin_router(
             section, mode = result
             await state.update_data(video_section_id=section.id, video_mode_id=mode.id)
             await state.set_state(AdminStates.waiting_video)
-            current_video = await storage.get_video(section.name, mode.name)
-            status = "установлено" if current_video else "не задано"
-            await callback.message.edit_text(
+            current_videos = await storage.get_videos(section.name, mode.name)
+            if not current_videos:
+                status = "не задано"
+            elif len(current_videos) == 1:
+                status = "установлено"
+            else:
+                status = f"{len(current_videos)} шт."
+            await render_cache.edit_text(
+                callback.message,
                 (
                     f"{section.name} · {mode.name}\n"
                     f"Текущее видео: {status}.\n"
-                    "Отправьте новое видео сообщением, чтобы обновить его.\n"
+                    "Отправьте новое видео сообщением, чтобы обновить его, или альбом "
+                    "из нескольких видео — они будут отправляться пользователю вместе.\n"
                     "Для отмены используйте /cancel."
                 ),
             )
             await callback.answer()
             return
 
+        if action == AdminActions.STATS:
+            sections = await menu_repo.get_sections()
+            await state.set_state(AdminStates.choosing_action)
+            text = (
+                f"{_format_stats(analytics, sections)}\n"
+                f"Повторных правок пропущено: {render_cache.edits_saved}\n"
+                f"{_format_latency(pipeline)}\n"
+                f"{_format_loop_lag(monitor)}\n"
+                f"{_format_executor(executor)}"
+            )
+            await render_cache.edit_text(
+                callback.message, text, reply_markup=build_admin_stats()
+            )
+            await callback.answer()
+            return
+
+        if action == AdminActions.HISTORY:
+            versions = history.recent()
+            await state.set_state(AdminStates.choosing_action)
+            await render_cache.edit_text(
+                callback.message,
+                _format_history(versions),
+                reply_markup=build_admin_history(versions),
+            )
+            await callback.answer()
+            return
+
+        if action == AdminActions.HISTORY_ROLLBACK:
+            version = history.get(int(callback_data.section_id or 0))
+            if not version:
+                await callback.answer("Версия не найдена", show_alert=True)
+                return
+            await render_cache.edit_text(
+                callback.message,
+                f"Откатить меню и видео к версии #{version.number} ({version.change})?",
+                reply_markup=build_confirmation_keyboard(
+                    AdminActions.HISTORY_ROLLBACK_CONFIRM,
+                    AdminActions.HISTORY,
+                    str(version.number),
+                ),
+            )
+            await callback.answer()
+            return
+
+        if action == AdminActions.HISTORY_ROLLBACK_CONFIRM:
+            try:
+                await history.rollback(int(callback_data.section_id or 0))
+            except KeyError:
+                await callback.answer("Версия не найдена", show_alert=True)
+                return
+            except CatalogueConflict:
+                await callback.answer(CONFLICT_TEXT, show_alert=True)
+                return
+            versions = history.recent()
+            await render_cache.edit_text(
+                callback.message,
+                _format_history(versions),
+                reply_markup=build_admin_history(versions),
+            )
+            await callback.answer("Откат выполнен")
+            return
+
         if action == AdminActions.MENU:
             sections = await menu_repo.get_sections()
             await state.set_state(AdminStates.menu_sections)
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 "Управление меню. Выберите раздел:",
                 reply_markup=build_admin_menu_sections(sections),
             )
@@ -160,7 +339,8 @@ def create_admin_router(
         if action == AdminActions.MENU_ADD_SECTION:
             await state.set_state(AdminStates.menu_waiting_input)
             await state.update_data(menu_task="add_section")
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 "Введите название нового раздела:",
             )
             await callback.answer()
@@ -169,7 +349,8 @@ def create_admin_router(
         if action == AdminActions.MENU_SECTION_BACK:
             sections = await menu_repo.get_sections()
             await state.set_state(AdminStates.menu_sections)
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 "Управление меню. Выберите раздел:",
                 reply_markup=build_admin_menu_sections(sections),
             )
@@ -183,13 +364,36 @@ def create_admin_router(
                 return
             await state.update_data(menu_section_id=section.id)
             await state.set_state(AdminStates.menu_section_detail)
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 f"Раздел «{section.name}». Выберите действие:",
                 reply_markup=build_admin_menu_section(section),
             )
             await callback.answer()
             return
 
+        if action in (AdminActions.MENU_SECTION_LINK, AdminActions.MENU_MODE_LINK):
+            is_mode = action == AdminActions.MENU_MODE_LINK
+            entity_id = (callback_data.mode_id if is_mode else callback_data.section_id) or ""
+            resolved = await menu_repo.resolve(entity_id)
+            if resolved is None or (resolved[1] is not None) != is_mode:
+                await callback.answer(
+                    "Режим не найден" if is_mode else "Раздел не найден", show_alert=True
+                )
+                return
+            section, mode = resolved
+            try:
+                link = await create_start_link(callback.bot, entity_id)
+            except ValueError:
+                await callback.answer(
+                    "ID не подходит для ссылки: допустимы A-Z, a-z, 0-9, _ и -", show_alert=True
+                )
+                return
+            title = f"{section.name} · {mode.name}" if mode else section.name
+            await callback.message.answer(f"Ссылка на «{html.escape(title)}»:\n{link}")
+            await callback.answer()
+            return
+
         if action == AdminActions.MENU_SECTION_RENAME:
             section = await menu_repo.get_section(callback_data.section_id)
             if not section:
@@ -199,9 +403,9 @@ def create_admin_router(
             await state.update_data(
                 menu_task="rename_section",
                 menu_section_id=section.id,
-                previous_section_name=section.name,
             )
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 f"Введите новое название для раздела «{section.name}»:",
             )
             await callback.answer()
@@ -218,7 +422,8 @@ def create_admin_router(
                 menu_section_id=section.id,
                 menu_section_name=section.name,
             )
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 f"Удалить раздел «{section.name}» и все его режимы?",
                 reply_markup=build_confirmation_keyboard(
                     AdminActions.MENU_SECTION_DELETE_CONFIRM,
@@ -234,16 +439,21 @@ def create_admin_router(
             if data.get("menu_task") != "delete_section":
                 await callback.answer("Операция уже отменена", show_alert=True)
                 return
+            work = catalogue.begin()
             try:
-                section = await menu_repo.delete_section(callback_data.section_id)
+                section = work.delete_section(callback_data.section_id)
+                await work.commit()
             except KeyError:
                 await callback.answer("Раздел не найден", show_alert=True)
                 return
-            await storage.delete_section(section.name)
+            except CatalogueConflict:
+                await callback.answer(CONFLICT_TEXT, show_alert=True)
+                return
             await state.set_state(AdminStates.menu_sections)
             await state.update_data(menu_task=None)
             sections = await menu_repo.get_sections()
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 "Раздел удален. Выберите дальнейшее действие:",
                 reply_markup=build_admin_menu_sections(sections),
             )
@@ -257,7 +467,8 @@ def create_admin_router(
                 return
             await state.set_state(AdminStates.menu_section_detail)
             await state.update_data(menu_task=None)
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 f"Раздел «{section.name}». Выберите действие:",
                 reply_markup=build_admin_menu_section(section),
             )
@@ -274,7 +485,8 @@ def create_admin_router(
                 menu_task="add_mode",
                 menu_section_id=section.id,
             )
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 f"Введите название нового режима для раздела «{section.name}»:",
             )
             await callback.answer()
@@ -294,7 +506,8 @@ def create_admin_router(
                 menu_mode_id=mode.id,
             )
             await state.set_state(AdminStates.menu_mode_detail)
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 f"{section.name} · {mode.name}. Выберите действие:",
                 reply_markup=build_admin_menu_mode(section, mode.id),
             )
@@ -309,7 +522,8 @@ def create_admin_router(
                 await callback.answer("Раздел не найден", show_alert=True)
                 return
             await state.set_state(AdminStates.menu_section_detail)
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 f"Раздел «{section.name}». Выберите действие:",
                 reply_markup=build_admin_menu_section(section),
             )
@@ -330,9 +544,9 @@ def create_admin_router(
                 menu_task="rename_mode",
                 menu_section_id=section.id,
                 menu_mode_id=mode.id,
-                previous_mode_name=mode.name,
             )
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 f"Введите новое название для режима «{mode.name}»:",
             )
             await callback.answer()
@@ -354,7 +568,8 @@ def create_admin_router(
                 menu_mode_id=mode.id,
                 menu_mode_name=mode.name,
             )
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 f"Удалить режим «{mode.name}» в разделе «{section.name}»?",
                 reply_markup=build_confirmation_keyboard(
                     AdminActions.MENU_MODE_DELETE_CONFIRM,
@@ -371,17 +586,20 @@ def create_admin_router(
             if data.get("menu_task") != "delete_mode":
                 await callback.answer("Операция уже отменена", show_alert=True)
                 return
+            work = catalogue.begin()
             try:
-                section, deleted_mode = await menu_repo.delete_mode(
-                    callback_data.section_id, callback_data.mode_id or ""
-                )
+                section, _ = work.delete_mode(callback_data.section_id, callback_data.mode_id or "")
+                await work.commit()
             except KeyError:
                 await callback.answer("Режим не найден", show_alert=True)
                 return
-            await storage.delete_mode(section.name, deleted_mode.name)
+            except CatalogueConflict:
+                await callback.answer(CONFLICT_TEXT, show_alert=True)
+                return
             await state.set_state(AdminStates.menu_section_detail)
             await state.update_data(menu_task=None, menu_mode_id=None)
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 f"Раздел «{section.name}». Выберите действие:",
                 reply_markup=build_admin_menu_section(section),
             )
@@ -395,7 +613,8 @@ def create_admin_router(
                 return
             await state.set_state(AdminStates.menu_section_detail)
             await state.update_data(menu_task=None)
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 f"Раздел «{section.name}». Выберите действие:",
                 reply_markup=build_admin_menu_section(section),
             )
@@ -413,6 +632,24 @@ def create_admin_router(
             await message.answer("Пожалуйста, отправьте видеофайл.")
             return
 
+        if message.media_group_id:
+            # Album items arrive as separate messages: collect them, then save once.
+            key = (message.chat.id, message.media_group_id)
+            album = albums.get(key)
+            if album is None:
+                album = albums[key] = []
+                pipeline.run_in_background(save_album(key, message, state))
+            album.append(message)
+            return
+
+        await save_videos(message, state, [message.video])
+
+    async def save_album(key: tuple[int, str], message: Message, state: FSMContext) -> None:
+        await asyncio.sleep(ALBUM_COLLECT_DELAY)
+        album = sorted(albums.pop(key, []), key=lambda item: item.message_id)
+        await save_videos(message, state, [item.video for item in album if item.video])
+
+    async def save_videos(message: Message, state: FSMContext, videos: list[Video]) -> None:
         data = await state.get_data()
         section_id = data.get("video_section_id")
         mode_id = data.get("video_mode_id")
@@ -428,8 +665,12 @@ def create_admin_router(
             return
         section, mode = result
 
-        await storage.set_video(section.name, mode.name, message.video.file_id)
-        await message.answer("Видео обновлено.")
+        await metadata.remember(videos)
+        await storage.set_videos(section.name, mode.name, [video.file_id for video in videos])
+        if len(videos) == 1:
+            await message.answer("Видео обновлено.")
+        else:
+            await message.answer(f"Сохранено видео: {len(videos)}.")
 
         await state.set_state(AdminStates.choosing_mode)
         await message.answer(
@@ -437,6 +678,32 @@ def create_admin_router(
             reply_markup=build_admin_video_modes(section),
         )
 
+    @router.message(AdminStates.waiting_broadcast)
+    async def on_broadcast_content(message: Message, state: FSMContext) -> None:
+        if not is_admin(message.from_user.id if message.from_user else None):
+            return
+
+        if message.video:
+            started = await broadcaster.start(
+                "video",
+                message.video.file_id,
+                caption=message.html_text or None,
+                notify_chat_id=message.chat.id,
+            )
+        elif message.text:
+            started = await broadcaster.start(
+                "text", message.html_text, notify_chat_id=message.chat.id
+            )
+        else:
+            await message.answer("Пожалуйста, отправьте текст или видео.")
+            return
+
+        await state.clear()
+        if not started:
+            await message.answer("Рассылка уже идет. Дождитесь ее завершения.")
+            return
+        await message.answer("Рассылка запущена. Сообщу, когда она завершится.")
+
     @router.message(AdminStates.menu_waiting_input)
     async def on_menu_input(message: Message, state: FSMContext) -> None:
         if not is_admin(message.from_user.id if message.from_user else None):
@@ -451,12 +718,16 @@ def create_admin_router(
         task = data.get("menu_task")
 
         if task == "add_section":
-            sections = await menu_repo.get_sections()
-            if any(section.name.lower() == text.lower() for section in sections):
+            work = catalogue.begin()
+            try:
+                section = work.add_section(text)
+                await work.commit()
+            except ValueError:
                 await message.answer("Раздел с таким названием уже существует.")
                 return
-            section = await menu_repo.add_section(text)
-            await storage.add_section(section)
+            except CatalogueConflict:
+                await message.answer(CONFLICT_TEXT)
+                return
             await state.set_state(AdminStates.menu_section_detail)
             await state.update_data(menu_section_id=section.id, menu_task=None)
             await message.answer(
@@ -467,22 +738,23 @@ def create_admin_router(
 
         if task == "rename_section":
             section_id = data.get("menu_section_id")
-            previous_name = data.get("previous_section_name")
-            if not section_id or not previous_name:
+            if not section_id:
                 await message.answer("Не удалось определить раздел. Начните заново.")
                 await state.clear()
                 return
-            sections = await menu_repo.get_sections()
-            if any(section.name.lower() == text.lower() and section.id != section_id for section in sections):
-                await message.answer("Другой раздел уже имеет такое название.")
-                return
-            updated_section = await menu_repo.rename_section(section_id, text)
+            work = catalogue.begin()
             try:
-                await storage.rename_section(previous_name, updated_section.name)
+                updated_section = work.rename_section(section_id, text)
+                await work.commit()
+            except KeyError:
+                await message.answer("Раздел не найден. Начните заново.")
+                await state.clear()
+                return
             except ValueError:
-                await message.answer(
-                    "Не удалось переименовать раздел в хранилище видео. Имя уже используется."
-                )
+                await message.answer("Другой раздел уже имеет такое название.")
+                return
+            except CatalogueConflict:
+                await message.answer(CONFLICT_TEXT)
                 return
             await state.set_state(AdminStates.menu_section_detail)
             await state.update_data(menu_section_id=updated_section.id, menu_task=None)
@@ -498,16 +770,21 @@ def create_admin_router(
                 await message.answer("Не удалось определить раздел. Начните заново.")
                 await state.clear()
                 return
-            section = await menu_repo.get_section(section_id)
+            work = catalogue.begin()
+            section = work.section(section_id)
             if not section:
                 await message.answer("Раздел не найден. Начните заново.")
                 await state.clear()
                 return
-            if any(mode.name.lower() == text.lower() for mode in section.modes):
+            try:
+                updated_section, new_mode = work.add_mode(section.id, text)
+                await work.commit()
+            except ValueError:
                 await message.answer("Режим с таким названием уже существует в этом разделе.")
                 return
-            updated_section, new_mode = await menu_repo.add_mode(section.id, text)
-            await storage.add_mode(updated_section.name, new_mode.name)
+            except CatalogueConflict:
+                await message.answer(CONFLICT_TEXT)
+                return
             await state.set_state(AdminStates.menu_section_detail)
             await state.update_data(menu_section_id=updated_section.id, menu_task=None)
             await message.answer(
@@ -519,28 +796,28 @@ def create_admin_router(
         if task == "rename_mode":
             section_id = data.get("menu_section_id")
             mode_id = data.get("menu_mode_id")
-            previous_mode_name = data.get("previous_mode_name")
-            if not section_id or not mode_id or not previous_mode_name:
+            if not section_id or not mode_id:
                 await message.answer("Не удалось определить режим. Начните заново.")
                 await state.clear()
                 return
-            section = await menu_repo.get_section(section_id)
+            work = catalogue.begin()
+            section = work.section(section_id)
             if not section:
                 await message.answer("Раздел не найден. Начните заново.")
                 await state.clear()
                 return
-            if any(mode.name.lower() == text.lower() and mode.id != mode_id for mode in section.modes):
-                await message.answer("Режим с таким названием уже существует.")
-                return
-            updated_section, updated_mode = await menu_repo.rename_mode(section_id, mode_id, text)
             try:
-                await storage.rename_mode(
-                    updated_section.name, previous_mode_name, updated_mode.name
-                )
+                updated_section, updated_mode = work.rename_mode(section_id, mode_id, text)
+                await work.commit()
+            except KeyError:
+                await message.answer("Режим не найден. Начните заново.")
+                await state.clear()
+                return
             except ValueError:
-                await message.answer(
-                    "Не удалось переименовать режим в хранилище видео. Имя уже используется."
-                )
+                await message.answer("Режим с таким названием уже существует.")
+                return
+            except CatalogueConflict:
+                await message.answer(CONFLICT_TEXT)
                 return
             await state.set_state(AdminStates.menu_mode_detail)
             await state.update_data(
@@ -556,3 +833,106 @@ def create_admin_router(
         await message.answer("Неизвестная операция. Используйте /cancel и попробуйте снова.")
 
     return router
+
+
+def _format_stats(analytics: Analytics, sections: list[MenuSection], limit: int = 5) -> str:
+    section_names = {section.id: section.name for section in sections}
+    mode_names = {
+        mode.id: f"{section.name} · {mode.name}"
+        for section in sections
+        for mode in section.modes
+    }
+
+    lines = ["📊 Статистика за 7 дней", "", "Популярные разделы:"]
+    top_sections = analytics.top(events.CATEGORY_OPEN, limit)
+    if not top_sections:
+        lines.append("— нет данных")
+    for section_id, _, count in top_sections:
+        lines.append(f"{section_names.get(section_id, section_id)}: {count}")
+
+    lines.extend(["", "Популярные видео:"])
+    top_videos = analytics.top(events.VIDEO_SENT, limit)
+    if not top_videos:
+        lines.append("— нет данных")
+    for _, mode_id, count in top_videos:
+        lines.append(f"{mode_names.get(mode_id, mode_id)}: {count}")
+
+    last_day = analytics.total(events.VIDEO_SENT, buckets=24)
+    previous_day = analytics.total(events.VIDEO_SENT, buckets=24, offset=24)
+    uploads = analytics.total(events.UPLOAD, buckets=24)
+    lines.extend(
+        [
+            "",
+            f"Видео за 24 часа: {last_day} (за предыдущие 24 часа: {previous_day})",
+            f"Загрузок файлов за 24 часа: {uploads}",
+            f"По часам: {_sparkline(analytics.trend(events.VIDEO_SENT, 24))}",
+        ]
+    )
+    return "\n".join(lines)
+
+
+def _format_history(versions: list[Version]) -> str:
+    if not versions:
+        return "История изменений пуста."
+    lines = ["Последние изменения (нажмите номер, чтобы откатиться):", ""]
+    for version in versions:
+        created = datetime.fromtimestamp(version.created_at).strftime("%d.%m %H:%M")
+        lines.append(f"#{version.number} · {created} · {version.change}")
+    return "\n".join(lines)
+
+
+def _format_latency(pipeline: ResponsePipeline) -> str:
+    summary = pipeline.latency.summary()
+    if not summary:
+        return "Время до отклика: нет данных"
+    lines = ["Время до отклика (среднее / p95):"]
+    for handler, stats in sorted(summary.items()):
+        lines.append(f"{handler}: {stats.avg_ms:.0f} / {stats.p95_ms:.0f} мс")
+    return "\n".join(lines)
+
+
+def _format_loop_lag(monitor: Optional[LoopMonitor]) -> str:
+    summary = monitor.summary() if monitor is not None else None
+    if summary is None:
+        return "Задержка event loop: нет данных"
+    return (
+        f"Задержка event loop (среднее / p95 / макс): {summary.avg_ms:.1f} / "
+        f"{summary.p95_ms:.1f} / {summary.max_ms:.0f} мс, зависаний: {summary.stalls}"
+    )
+
+
+def _format_executor(executor: Optional[UpdateExecutor]) -> str:
+    if executor is None:
+        return "Очередь апдейтов: нет данных"
+    stats = executor.stats()
+    return (
+        f"Очередь апдейтов: ждут {stats.pending} (пик {stats.peak_pending} из "
+        f"{executor.queue_limit}), выполняются {stats.running} из {executor.concurrency}, "
+        f"чатов {stats.chats}\n"
+        f"Ожидание в очереди (среднее / макс): {stats.avg_wait_ms:.0f} / "
+        f"{stats.max_wait_ms:.0f} мс, притормаживаний приема: {stats.throttled}"
+    )
+
+
+def _format_profile(report: ProfileReport, width: int = 60) -> str:
+    lines = [
+        f"Профиль: {report.samples} замеров за {report.duration:.0f} с "
+        f"(интервал {report.interval * 1000:.0f} мс)",
+        "",
+        "По общему времени:",
+    ]
+    for label, count in report.top_cumulative:
+        lines.append(f"{report.share(count):5.1f}%  {label[:width]}")
+    lines += ["", "По собственному времени:"]
+    for label, count in report.top_self:
+        lines.append(f"{report.share(count):5.1f}%  {label[:width]}")
+    text = html.escape("\n".join(lines))
+    return f"<pre>{text}</pre>"
+
+
+def _sparkline(values: list[int]) -> str:
+    ticks = "▁▂▃▄▅▆▇█"
+    peak = max(values, default=0)
+    if not peak:
+        return ticks[0] * len(values)
+    return "".join(ticks[value * (len(ticks) - 1) // peak] for value in values)
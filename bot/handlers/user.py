@@ -1,108 +1,285 @@
+import asyncio
+import time
 from pathlib import Path
+from typing import List
 
 from aiogram import F, Router
-from aiogram.filters import CommandStart
-from aiogram.types import CallbackQuery, FSInputFile, Message
+from aiogram.filters import CommandObject, CommandStart
+from aiogram.types import CallbackQuery, Message
+from aiogram.utils.chat_action import ChatActionSender
 
+from ..config import BASE_DIR, MenuMode, MenuSection
+
+from ..services import analytics as events
+from ..services import tracing
+from ..services.analytics import Analytics
+from ..services.delivery import local_source, send_videos
+from ..services.drip import DripScheduler
 from ..services.menu_repository import MenuRepository
+from ..services.render_cache import RenderCache
+from ..services.response import ResponsePipeline
 from ..keyboards import (
     UserMenuCallback,
     build_main_menu,
     build_modes_menu,
 )
 from ..services.storage import VideoStorage
+from ..services.users import UserRegistry
+from ..services.video_meta import VideoMeta, VideoMetadata, probe
 
 
-def create_user_router(menu_repo: MenuRepository, storage: VideoStorage) -> Router:
+def create_user_router(
+    menu_repo: MenuRepository,
+    storage: VideoStorage,
+    metadata: VideoMetadata,
+    users: UserRegistry,
+    analytics: Analytics,
+    render_cache: RenderCache,
+    pipeline: ResponsePipeline,
+    drip: DripScheduler,
+) -> Router:
     router = Router(name="user")
 
-    base_dir = Path(__file__).resolve().parent.parent
+    pending_uploads: set[tuple[int, str]] = set()
 
     @router.message(CommandStart())
-    async def cmd_start(message: Message) -> None:
-        menu = await menu_repo.get_sections()
+    async def cmd_start(message: Message, command: CommandObject) -> None:
+        started = time.perf_counter()
+        if command.args:
+            # t.me/<bot>?start=<section or mode ID> from a shared deep link.
+            _, resolved = await asyncio.gather(
+                users.add(message.chat.id), menu_repo.resolve(command.args)
+            )
+            if resolved is not None:
+                await open_deep_link(message, *resolved)
+                pipeline.observe("cmd_start", started)
+                return
+            menu = await menu_repo.get_sections()
+            text = "Ссылка устарела. Выберите зону, которую хотите проработать:"
+        else:
+            _, menu = await asyncio.gather(
+                users.add(message.chat.id), menu_repo.get_sections()
+            )
+            text = "Выберите зону, которую хотите проработать:"
         if not menu:
             await message.answer(
                 "Меню пока не настроено. Обратитесь к администратору.",
             )
+            pipeline.observe("cmd_start", started)
             return
 
-        await message.answer(
-            "Выберите зону, которую хотите проработать:",
-            reply_markup=build_main_menu(menu),
-        )
+        markup = build_main_menu(menu)
+        sent = await message.answer(text, reply_markup=markup)
+        pipeline.observe("cmd_start", started)
+        render_cache.remember(sent, text, markup)
+
+    async def open_deep_link(message: Message, section: MenuSection, mode: MenuMode | None) -> None:
+        if mode is not None:
+            analytics.record(events.MODE_OPEN, section.id, mode.id)
+            await send_mode(message, section, mode)
+            return
+        analytics.record(events.CATEGORY_OPEN, section.id)
+        text = f"{section.name}: выберите режим занятий"
+        markup = build_modes_menu(section, drip.is_subscribed(message.chat.id, section.id))
+        sent = await message.answer(text, reply_markup=markup)
+        render_cache.remember(sent, text, markup)
 
     @router.callback_query(UserMenuCallback.filter(F.action == "category"))
     async def on_category(callback: CallbackQuery, callback_data: UserMenuCallback) -> None:
+        response = pipeline.begin("on_category", callback)
         section = await menu_repo.get_section(callback_data.section_id)
         if not section:
-            await callback.answer("Раздел недоступен", show_alert=True)
+            response.ack("Раздел недоступен", show_alert=True)
+            await response.finish()
+            return
+
+        response.ack()
+        analytics.record(events.CATEGORY_OPEN, section.id)
+        await render_cache.edit_text(
+            callback.message,
+            f"{section.name}: выберите режим занятий",
+            reply_markup=build_modes_menu(
+                section, drip.is_subscribed(callback.message.chat.id, section.id)
+            ),
+        )
+        await response.finish()
+
+    @router.callback_query(UserMenuCallback.filter(F.action.in_({"drip", "drip_stop"})))
+    async def on_drip(callback: CallbackQuery, callback_data: UserMenuCallback) -> None:
+        response = pipeline.begin("on_drip", callback)
+        section = await menu_repo.get_section(callback_data.section_id)
+        if not section or not section.modes:
+            response.ack("Раздел недоступен", show_alert=True)
+            await response.finish()
             return
 
-        await callback.message.edit_text(
+        chat_id = callback.message.chat.id
+        if callback_data.action == "drip":
+            due = await drip.subscribe(chat_id, section.id)
+            if due is None:
+                response.ack("Вы уже подписаны на эту программу")
+            else:
+                response.ack(
+                    f"Первое видео придёт {time.strftime('%d.%m в %H:%M', time.localtime(due))}, "
+                    "дальше — по одному каждый день.",
+                    show_alert=True,
+                )
+        else:
+            await drip.unsubscribe(chat_id, section.id)
+            response.ack("Вы отписались от программы")
+        await render_cache.edit_text(
+            callback.message,
             f"{section.name}: выберите режим занятий",
-            reply_markup=build_modes_menu(section),
+            reply_markup=build_modes_menu(section, drip.is_subscribed(chat_id, section.id)),
         )
-        await callback.answer()
+        await response.finish()
 
     @router.callback_query(UserMenuCallback.filter(F.action == "back"))
     async def on_back(callback: CallbackQuery) -> None:
+        response = pipeline.begin("on_back", callback)
+        response.ack()
         menu = await menu_repo.get_sections()
         if not menu:
-            await callback.message.edit_text(
+            await render_cache.edit_text(
+                callback.message,
                 "Меню пока не настроено. Обратитесь к администратору.",
             )
-            await callback.answer()
+            await response.finish()
             return
-        await callback.message.edit_text(
+        await render_cache.edit_text(
+            callback.message,
             "Выберите зону, которую хотите проработать:",
             reply_markup=build_main_menu(menu),
         )
-        await callback.answer()
+        await response.finish()
 
     @router.callback_query(UserMenuCallback.filter(F.action == "mode"))
     async def on_mode(callback: CallbackQuery, callback_data: UserMenuCallback) -> None:
+        response = pipeline.begin("on_mode", callback)
         if not callback_data.mode_id:
-            await callback.answer("Режим недоступен", show_alert=True)
+            response.ack("Режим недоступен", show_alert=True)
+            await response.finish()
             return
 
         result = await menu_repo.get_mode(callback_data.section_id, callback_data.mode_id)
         if not result:
-            await callback.answer("Раздел недоступен", show_alert=True)
+            response.ack("Раздел недоступен", show_alert=True)
+            await response.finish()
             return
         section, mode = result
+        response.ack()
+        analytics.record(events.MODE_OPEN, section.id, mode.id)
+        await send_mode(callback.message, section, mode)
+        await response.finish()
 
-        video_id = await storage.get_video(section.name, mode.name)
-
-        if video_id:
-            video_source = _resolve_video_reference(video_id, base_dir)
-            message_sent = await callback.message.answer_video(
-                video=video_source,
-                caption=f"{section.name} · {mode.name}",
+    async def send_mode(message: Message, section: MenuSection, mode: MenuMode) -> None:
+        videos = await storage.get_videos(section.name, mode.name)
+        if not videos:
+            await message.answer(
+                "Видео пока не добавлено. Обратитесь к администратору.",
             )
+            return
 
-            if isinstance(video_source, FSInputFile) and message_sent.video:
-                await storage.set_video(section.name, mode.name, message_sent.video.file_id)
+        caption = f"{section.name} · {mode.name}"
+        with tracing.span("resolve_video_reference", videos=len(videos)):
+            local_paths = await asyncio.to_thread(_local_video_paths, videos, BASE_DIR)
+        if any(local_paths):
+            pending_key = (message.chat.id, f"{section.id}:{mode.id}")
+            if pending_key not in pending_uploads:
+                pending_uploads.add(pending_key)
+                pipeline.run_in_background(
+                    send_local_videos(
+                        message, section, mode, videos, local_paths, caption, pending_key
+                    )
+                )
         else:
-            await callback.message.answer(
-                "Видео пока не добавлено. Обратитесь к администратору.",
+            meta = metadata.lookup(videos)
+            sent = await send_videos(message.bot, message.chat.id, videos, caption, meta)
+            analytics.record(events.VIDEO_SENT, section.id, mode.id)
+            if None in meta:
+                # Videos saved before metadata was recorded: learn it from this send.
+                await metadata.remember_sent(sent)
+
+    async def send_local_videos(
+        message: Message,
+        section: MenuSection,
+        mode: MenuMode,
+        videos: List[str],
+        local_paths: List[Path | None],
+        caption: str,
+        pending_key: tuple[int, str],
+    ) -> None:
+        uploaded_here = False
+        api = message.bot.session.api
+
+        async def upload() -> List[str] | None:
+            nonlocal uploaded_here
+            uploaded_here = True
+            sources = [
+                video if path is None else local_source(api, path)
+                for video, path in zip(videos, local_paths)
+            ]
+            async with ChatActionSender.upload_video(chat_id=message.chat.id, bot=message.bot):
+                with tracing.span("probe_videos", videos=len(local_paths)):
+                    probed = await asyncio.to_thread(_probe_videos, local_paths)
+                meta = [
+                    probed_meta if path is not None else metadata.get(video)
+                    for video, path, probed_meta in zip(videos, local_paths, probed)
+                ]
+                sent = await send_videos(message.bot, message.chat.id, sources, caption, meta)
+            analytics.record(events.UPLOAD, section.id, mode.id)
+            await metadata.remember_sent(sent)
+            file_ids = [item.video.file_id for item in sent if item.video]
+            if len(file_ids) != len(videos):
+                return None
+            await storage.replace_videos(
+                section.name,
+                mode.name,
+                {
+                    video: file_id
+                    for video, path, file_id in zip(videos, local_paths, file_ids)
+                    if path is not None
+                },
             )
+            return file_ids
 
-        await callback.answer()
+        try:
+            upload_key = "upload:" + "|".join(str(path) for path in local_paths if path)
+            file_ids = await pipeline.shared(upload_key, upload)
+            if not uploaded_here:
+                if not file_ids:
+                    return
+                # Another chat was already uploading these files; reuse their file_ids.
+                await send_videos(
+                    message.bot, message.chat.id, file_ids, caption, metadata.lookup(file_ids)
+                )
+            analytics.record(events.VIDEO_SENT, section.id, mode.id)
+        finally:
+            pending_uploads.discard(pending_key)
 
     return router
 
 
-def _resolve_video_reference(value: str, base_dir: Path) -> str | FSInputFile:
+def _local_video_paths(videos: List[str], base_dir: Path) -> List[Path | None]:
+    # Runs in a worker thread: the existence checks hit the filesystem.
+    return [_local_video_path(video, base_dir) for video in videos]
+
+
+def _probe_videos(local_paths: List[Path | None]) -> List[VideoMeta | None]:
+    # Runs in a worker thread: probing reads the file headers.
+    return [probe(path) if path is not None else None for path in local_paths]
+
+
+def _local_video_path(value: str, base_dir: Path) -> Path | None:
     lowered = value.lower()
     if lowered.startswith("http://") or lowered.startswith("https://"):
-        return value
+        return None
 
     candidate = Path(value)
     if not candidate.is_absolute():
         candidate = (base_dir / candidate).resolve()
 
     if candidate.exists() and candidate.is_file():
-        return FSInputFile(str(candidate))
+        return candidate
 
-    return value
+    return None
@@ -4,6 +4,7 @@ from aiogram.filters.callback_data import CallbackData
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from .config import MenuSection
+from .services.history import Version
 
 
 class UserMenuCallback(CallbackData, prefix="user-menu"):
@@ -24,6 +25,12 @@ class AdminActions:
     VIDEO_MODE = "vid_mode"
     VIDEO_BACK = "vid_back"
 
+    STATS = "stats"
+
+    HISTORY = "hist"
+    HISTORY_ROLLBACK = "hist_rb"
+    HISTORY_ROLLBACK_CONFIRM = "hist_rb_yes"
+
     MENU = "menu"
     MENU_BACK = "menu_back"
     MENU_SECTION = "menu_sec"
@@ -33,6 +40,7 @@ class AdminActions:
     MENU_SECTION_DELETE_CONFIRM = "menu_sec_del_yes"
     MENU_SECTION_DELETE_CANCEL = "menu_sec_del_no"
     MENU_SECTION_BACK = "menu_sec_back"
+    MENU_SECTION_LINK = "menu_sec_link"
 
     MENU_MODE_SELECT = "menu_mode"
     MENU_MODE_ADD = "menu_mode_add"
@@ -41,6 +49,7 @@ class AdminActions:
     MENU_MODE_DELETE_CONFIRM = "menu_mode_del_yes"
     MENU_MODE_DELETE_CANCEL = "menu_mode_del_no"
     MENU_MODE_BACK = "menu_mode_back"
+    MENU_MODE_LINK = "menu_mode_link"
 
 
 def build_main_menu(menu: Iterable[MenuSection]):
@@ -54,7 +63,7 @@ def build_main_menu(menu: Iterable[MenuSection]):
     return builder.as_markup()
 
 
-def build_modes_menu(section: MenuSection):
+def build_modes_menu(section: MenuSection, subscribed: bool = False):
     builder = InlineKeyboardBuilder()
     for mode in section.modes:
         builder.button(
@@ -63,6 +72,13 @@ def build_modes_menu(section: MenuSection):
                 action="mode", section_id=section.id, mode_id=mode.id
             ),
         )
+    if section.modes:
+        builder.button(
+            text="🔕 Отписаться от программы" if subscribed else "📅 Присылать по одному в день",
+            callback_data=UserMenuCallback(
+                action="drip_stop" if subscribed else "drip", section_id=section.id
+            ),
+        )
     builder.button(
         text="🔙 Назад",
         callback_data=UserMenuCallback(action="back", section_id="", mode_id=None),
@@ -81,6 +97,45 @@ def build_admin_root_menu():
         text="🗂 Меню",
         callback_data=AdminMenuCallback(action=AdminActions.MENU, section_id="", mode_id=None),
     )
+    builder.button(
+        text="📊 Статистика",
+        callback_data=AdminMenuCallback(action=AdminActions.STATS, section_id="", mode_id=None),
+    )
+    builder.button(
+        text="🕘 История",
+        callback_data=AdminMenuCallback(action=AdminActions.HISTORY, section_id="", mode_id=None),
+    )
+    builder.adjust(1)
+    return builder.as_markup()
+
+
+def build_admin_history(versions: Iterable[Version]):
+    builder = InlineKeyboardBuilder()
+    for version in versions:
+        builder.button(
+            text=f"↩️ #{version.number}",
+            callback_data=AdminMenuCallback(
+                action=AdminActions.HISTORY_ROLLBACK, section_id=str(version.number)
+            ),
+        )
+    builder.button(
+        text="🔙 Назад",
+        callback_data=AdminMenuCallback(action=AdminActions.MENU_BACK, section_id="", mode_id=None),
+    )
+    builder.adjust(5)
+    return builder.as_markup()
+
+
+def build_admin_stats():
+    builder = InlineKeyboardBuilder()
+    builder.button(
+        text="🔄 Обновить",
+        callback_data=AdminMenuCallback(action=AdminActions.STATS, section_id="", mode_id=None),
+    )
+    builder.button(
+        text="🔙 Назад",
+        callback_data=AdminMenuCallback(action=AdminActions.MENU_BACK, section_id="", mode_id=None),
+    )
     builder.adjust(1)
     return builder.as_markup()
 
@@ -171,6 +226,12 @@ def build_admin_menu_section(section: MenuSection):
             action=AdminActions.MENU_SECTION_DELETE, section_id=section.id, mode_id=None
         ),
     )
+    builder.button(
+        text="🔗 Ссылка на раздел",
+        callback_data=AdminMenuCallback(
+            action=AdminActions.MENU_SECTION_LINK, section_id=section.id, mode_id=None
+        ),
+    )
     builder.button(
         text="🔙 Назад",
         callback_data=AdminMenuCallback(
@@ -195,6 +256,12 @@ def build_admin_menu_mode(section: MenuSection, mode_id: str):
             action=AdminActions.MENU_MODE_DELETE, section_id=section.id, mode_id=mode_id
         ),
     )
+    builder.button(
+        text="🔗 Ссылка на режим",
+        callback_data=AdminMenuCallback(
+            action=AdminActions.MENU_MODE_LINK, section_id=section.id, mode_id=mode_id
+        ),
+    )
     builder.button(
         text="🔙 Назад",
         callback_data=AdminMenuCallback(
@@ -0,0 +1,4 @@
+from .throttling import ThrottlingMiddleware
+from .tracing import TracingMiddleware
+
+__all__ = ["ThrottlingMiddleware", "TracingMiddleware"]
@@ -0,0 +1,133 @@
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, TelegramObject
+
+from ..keyboards import UserMenuCallback
+
+V = TypeVar("V")
+
+DEFAULT_RATE = 1.0
+DEFAULT_BURST = 5
+DEFAULT_DUPLICATE_WINDOW = 2.0
+DEFAULT_MAX_ENTRIES = 50_000
+# Only mode presses send videos; repeating any other button is cheap and
+# often intended ("back", toggles pressed again from a new screen).
+DEFAULT_COLLAPSE_PREFIXES = (
+    f"{UserMenuCallback.__prefix__}{UserMenuCallback.__separator__}mode"
+    f"{UserMenuCallback.__separator__}",
+)
+
+
+class TTLCache(Generic[V]):
+    """Bounded mapping whose entries expire ``ttl`` seconds after their last write."""
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, now: float) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= now:
+            del self._entries[key]
+            return None
+        return value
+
+    def set(self, key: Hashable, value: V, now: float) -> None:
+        self._entries[key] = (now + self._ttl, value)
+        self._entries.move_to_end(key)
+        self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        while self._entries:
+            key, (expires, _) = next(iter(self._entries.items()))
+            if expires > now and len(self._entries) <= self._max_entries:
+                break
+            del self._entries[key]
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Drops callback presses that would only repeat work already in progress.
+
+    Presses of the same button (same message and callback data, starting with
+    one of ``collapse_prefixes``) by the same user within ``duplicate_window``
+    seconds, or while the first press is still being handled, are collapsed,
+    and every user gets a token bucket of ``burst`` presses refilled at
+    ``rate`` per second. Rejected presses only get a short ``callback.answer``.
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        burst: int = DEFAULT_BURST,
+        duplicate_window: float = DEFAULT_DUPLICATE_WINDOW,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        collapse_prefixes: tuple[str, ...] = DEFAULT_COLLAPSE_PREFIXES,
+    ) -> None:
+        self._rate = rate
+        self._collapse_prefixes = collapse_prefixes
+        self._burst = float(burst)
+        # An idle bucket is full again after burst / rate seconds.
+        self._buckets: TTLCache[tuple[float, float]] = TTLCache(burst / rate, max_entries)
+        self._recent: TTLCache[bool] = TTLCache(duplicate_window, max_entries)
+        self._in_flight: set[tuple[int, int, int | str | None, str]] = set()
+        self.collapsed = 0
+        self.throttled = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, CallbackQuery) or event.from_user is None:
+            return await handler(event, data)
+
+        now = time.monotonic()
+        bot = data.get("bot")
+        user = (bot.id if bot else 0, event.from_user.id)
+        callback_data = event.data or ""
+        key = None
+        if callback_data.startswith(self._collapse_prefixes):
+            message = event.message.message_id if event.message else event.inline_message_id
+            key = (*user, message, callback_data)
+            if key in self._in_flight or self._recent.get(key, now):
+                self.collapsed += 1
+                await event.answer()
+                return None
+
+        if not self._take_token(user, now):
+            self.throttled += 1
+            await event.answer("Слишком часто, подождите немного")
+            return None
+
+        if key is None:
+            return await handler(event, data)
+        self._recent.set(key, True, now)
+        self._in_flight.add(key)
+        try:
+            return await handler(event, data)
+        finally:
+            self._in_flight.discard(key)
+
+    def _take_token(self, user: tuple[int, int], now: float) -> bool:
+        state = self._buckets.get(user, now)
+        if state is None:
+            tokens = self._burst
+        else:
+            tokens, updated = state
+            tokens = min(self._burst, tokens + (now - updated) * self._rate)
+        if tokens < 1:
+            self._buckets.set(user, (tokens, now), now)
+            return False
+        self._buckets.set(user, (tokens - 1, now), now)
+        return True
@@ -0,0 +1,37 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from ..services.tracing import Tracer
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Opens the root span of every update; register it as an outer ``update`` middleware."""
+
+    def __init__(self, tracer: Tracer) -> None:
+        self._tracer = tracer
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not self._tracer.enabled or not isinstance(event, Update):
+            return await handler(event, data)
+
+        bot = data.get("bot")
+        with self._tracer.trace(
+            f"update.{event.event_type}",
+            **{"update.id": event.update_id, "bot.id": bot.id if bot else 0},
+        ) as root:
+            inner = event.event
+            user = getattr(inner, "from_user", None)
+            if root is not None:
+                if user is not None:
+                    root.set_attribute("user.id", user.id)
+                callback_data = getattr(inner, "data", None)
+                if isinstance(callback_data, str):
+                    root.set_attribute("callback.data", callback_data)
+            return await handler(event, data)
@@ -0,0 +1,216 @@
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_OPEN = "category"
+MODE_OPEN = "mode"
+VIDEO_SENT = "video"
+UPLOAD = "upload"
+
+DEFAULT_BUCKET_SECONDS = 3600
+DEFAULT_FLUSH_INTERVAL = 60.0
+DEFAULT_HISTORY_BUCKETS = 24 * 7
+# Every flush appends a line per touched bucket; past this many lines (and
+# twice the buckets kept) the file is rewritten with one line per bucket.
+COMPACT_MIN_LINES = 1_000
+
+CounterKey = Tuple[str, str, str]
+
+
+class Analytics:
+    """Usage counters keyed by event, section ID and mode ID.
+
+    ``record`` only bumps a dict entry of the current time bucket: no locks,
+    no I/O. A background task appends the buckets touched since the previous
+    flush to a JSON-lines file; on load the last line of each bucket wins.
+    The file is compacted on load and whenever it grows past
+    ``max(COMPACT_MIN_LINES, 2 * buckets)`` lines.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        bucket_seconds: int = DEFAULT_BUCKET_SECONDS,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        history_buckets: int = DEFAULT_HISTORY_BUCKETS,
+    ) -> None:
+        self._path = path
+        self._bucket_seconds = bucket_seconds
+        self._flush_interval = flush_interval
+        self._history_buckets = history_buckets
+        self._buckets: Dict[int, defaultdict[CounterKey, int]] = {}
+        self._bucket = self._current_bucket()
+        self._counts = self._buckets.setdefault(self._bucket, defaultdict(int))
+        self._dirty: set[int] = set()
+        self._recorded = 0
+        self._flushed = 0
+        self._lines = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def load(self) -> None:
+        content = await asyncio.to_thread(self._read_file)
+        if not content:
+            return
+
+        oldest = self._bucket - self._history_buckets + 1
+        loaded: Dict[int, defaultdict[CounterKey, int]] = {}
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                bucket = int(entry["bucket"])
+                counts = defaultdict(int)
+                for event, section_id, mode_id, count in entry["counts"]:
+                    counts[(event, section_id, mode_id)] = int(count)
+            except (ValueError, KeyError, TypeError):
+                logger.warning("Skipping malformed analytics line")
+                continue
+            if bucket >= oldest:
+                loaded[bucket] = counts
+
+        for bucket, counts in loaded.items():
+            if bucket == self._bucket:
+                for key, count in counts.items():
+                    self._counts[key] += count
+            else:
+                self._buckets[bucket] = counts
+        await self._compact()
+
+    def _read_file(self) -> str:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        if not self._path.exists():
+            return ""
+        return self._path.read_text(encoding="utf-8")
+
+    def record(self, event: str, section_id: str, mode_id: str = "") -> None:
+        bucket = int(time.time()) // self._bucket_seconds
+        if bucket != self._bucket:
+            self._roll(bucket)
+        self._counts[(event, section_id, mode_id)] += 1
+        self._recorded += 1
+
+    def top(
+        self, event: str, limit: int = 5, buckets: Optional[int] = None
+    ) -> List[Tuple[str, str, int]]:
+        totals: defaultdict[Tuple[str, str], int] = defaultdict(int)
+        for counts in self._window(buckets):
+            for (kind, section_id, mode_id), count in counts.items():
+                if kind == event:
+                    totals[(section_id, mode_id)] += count
+        ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        return [(section_id, mode_id, count) for (section_id, mode_id), count in ranked[:limit]]
+
+    def total(self, event: str, buckets: Optional[int] = None, offset: int = 0) -> int:
+        return sum(
+            count
+            for counts in self._window(buckets, offset)
+            for (kind, _, _), count in counts.items()
+            if kind == event
+        )
+
+    def trend(self, event: str, buckets: int = 24) -> List[int]:
+        """Per-bucket totals for the last ``buckets`` buckets, oldest first."""
+        self._roll_if_needed()
+        series = []
+        for bucket in range(self._bucket - buckets + 1, self._bucket + 1):
+            counts = self._buckets.get(bucket, {})
+            series.append(
+                sum(count for (kind, _, _), count in counts.items() if kind == event)
+            )
+        return series
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        if self._recorded != self._flushed:
+            self._dirty.add(self._bucket)
+            self._flushed = self._recorded
+        dirty = sorted(self._dirty)
+        self._dirty.clear()
+        lines = self._serialize(dirty)
+        if lines:
+            await asyncio.to_thread(self._append, lines)
+            self._lines += lines.count("\n")
+            if self._lines > max(COMPACT_MIN_LINES, 2 * len(self._buckets)):
+                await self._compact()
+
+    async def _compact(self) -> None:
+        lines = self._serialize(sorted(self._buckets))
+        await asyncio.to_thread(self._rewrite, lines)
+        self._lines = lines.count("\n")
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                await self.flush()
+            except OSError:
+                logger.exception("Failed to flush analytics")
+
+    def _current_bucket(self) -> int:
+        return int(time.time()) // self._bucket_seconds
+
+    def _roll_if_needed(self) -> None:
+        bucket = self._current_bucket()
+        if bucket != self._bucket:
+            self._roll(bucket)
+
+    def _roll(self, bucket: int) -> None:
+        self._dirty.add(self._bucket)
+        self._bucket = bucket
+        self._counts = self._buckets.setdefault(bucket, defaultdict(int))
+        oldest = bucket - self._history_buckets + 1
+        for stale in [b for b in self._buckets if b < oldest]:
+            del self._buckets[stale]
+
+    def _window(self, buckets: Optional[int], offset: int = 0):
+        self._roll_if_needed()
+        if buckets is None:
+            return list(self._buckets.values())
+        newest = self._bucket - offset
+        return [
+            self._buckets[bucket]
+            for bucket in range(newest - buckets + 1, newest + 1)
+            if bucket in self._buckets
+        ]
+
+    def _serialize(self, buckets: List[int]) -> str:
+        lines = []
+        for bucket in buckets:
+            counts = self._buckets.get(bucket)
+            if not counts:
+                continue
+            entry = {
+                "bucket": bucket,
+                "counts": [[*key, count] for key, count in counts.items()],
+            }
+            lines.append(json.dumps(entry, ensure_ascii=False))
+        return "".join(f"{line}\n" for line in lines)
+
+    def _append(self, lines: str) -> None:
+        with self._path.open("a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def _rewrite(self, lines: str) -> None:
+        temporary = self._path.with_name(self._path.name + ".tmp")
+        temporary.write_text(lines, encoding="utf-8")
+        temporary.replace(self._path)
@@ -0,0 +1,204 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+
+from .rate_limiter import RateLimiter
+from .users import UserRegistry
+
+logger = logging.getLogger(__name__)
+
+# Telegram allows roughly 30 messages per second to different chats.
+DEFAULT_RATE = 25.0
+DEFAULT_WORKERS = 8
+CHECKPOINT_INTERVAL = 2.0
+
+
+@dataclass
+class BroadcastJob:
+    kind: str
+    payload: str
+    caption: Optional[str]
+    notify_chat_id: Optional[int]
+    cursor: int = 0
+    sent: int = 0
+    failed: int = 0
+    blocked: int = 0
+
+
+class Broadcaster:
+    """Fans a text message or a video ``file_id`` out to every registered user.
+
+    Users are read straight from the registry arrays by position, so only the
+    queue of in-flight sends is held in memory. The lowest unfinished position
+    is checkpointed to disk, which lets a restarted bot resume the job.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        registry: UserRegistry,
+        state_path: Path,
+        rate: float = DEFAULT_RATE,
+        workers: int = DEFAULT_WORKERS,
+    ) -> None:
+        self._bot = bot
+        self._registry = registry
+        self._path = state_path
+        self._limiter = RateLimiter(rate)
+        self._workers = workers
+        self._job: Optional[BroadcastJob] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def job(self) -> Optional[BroadcastJob]:
+        return self._job
+
+    async def start(
+        self,
+        kind: str,
+        payload: str,
+        caption: Optional[str] = None,
+        notify_chat_id: Optional[int] = None,
+    ) -> bool:
+        if kind not in ("text", "video"):
+            raise ValueError(f"Unsupported broadcast kind: {kind}")
+        if self.is_running:
+            return False
+        self._job = BroadcastJob(
+            kind=kind, payload=payload, caption=caption, notify_chat_id=notify_chat_id
+        )
+        await self._save()
+        self._task = asyncio.create_task(self._run(self._job))
+        return True
+
+    async def resume(self) -> bool:
+        if self.is_running:
+            return False
+        try:
+            content = await asyncio.to_thread(self._path.read_text, encoding="utf-8")
+        except FileNotFoundError:
+            return False
+        self._job = BroadcastJob(**json.loads(content))
+        logger.info("Resuming broadcast from position %s", self._job.cursor)
+        self._task = asyncio.create_task(self._run(self._job))
+        return True
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self, job: BroadcastJob) -> None:
+        queue: asyncio.Queue[tuple[int, int]] = asyncio.Queue(maxsize=self._workers * 2)
+        in_flight: set[int] = set()
+        workers = [
+            asyncio.create_task(self._worker(job, queue, in_flight))
+            for _ in range(self._workers)
+        ]
+        last_checkpoint = time.monotonic()
+        try:
+            for position, chat_id in self._registry.iter_from(job.cursor):
+                in_flight.add(position)
+                await queue.put((position, chat_id))
+                job.cursor = min(in_flight, default=position)
+                if time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                    await self._save()
+                    last_checkpoint = time.monotonic()
+            await queue.join()
+        except asyncio.CancelledError:
+            job.cursor = min(in_flight, default=job.cursor)
+            await self._save()
+            raise
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+        await asyncio.to_thread(self._path.unlink, True)
+        logger.info(
+            "Broadcast finished: sent=%s failed=%s blocked=%s",
+            job.sent,
+            job.failed,
+            job.blocked,
+        )
+        if job.notify_chat_id is not None:
+            await self._bot.send_message(
+                job.notify_chat_id,
+                (
+                    "Рассылка завершена.\n"
+                    f"Доставлено: {job.sent}\n"
+                    f"Ошибок: {job.failed}\n"
+                    f"Заблокировали бота: {job.blocked}"
+                ),
+            )
+
+    async def _worker(
+        self, job: BroadcastJob, queue: asyncio.Queue, in_flight: set[int]
+    ) -> None:
+        while True:
+            position, chat_id = await queue.get()
+            try:
+                outcome = await self._deliver(job, chat_id)
+                if outcome == "sent":
+                    job.sent += 1
+                elif outcome == "blocked":
+                    job.blocked += 1
+                else:
+                    job.failed += 1
+            finally:
+                in_flight.discard(position)
+                queue.task_done()
+
+    async def _deliver(self, job: BroadcastJob, chat_id: int) -> str:
+        while True:
+            await self._limiter.acquire()
+            try:
+                if job.kind == "video":
+                    await self._bot.send_video(chat_id, video=job.payload, caption=job.caption)
+                else:
+                    await self._bot.send_message(chat_id, job.payload)
+                return "sent"
+            except TelegramRetryAfter as exc:
+                self._limiter.pause(exc.retry_after)
+            except TelegramForbiddenError:
+                await self._registry.remove(chat_id)
+                return "blocked"
+            except TelegramBadRequest as exc:
+                if "chat not found" in exc.message.lower():
+                    await self._registry.remove(chat_id)
+                    return "blocked"
+                logger.warning("Broadcast to %s rejected: %s", chat_id, exc.message)
+                return "failed"
+            except TelegramAPIError as exc:
+                logger.warning("Broadcast to %s failed: %s", chat_id, exc)
+                return "failed"
+            except Exception:
+                # Anything else (network errors, timeouts) must not take the worker down.
+                logger.exception("Broadcast to %s failed", chat_id)
+                return "failed"
+
+    async def _save(self) -> None:
+        if self._job is None:
+            return
+        serialized = json.dumps(asdict(self._job), ensure_ascii=False)
+        await asyncio.to_thread(self._path.write_text, serialized, encoding="utf-8")
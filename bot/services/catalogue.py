@@ -0,0 +1,364 @@
+"""Edits that touch the menu and the video mapping together.
+
+The menu is keyed by IDs but videos by section and mode names, so renaming or
+deleting anything changes both files. :class:`UnitOfWork` stages such an edit
+on copies of both stores; :meth:`UnitOfWork.commit` then takes the file lock
+and the two store locks in a fixed order, checks that neither store changed
+since the work began, and writes the files whose content changed. An edit of
+one file (attaching videos, say) is written like any store write. When both
+change, they are written behind a redo record:
+
+    1. ``catalogue.journal`` (both files and a checksum) is written and
+       fsync'ed — this is the commit point;
+    2. ``menu.json`` (with its snapshot) and ``videos.json`` are written;
+    3. the journal is removed.
+
+A crash after step 1 leaves the journal behind and :meth:`Catalogue.recover`
+finishes the writes on the next start, before the stores are loaded. A
+journal torn by a crash during step 1 fails its checksum and is discarded:
+the commit did not happen. Such an edit thus writes each file twice, once
+inside the journal, with one fsync; in exchange it takes one lock cycle and
+gives one history version, and no crash leaves a rename applied to only one
+of the files.
+
+The file lock is the stores' ``CatalogueLock``, which ``bot.cli`` holds for
+its whole edit; a commit waits for it before taking the store locks, so
+readers of the stores are not blocked meanwhile. If either file no longer
+matches what the stores last read or wrote, another process changed it and
+the commit is refused rather than overwriting that change before the file
+watcher reloads it.
+"""
+
+import asyncio
+import logging
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..config import MenuMode, MenuSection
+from . import tracing
+from .menu_repository import MenuRepository
+from .storage import VideoSnapshot, VideoStorage, VideoValue
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"VBTX"
+_HEADER = struct.Struct("<4sIII")
+
+
+class CatalogueConflict(RuntimeError):
+    """The menu or the videos changed after the unit of work began."""
+
+
+class UnitOfWork:
+    """Staged changes to both stores; nothing is visible until :meth:`commit`."""
+
+    def __init__(
+        self,
+        catalogue: "Catalogue",
+        menu_version: int,
+        videos_version: int,
+        sections: List[MenuSection],
+        videos: Dict[str, Dict[str, VideoValue]],
+    ) -> None:
+        self._catalogue = catalogue
+        self.menu_version = menu_version
+        self.videos_version = videos_version
+        self._sections = sections
+        self._videos = videos
+        self._changes: List[str] = []
+
+    @property
+    def sections(self) -> List[MenuSection]:
+        return list(self._sections)
+
+    @property
+    def videos(self) -> Dict[str, Dict[str, VideoValue]]:
+        return self._videos
+
+    @property
+    def changes(self) -> List[str]:
+        return list(self._changes)
+
+    def section(self, section_id: str) -> Optional[MenuSection]:
+        index = self._index(section_id)
+        return self._sections[index] if index is not None else None
+
+    def add_section(self, name: str) -> MenuSection:
+        self._check_section_name(name)
+        used = [section.id for section in self._sections]
+        section = MenuSection(id=self._catalogue.menu_repo.new_section_id(used), name=name)
+        self._sections.append(section)
+        self._videos.setdefault(section.name, {})
+        self._changes.append(f"Меню: добавлен раздел «{name}»")
+        return section
+
+    def rename_section(self, section_id: str, new_name: str) -> MenuSection:
+        index = self._require(section_id)
+        section = self._sections[index]
+        self._check_section_name(new_name, section.id)
+        if section.name != new_name and new_name in self._videos:
+            raise ValueError("Target section name already exists")
+        updated = MenuSection(id=section.id, name=new_name, modes=section.modes)
+        self._sections[index] = updated
+        if section.name in self._videos:
+            self._videos[new_name] = self._videos.pop(section.name)
+        self._changes.append(f"Меню: раздел «{section.name}» → «{new_name}»")
+        return updated
+
+    def delete_section(self, section_id: str) -> MenuSection:
+        section = self._sections.pop(self._require(section_id))
+        self._videos.pop(section.name, None)
+        self._changes.append(f"Меню: удален раздел «{section.name}»")
+        return section
+
+    def add_mode(self, section_id: str, name: str) -> Tuple[MenuSection, MenuMode]:
+        index = self._require(section_id)
+        section = self._sections[index]
+        self._check_mode_name(section, name)
+        used = [mode.id for staged in self._sections for mode in staged.modes]
+        mode = MenuMode(id=self._catalogue.menu_repo.new_mode_id(section, used), name=name)
+        updated = MenuSection(id=section.id, name=section.name, modes=section.modes + (mode,))
+        self._sections[index] = updated
+        modes = self._videos.get(section.name, {})
+        if name not in modes:
+            self._videos[section.name] = {**modes, name: None}
+        self._changes.append(f"Меню: добавлен режим «{section.name} · {name}»")
+        return updated, mode
+
+    def rename_mode(self, section_id: str, mode_id: str, new_name: str) -> Tuple[MenuSection, MenuMode]:
+        index = self._require(section_id)
+        section = self._sections[index]
+        old = self._require_mode(section, mode_id)
+        self._check_mode_name(section, new_name, mode_id)
+        modes = self._videos.get(section.name, {})
+        if old.name != new_name and new_name in modes:
+            raise ValueError("Target mode name already exists")
+        renamed = MenuMode(id=old.id, name=new_name)
+        updated = MenuSection(
+            id=section.id,
+            name=section.name,
+            modes=tuple(renamed if mode.id == mode_id else mode for mode in section.modes),
+        )
+        self._sections[index] = updated
+        if old.name in modes:
+            videos = {mode: value for mode, value in modes.items() if mode != old.name}
+            videos[new_name] = modes[old.name]
+            self._videos[section.name] = videos
+        self._changes.append(f"Меню: режим переименован в «{section.name} · {new_name}»")
+        return updated, renamed
+
+    def delete_mode(self, section_id: str, mode_id: str) -> Tuple[MenuSection, MenuMode]:
+        index = self._require(section_id)
+        section = self._sections[index]
+        deleted = self._require_mode(section, mode_id)
+        updated = MenuSection(
+            id=section.id,
+            name=section.name,
+            modes=tuple(mode for mode in section.modes if mode.id != mode_id),
+        )
+        self._sections[index] = updated
+        modes = self._videos.get(section.name)
+        if modes and deleted.name in modes:
+            self._videos[section.name] = {
+                mode: value for mode, value in modes.items() if mode != deleted.name
+            }
+        self._changes.append(f"Меню: удален режим «{section.name} · {deleted.name}»")
+        return updated, deleted
+
+    def set_videos(
+        self, section_id: str, mode_id: str, videos: Sequence[str]
+    ) -> Tuple[MenuSection, MenuMode]:
+        section = self._sections[self._require(section_id)]
+        mode = self._require_mode(section, mode_id)
+        value: VideoValue = None
+        if len(videos) == 1:
+            value = videos[0]
+        elif videos:
+            value = list(videos)
+        self._videos[section.name] = {**self._videos.get(section.name, {}), mode.name: value}
+        self._changes.append(
+            f"Видео: обновлено «{section.name} · {mode.name}» ({len(videos)} шт.)"
+        )
+        return section, mode
+
+    def restore(
+        self, sections: Sequence[MenuSection], videos: VideoSnapshot, change: str
+    ) -> None:
+        """Replace everything with an earlier version, e.g. from ``MenuHistory``."""
+        self._sections = list(sections)
+        self._videos = dict(videos)
+        self._changes.append(change)
+
+    async def commit(self) -> None:
+        await self._catalogue._commit(self)
+
+    def _index(self, section_id: str) -> Optional[int]:
+        for index, section in enumerate(self._sections):
+            if section.id == section_id:
+                return index
+        return None
+
+    def _require(self, section_id: str) -> int:
+        index = self._index(section_id)
+        if index is None:
+            raise KeyError(f"Section '{section_id}' not found")
+        return index
+
+    def _check_section_name(self, name: str, section_id: Optional[str] = None) -> None:
+        """Section names are unique regardless of case; ``section_id`` is the one renamed."""
+        for section in self._sections:
+            if section.id != section_id and section.name.lower() == name.lower():
+                raise ValueError(f"Section '{section.name}' already exists")
+
+    @staticmethod
+    def _check_mode_name(section: MenuSection, name: str, mode_id: Optional[str] = None) -> None:
+        for mode in section.modes:
+            if mode.id != mode_id and mode.name.lower() == name.lower():
+                raise ValueError(f"Mode '{mode.name}' already exists in section '{section.name}'")
+
+    @staticmethod
+    def _require_mode(section: MenuSection, mode_id: str) -> MenuMode:
+        for mode in section.modes:
+            if mode.id == mode_id:
+                return mode
+        raise KeyError(f"Mode '{mode_id}' not found in section '{section.id}'")
+
+
+class Catalogue:
+    """Entry point for edits that must change the menu and videos atomically."""
+
+    def __init__(
+        self,
+        menu_repo: MenuRepository,
+        storage: VideoStorage,
+        menu_path: Path,
+        videos_path: Path,
+        journal_path: Path,
+    ) -> None:
+        self.menu_repo = menu_repo
+        self.storage = storage
+        self._menu_path = menu_path
+        self._videos_path = videos_path
+        self._journal_path = journal_path
+        self.commits = 0
+        self.conflicts = 0
+
+    def begin(self) -> UnitOfWork:
+        # The stores replace their sections and per-section dicts instead of
+        # mutating them, so shallow copies are enough to stage changes on.
+        return UnitOfWork(
+            self,
+            self.menu_repo.version,
+            self.storage.version,
+            list(self.menu_repo.snapshot()),
+            dict(self.storage.snapshot()),
+        )
+
+    async def recover(self) -> bool:
+        """Finish a commit interrupted by a crash; call before the stores are loaded."""
+        recovered = await asyncio.to_thread(self._recover)
+        if recovered:
+            logger.warning("Finished an interrupted catalogue commit from %s", self._journal_path)
+        return recovered
+
+    async def _commit(self, work: UnitOfWork) -> None:
+        if not work._changes:
+            return
+        menu_repo, storage = self.menu_repo, self.storage
+        # The file lock first: while bot.cli holds it, readers of the stores
+        # are not stuck behind a commit waiting for it. Then always menu
+        # before videos: a fixed order cannot deadlock.
+        async with menu_repo.file_lock, menu_repo.lock, storage.lock:
+            if menu_repo.version != work.menu_version or storage.version != work.videos_version:
+                self.conflicts += 1
+                raise CatalogueConflict("Catalogue changed since the unit of work began")
+            sections = tuple(work._sections)
+            write_menu = sections != menu_repo.snapshot()
+            write_videos = work._videos != storage.snapshot()
+            if not (write_menu or write_videos):
+                return
+            menu_content, digest = menu_repo.encode(sections)
+            videos_content = storage.encode(work._videos)
+            with tracing.span(
+                "catalogue.commit",
+                bytes=len(menu_content) * write_menu + len(videos_content) * write_videos,
+            ):
+                try:
+                    await asyncio.to_thread(
+                        self._write,
+                        menu_content if write_menu else None,
+                        digest,
+                        sections,
+                        videos_content if write_videos else None,
+                    )
+                except CatalogueConflict:
+                    self.conflicts += 1
+                    raise
+            if write_menu:
+                menu_repo.install(sections, digest)
+            if write_videos:
+                storage.install(work._videos, videos_content)
+            self.commits += 1
+            change = "; ".join(work._changes)
+            # History listens to both stores; one edit is one version.
+            for listener in dict.fromkeys(menu_repo.listeners + storage.listeners):
+                await listener(change)
+
+    def _write(
+        self,
+        menu_content: Optional[bytes],
+        digest: bytes,
+        sections: Tuple[MenuSection, ...],
+        videos_content: Optional[bytes],
+    ) -> None:
+        # The caller holds the file lock.
+        if self.menu_repo.changed_on_disk() or self.storage.changed_on_disk():
+            raise CatalogueConflict("Catalogue files were changed by another process")
+        if menu_content is None or videos_content is None:
+            # One file needs no redo record: nothing can be half-applied.
+            if menu_content is not None:
+                self.menu_repo.write_files(menu_content, digest, sections)
+            if videos_content is not None:
+                self.storage.write_file(videos_content)
+            return
+        self._write_journal(menu_content, videos_content)
+        self.menu_repo.write_files(menu_content, digest, sections)
+        self.storage.write_file(videos_content)
+        self._journal_path.unlink(missing_ok=True)
+
+    def _write_journal(self, menu_content: bytes, videos_content: bytes) -> None:
+        # No temporary file: a torn journal fails its checksum on recovery.
+        crc = zlib.crc32(videos_content, zlib.crc32(menu_content))
+        header = _HEADER.pack(_MAGIC, len(menu_content), len(videos_content), crc)
+        with self._journal_path.open("wb") as f:
+            f.write(header)
+            f.write(menu_content)
+            f.write(videos_content)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _recover(self) -> bool:
+        with self.menu_repo.file_lock:
+            return self._recover_locked()
+
+    def _recover_locked(self) -> bool:
+        try:
+            content = self._journal_path.read_bytes()
+        except FileNotFoundError:
+            return False
+        if len(content) >= _HEADER.size:
+            magic, menu_size, videos_size, crc = _HEADER.unpack_from(content)
+            body = content[_HEADER.size :]
+            if magic == _MAGIC and len(body) == menu_size + videos_size and zlib.crc32(body) == crc:
+                # The menu snapshot no longer matches menu.json and is rebuilt on load.
+                self._menu_path.write_bytes(body[:menu_size])
+                self._videos_path.write_bytes(body[menu_size:])
+                self._journal_path.unlink()
+                return True
+        logger.warning("Discarding damaged catalogue journal %s", self._journal_path)
+        self._journal_path.unlink()
+        return False
+
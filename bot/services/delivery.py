@@ -0,0 +1,67 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from aiogram import Bot
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import FSInputFile, InputFile, InputMediaVideo, Message
+
+from .video_meta import VideoMeta
+
+MEDIA_GROUP_LIMIT = 10
+
+
+async def send_videos(
+    bot: Bot,
+    chat_id: int,
+    videos: Sequence[str | InputFile],
+    caption: str,
+    meta: Sequence[Optional[VideoMeta]] = (),
+) -> List[Message]:
+    """Send one video, or albums of up to ``MEDIA_GROUP_LIMIT`` with one request each.
+
+    ``meta`` is aligned with ``videos``; known duration and size are passed
+    along with ``supports_streaming`` so clients can start playing at once.
+    """
+    fields = [
+        _video_fields(meta[index] if index < len(meta) else None) for index in range(len(videos))
+    ]
+    if len(videos) == 1:
+        return [await bot.send_video(chat_id, video=videos[0], caption=caption, **fields[0])]
+
+    sent: List[Message] = []
+    for start in range(0, len(videos), MEDIA_GROUP_LIMIT):
+        chunk = videos[start : start + MEDIA_GROUP_LIMIT]
+        if len(chunk) == 1:
+            # sendMediaGroup needs at least two items.
+            sent.append(await bot.send_video(chat_id, video=chunk[0], **fields[start]))
+            continue
+        media = [
+            InputMediaVideo(
+                media=video,
+                caption=caption if start == 0 and index == 0 else None,
+                **fields[start + index],
+            )
+            for index, video in enumerate(chunk)
+        ]
+        sent.extend(await bot.send_media_group(chat_id, media))
+    return sent
+
+
+def local_source(api: TelegramAPIServer, path: Path) -> str | FSInputFile:
+    """What to send for a local file: its path for a ``--local`` server, else an upload."""
+    if api.is_local:
+        # A --local Bot API server reads the file itself: nothing is streamed
+        # over HTTP and the 50 MB upload limit does not apply.
+        return Path(api.wrap_local_file.to_server(path)).as_uri()
+    return FSInputFile(str(path))
+
+
+def _video_fields(meta: Optional[VideoMeta]) -> Dict[str, Any]:
+    fields: Dict[str, Any] = {"supports_streaming": True}
+    if meta is None:
+        return fields
+    fields.update(duration=meta.duration, width=meta.width, height=meta.height)
+    if meta.thumbnail is not None:
+        # Uploaded even with a --local server: sendVideo takes no thumbnail path.
+        fields["thumbnail"] = FSInputFile(str(meta.thumbnail))
+    return fields
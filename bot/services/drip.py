@@ -0,0 +1,401 @@
+import asyncio
+import heapq
+import json
+import logging
+import re
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+
+from .delivery import send_videos
+from .menu_repository import MenuRepository
+from .rate_limiter import RateLimiter
+from .storage import VideoStorage
+from .video_meta import VideoMetadata
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOUR = 9
+# Leaves room under Telegram's ~30 messages per second for replies and broadcasts.
+DEFAULT_RATE = 10.0
+DEFAULT_BATCH = 50
+IDLE_WAKEUP = 3600.0
+COMPACT_MIN_RECORDS = 10_000
+
+_SLOT_BITS = 32
+_SLOT_MASK = (1 << _SLOT_BITS) - 1
+_SECTION_BITS = 20
+_FREE = 0
+_IN_FLIGHT = -1
+_FILE_ID = re.compile(r"[A-Za-z0-9_-]+")
+
+
+class DripScheduler:
+    """Sends the modes of a section one per day to every subscribed chat.
+
+    Subscriptions live in parallel ``array`` columns indexed by slot; the
+    schedule is a heap of plain ints ``due << 32 | slot`` with lazy
+    invalidation, so subscribing, rescheduling and popping are O(log n) and a
+    subscriber costs well under 200 bytes. Every change is appended to a
+    JSON-lines journal (``[chat_id, section_id, step, due]``, ``due`` 0 meaning
+    unsubscribed); the journal is compacted on load and whenever it grows past
+    ``max(COMPACT_MIN_RECORDS, 2 * subscriptions)`` records.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        menu_repo: MenuRepository,
+        storage: VideoStorage,
+        metadata: VideoMetadata,
+        path: Path,
+        hour: int = DEFAULT_HOUR,
+        rate: float = DEFAULT_RATE,
+        batch_size: int = DEFAULT_BATCH,
+    ) -> None:
+        if not 0 <= hour < 24:
+            raise ValueError("hour must be between 0 and 23")
+        self._bot = bot
+        self._menu_repo = menu_repo
+        self._storage = storage
+        self._metadata = metadata
+        self._path = path
+        self._hour = hour
+        self._limiter = RateLimiter(rate)
+        self._batch_size = batch_size
+
+        self._section_ids: List[str] = []
+        self._section_index: Dict[str, int] = {}
+        self._chat = array("q")
+        self._section = array("I")
+        self._step = array("H")
+        self._due = array("q")
+        self._free: List[int] = []
+        self._slots: Dict[int, int] = {}
+        self._heap: List[int] = []
+
+        self._journal: List[str] = []
+        self._journal_records = 0
+        self._write_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.failed = 0
+        self.finished = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    async def load(self) -> None:
+        content = await asyncio.to_thread(self._read_file)
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            try:
+                chat_id, section_id, step, due = json.loads(line)
+                chat_id, step, due = int(chat_id), int(step), int(due)
+            except (ValueError, TypeError):
+                logger.warning("Skipping malformed drip journal line")
+                continue
+            key = self._key(chat_id, str(section_id))
+            slot = self._slots.get(key)
+            if due <= 0:
+                if slot is not None:
+                    self._release(key, slot)
+                continue
+            if slot is None:
+                self._allocate(key, chat_id, str(section_id), step, due)
+            else:
+                self._step[slot] = step
+                self._due[slot] = due
+        self._heap = [due << _SLOT_BITS | slot for slot, due in enumerate(self._due) if due > 0]
+        heapq.heapify(self._heap)
+        await self._compact()
+        logger.info("Loaded %s drip subscriptions", len(self._slots))
+
+    def is_subscribed(self, chat_id: int, section_id: str) -> bool:
+        return self._key(chat_id, section_id) in self._slots
+
+    def next_delivery(self, now: Optional[float] = None) -> int:
+        """Unix time of the next ``hour:00`` local time after ``now``."""
+        now = time.time() if now is None else now
+        today = time.localtime(now)
+        due = time.mktime(
+            (today.tm_year, today.tm_mon, today.tm_mday, self._hour, 0, 0, 0, 0, -1)
+        )
+        if due <= now:
+            due = time.mktime(
+                (today.tm_year, today.tm_mon, today.tm_mday + 1, self._hour, 0, 0, 0, 0, -1)
+            )
+        return int(due)
+
+    async def subscribe(self, chat_id: int, section_id: str) -> Optional[int]:
+        """Schedule the first mode of the section; returns its due time or ``None``."""
+        key = self._key(chat_id, section_id)
+        if key in self._slots:
+            return None
+        due = self.next_delivery()
+        slot = self._allocate(key, chat_id, section_id, 0, due)
+        self._schedule(slot, due)
+        self._record(slot)
+        await self.flush()
+        return due
+
+    async def unsubscribe(self, chat_id: int, section_id: str) -> bool:
+        key = self._key(chat_id, section_id)
+        slot = self._slots.get(key)
+        if slot is None:
+            return False
+        self._journal.append(json.dumps([chat_id, section_id, 0, 0], ensure_ascii=False))
+        self._release(key, slot)
+        await self.flush()
+        return True
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        async with self._write_lock:
+            if not self._journal:
+                return
+            lines, self._journal = self._journal, []
+            await asyncio.to_thread(self._append, "\n".join(lines) + "\n")
+            self._journal_records += len(lines)
+            if self._journal_records > max(COMPACT_MIN_RECORDS, 2 * len(self._slots)):
+                await self._compact_locked()
+
+    async def _run(self) -> None:
+        while True:
+            batch = self._pop_due(int(time.time()))
+            if not batch:
+                self._wakeup.clear()
+                delay = IDLE_WAKEUP
+                if self._heap:
+                    delay = min(delay, (self._heap[0] >> _SLOT_BITS) - time.time())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(delay, 1.0))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await asyncio.gather(*(self._deliver_safely(slot, due) for slot, due in batch))
+            finally:
+                await self.flush()
+
+    def _pop_due(self, now: int) -> List[Tuple[int, int]]:
+        batch: List[Tuple[int, int]] = []
+        heap = self._heap
+        while heap and len(batch) < self._batch_size and heap[0] >> _SLOT_BITS <= now:
+            entry = heapq.heappop(heap)
+            slot = entry & _SLOT_MASK
+            due = entry >> _SLOT_BITS
+            if self._due[slot] != due:
+                # Rescheduled, unsubscribed or already popped through a reused slot.
+                continue
+            self._due[slot] = _IN_FLIGHT
+            batch.append((slot, due))
+        return batch
+
+    async def _deliver_safely(self, slot: int, due: int) -> None:
+        try:
+            await self._deliver(slot, due)
+        except Exception:
+            # One broken delivery must not stop the scheduler or strand its slot.
+            logger.exception("Drip delivery of slot %s failed", slot)
+            self.failed += 1
+            if self._due[slot] == _IN_FLIGHT:
+                self._reschedule(slot, due, self._step[slot])
+            elif slot not in self._free:
+                # Unsubscribed meanwhile: the slot is ours to free.
+                self._free.append(slot)
+
+    async def _deliver(self, slot: int, due: int) -> None:
+        chat_id = self._chat[slot]
+        section_id = self._section_ids[self._section[slot]]
+        step = self._step[slot]
+        section = await self._menu_repo.get_section(section_id)
+        outcome = "finished"
+        if section is not None:
+            # Modes whose videos were never uploaded have no file_id yet and are skipped.
+            while step < len(section.modes):
+                mode = section.modes[step]
+                videos = [
+                    video
+                    for video in await self._storage.get_videos(section.name, mode.name)
+                    if _FILE_ID.fullmatch(video)
+                ]
+                if not videos:
+                    step += 1
+                    continue
+                caption = f"{section.name} · {mode.name}\nДень {step + 1} из {len(section.modes)}"
+                outcome = await self._send(chat_id, videos, caption)
+                if outcome == "sent":
+                    # A failed send is retried with the same mode next time.
+                    step += 1
+                break
+            if outcome != "blocked" and step >= len(section.modes):
+                await self._send_text(
+                    chat_id, f"Программа «{section.name}» завершена. Так держать! 💪"
+                )
+                self.finished += 1
+                outcome = "finished"
+
+        if self._due[slot] != _IN_FLIGHT:
+            # Unsubscribed while the videos were being sent.
+            self._free.append(slot)
+            return
+        key = self._key(chat_id, section_id)
+        if outcome in ("finished", "blocked"):
+            self._journal.append(json.dumps([chat_id, section_id, 0, 0], ensure_ascii=False))
+            self._release(key, slot)
+            self._free.append(slot)
+            return
+        self._reschedule(slot, due, step)
+
+    def _reschedule(self, slot: int, due: int, step: int) -> None:
+        next_due = self.next_delivery(max(time.time(), due))
+        self._step[slot] = step
+        self._due[slot] = next_due
+        self._schedule(slot, next_due)
+        self._record(slot)
+
+    async def _send(self, chat_id: int, videos: List[str], caption: str) -> str:
+        while True:
+            await self._limiter.acquire()
+            try:
+                await send_videos(
+                    self._bot, chat_id, videos, caption, self._metadata.lookup(videos)
+                )
+                self.sent += 1
+                return "sent"
+            except TelegramRetryAfter as exc:
+                self._limiter.pause(exc.retry_after)
+            except TelegramForbiddenError:
+                return "blocked"
+            except TelegramBadRequest as exc:
+                if "chat not found" in exc.message.lower():
+                    return "blocked"
+                logger.warning("Drip delivery to %s rejected: %s", chat_id, exc.message)
+                self.failed += 1
+                return "failed"
+            except TelegramAPIError as exc:
+                logger.warning("Drip delivery to %s failed: %s", chat_id, exc)
+                self.failed += 1
+                return "failed"
+
+    async def _send_text(self, chat_id: int, text: str) -> None:
+        await self._limiter.acquire()
+        try:
+            await self._bot.send_message(chat_id, text)
+        except TelegramAPIError as exc:
+            logger.warning("Drip message to %s failed: %s", chat_id, exc)
+
+    def _key(self, chat_id: int, section_id: str) -> int:
+        index = self._section_index.get(section_id)
+        if index is None:
+            index = self._section_index[section_id] = len(self._section_ids)
+            self._section_ids.append(section_id)
+        return chat_id << _SECTION_BITS | index
+
+    def _allocate(self, key: int, chat_id: int, section_id: str, step: int, due: int) -> int:
+        section = self._section_index[section_id]
+        if self._free:
+            slot = self._free.pop()
+            self._chat[slot] = chat_id
+            self._section[slot] = section
+            self._step[slot] = step
+            self._due[slot] = due
+        else:
+            slot = len(self._due)
+            self._chat.append(chat_id)
+            self._section.append(section)
+            self._step.append(step)
+            self._due.append(due)
+        self._slots[key] = slot
+        return slot
+
+    def _release(self, key: int, slot: int) -> None:
+        del self._slots[key]
+        if self._due[slot] == _IN_FLIGHT:
+            # _deliver frees the slot once the send in progress returns.
+            self._due[slot] = _FREE
+            return
+        self._due[slot] = _FREE
+        self._free.append(slot)
+
+    def _schedule(self, slot: int, due: int) -> None:
+        entry = due << _SLOT_BITS | slot
+        if not self._heap or entry < self._heap[0]:
+            self._wakeup.set()
+        heapq.heappush(self._heap, entry)
+
+    def _record(self, slot: int) -> None:
+        self._journal.append(
+            json.dumps(
+                [
+                    self._chat[slot],
+                    self._section_ids[self._section[slot]],
+                    self._step[slot],
+                    self._due[slot],
+                ],
+                ensure_ascii=False,
+            )
+        )
+
+    async def _compact(self) -> None:
+        async with self._write_lock:
+            await self._compact_locked()
+
+    async def _compact_locked(self) -> None:
+        lines = []
+        for slot in self._slots.values():
+            due = self._due[slot]
+            if due == _IN_FLIGHT:
+                # Rewritten with its new due time once delivered.
+                due = int(time.time())
+            lines.append(
+                json.dumps(
+                    [self._chat[slot], self._section_ids[self._section[slot]], self._step[slot], due],
+                    ensure_ascii=False,
+                )
+            )
+        content = "\n".join(lines) + "\n" if lines else ""
+        await asyncio.to_thread(self._rewrite, content)
+        self._journal_records = len(lines)
+
+    def _read_file(self) -> str:
+        try:
+            return self._path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return ""
+
+    def _append(self, content: str) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with self._path.open("a", encoding="utf-8") as f:
+            f.write(content)
+
+    def _rewrite(self, content: str) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self._path.with_name(self._path.name + ".tmp")
+        temporary.write_text(content, encoding="utf-8")
+        temporary.replace(self._path)
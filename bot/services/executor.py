@@ -0,0 +1,353 @@
+"""Bounded execution of incoming updates.
+
+aiogram starts a task per update with no limit, so a burst of updates becomes
+as many handlers fighting over the catalogue locks and the upload pool, and
+two updates of one chat (an admin's text input and a button press) may run
+in either order. :class:`UpdateExecutor` runs them instead:
+
+- updates of one chat strictly one after another, in arrival order;
+- updates of different chats in parallel, at most ``concurrency`` at a time;
+- at most ``queue_limit`` updates waiting; ``submit`` blocks beyond that, so
+  the polling loop stops fetching (or a webhook request stays open) until
+  handlers catch up.
+
+:class:`OrderedDispatcher` feeds every update through it, in polling and
+webhook mode alike, before aiogram's own middlewares: the FSM state of an
+update is read only when its turn comes.
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.dispatcher import DEFAULT_BACKOFF_CONFIG
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+from aiogram.utils.backoff import Backoff, BackoffConfig
+
+from .offsets import UpdateOffset
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 32
+DEFAULT_QUEUE_LIMIT = 256
+# Telegram stops accepting answers to a callback query soon after the press.
+DEFAULT_CALLBACK_TTL = 60.0
+
+Job = Callable[[], Awaitable[Any]]
+_Entry = Tuple[Job, contextvars.Context, float]
+
+
+@dataclass(frozen=True)
+class ExecutorStats:
+    pending: int
+    running: int
+    chats: int
+    peak_pending: int
+    processed: int
+    failed: int
+    throttled: int
+    avg_wait_ms: float
+    max_wait_ms: float
+
+
+class UpdateExecutor:
+    def __init__(
+        self, concurrency: int = DEFAULT_CONCURRENCY, queue_limit: int = DEFAULT_QUEUE_LIMIT
+    ) -> None:
+        if concurrency < 1 or queue_limit < 1:
+            raise ValueError("concurrency and queue_limit must be positive")
+        self._concurrency = concurrency
+        self._queue_limit = queue_limit
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._room = asyncio.Condition()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._queues: Dict[Hashable, Deque[_Entry]] = {}
+        self._workers: Dict[Hashable, asyncio.Task] = {}
+        self._pending = 0
+        self._running = 0
+        self._peak_pending = 0
+        self._processed = 0
+        self._failed = 0
+        self._throttled = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @property
+    def concurrency(self) -> int:
+        return self._concurrency
+
+    @property
+    def queue_limit(self) -> int:
+        return self._queue_limit
+
+    async def submit(self, key: Optional[Hashable], job: Job) -> None:
+        """Queue ``job`` behind earlier jobs of ``key``; wait while the queue is full.
+
+        ``key=None`` means no ordering constraint. ``job`` runs in a copy of
+        the caller's context; its exceptions are logged, not raised here.
+        """
+        if self._pending >= self._queue_limit:
+            self._throttled += 1
+            async with self._room:
+                # Every waiter is woken per freed slot; the first one to run
+                # takes it and the others find the queue full again.
+                while self._pending >= self._queue_limit:
+                    await self._room.wait()
+                self._pending += 1
+        else:
+            self._pending += 1
+        if key is None:
+            key = object()
+        loop = asyncio.get_running_loop()
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+        queue.append((job, contextvars.copy_context(), loop.time()))
+        self._peak_pending = max(self._peak_pending, self._pending)
+        self._idle.clear()
+        if key not in self._workers:
+            self._workers[key] = loop.create_task(self._work(key, queue))
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued job has finished; ``False`` on timeout."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def close(self) -> None:
+        """Cancel queued and running jobs."""
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def stats(self) -> ExecutorStats:
+        return ExecutorStats(
+            pending=self._pending,
+            running=self._running,
+            chats=len(self._queues),
+            peak_pending=self._peak_pending,
+            processed=self._processed,
+            failed=self._failed,
+            throttled=self._throttled,
+            avg_wait_ms=self._total_wait / self._processed * 1000 if self._processed else 0.0,
+            max_wait_ms=self._max_wait * 1000,
+        )
+
+    async def _work(self, key: Hashable, queue: Deque[_Entry]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while queue:
+                async with self._semaphore:
+                    job, context, enqueued = queue.popleft()
+                    await self._release_slot()
+                    wait = loop.time() - enqueued
+                    self._total_wait += wait
+                    self._max_wait = max(self._max_wait, wait)
+                    self._running += 1
+                    try:
+                        # A task per job keeps context variables (trace spans)
+                        # from leaking into the next update of the chat.
+                        await context.run(loop.create_task, job())
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception:
+                        self._failed += 1
+                        logger.exception("Update handler failed")
+                    finally:
+                        self._running -= 1
+                        self._processed += 1
+        finally:
+            self._pending -= len(queue)
+            del self._queues[key]
+            del self._workers[key]
+            if not self._workers:
+                self._idle.set()
+
+    async def _release_slot(self) -> None:
+        self._pending -= 1
+        if self._pending == self._queue_limit - 1:
+            async with self._room:
+                self._room.notify_all()
+
+
+def chat_key(bot: Bot, update: Update) -> Optional[Hashable]:
+    """Chat of an update (the user for chat-less updates such as inline queries)."""
+    chat, user, _ = UserContextMiddleware.resolve_event_context(update)
+    if chat is not None:
+        return bot.id, chat.id
+    if user is not None:
+        # Same key as the user's private chat with the bot.
+        return bot.id, user.id
+    return None
+
+
+class OrderedDispatcher(Dispatcher):
+    """``Dispatcher`` that hands every update to an :class:`UpdateExecutor`.
+
+    Run polling with ``handle_as_tasks=False``: ``feed_update`` returns once
+    the update is queued, and blocks while the queue is full. The result of
+    the handler is not available to the caller, so webhook handlers cannot
+    answer with a method in the HTTP response.
+
+    With an :class:`UpdateOffset` for a bot, polling first resumes from the
+    saved offset and feeds the updates sent while the bot was down. Callback
+    queries among them that are provably older than ``callback_ttl`` (a
+    later update of the batch is dated earlier than that) are skipped:
+    Telegram no longer accepts their answer, so handling them is wasted work.
+
+    On shutdown (before the bot sessions are closed) queued updates get
+    ``drain_timeout`` seconds to finish; the rest is cancelled.
+    """
+
+    def __init__(
+        self,
+        executor: UpdateExecutor,
+        drain_timeout: Optional[float] = None,
+        offsets: Optional[Mapping[int, UpdateOffset]] = None,
+        callback_ttl: float = DEFAULT_CALLBACK_TTL,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.executor = executor
+        self._drain_timeout = drain_timeout
+        self._offsets: Mapping[int, UpdateOffset] = offsets or {}
+        self._callback_ttl = callback_ttl
+        self.shutdown.register(self._finish_updates)
+
+    async def feed_update(self, bot: Bot, update: Update, **kwargs: Any) -> Any:
+        parent = super().feed_update
+        offset = self._offsets.get(bot.id)
+
+        async def handle() -> None:
+            try:
+                await parent(bot, update, **kwargs)
+            finally:
+                # An update cut short on shutdown is not done: the offset stays before it.
+                if offset is not None and not asyncio.current_task().cancelling():
+                    offset.finished(update.update_id)
+
+        if offset is not None:
+            offset.started(update.update_id)
+        await self.executor.submit(chat_key(bot, update), handle)
+
+    async def _listen_updates(  # type: ignore[override]
+        self,
+        bot: Bot,
+        polling_timeout: int = 30,
+        backoff_config: BackoffConfig = DEFAULT_BACKOFF_CONFIG,
+        allowed_updates: Optional[List[str]] = None,
+    ) -> AsyncGenerator[Update, None]:
+        offset = self._offsets.get(bot.id)
+        if offset is not None:
+            async for update in self._catch_up(bot, offset, backoff_config, allowed_updates):
+                yield update
+        async for update in super()._listen_updates(
+            bot,
+            polling_timeout=polling_timeout,
+            backoff_config=backoff_config,
+            allowed_updates=allowed_updates,
+        ):
+            yield update
+
+    async def _catch_up(
+        self,
+        bot: Bot,
+        offset: UpdateOffset,
+        backoff_config: BackoffConfig,
+        allowed_updates: Optional[List[str]],
+    ) -> AsyncGenerator[Update, None]:
+        """Updates pending since the saved offset, without expired callback queries.
+
+        Every request confirms the previous batch, and the last (empty) one
+        leaves nothing for the regular polling loop to fetch twice. That loop
+        starts without an offset, so failed requests are retried here from
+        the last offset rather than leaving the last batch unconfirmed.
+        """
+        backoff = Backoff(config=backoff_config)
+        next_id = offset.offset
+        fed = skipped = 0
+        while True:
+            try:
+                updates = await bot.get_updates(
+                    offset=next_id, timeout=0, allowed_updates=allowed_updates
+                )
+            except Exception as exc:
+                logger.error("Failed to fetch pending updates - %s: %s", type(exc).__name__, exc)
+                await backoff.asleep()
+                continue
+            backoff.reset()
+            if not updates:
+                break
+            expired = _expired_callbacks(updates, self._callback_ttl)
+            for update in updates:
+                if update.update_id in expired:
+                    offset.skipped(update.update_id)
+                    skipped += 1
+                else:
+                    fed += 1
+                    yield update
+            next_id = updates[-1].update_id + 1
+        if fed or skipped:
+            logger.info(
+                "Caught up %d pending updates for bot id=%d, skipped %d expired callback queries",
+                fed,
+                bot.id,
+                skipped,
+            )
+
+    async def _finish_updates(self) -> None:
+        if await self.executor.drain(self._drain_timeout):
+            return
+        stats = self.executor.stats()
+        logger.warning(
+            "Cancelling %d queued and %d running updates after %.0f s",
+            stats.pending,
+            stats.running,
+            self._drain_timeout,
+        )
+        await self.executor.close()
+
+
+def _expired_callbacks(updates: Sequence[Update], ttl: float) -> Set[int]:
+    """IDs of callback queries sent before an update dated more than ``ttl`` ago.
+
+    Update IDs grow with time but callback queries carry no date, so the date
+    of the next dated update is the latest a press can have happened.
+    """
+    if ttl <= 0:
+        return set()
+    deadline = time.time() - ttl
+    expired: Set[int] = set()
+    latest: Optional[float] = None
+    for update in reversed(updates):
+        date = getattr(update.event, "date", None)
+        if isinstance(date, datetime):
+            latest = date.timestamp()
+        elif update.callback_query is not None and latest is not None and latest < deadline:
+            expired.add(update.update_id)
+    return expired
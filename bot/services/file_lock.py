@@ -0,0 +1,116 @@
+"""Advisory OS lock on ``catalogue.lock`` shared by the bot and ``bot.cli``.
+
+Only other processes are excluded: inside one process the lock is counted,
+so a reload holding it can call a repository that takes it again, and the
+repositories' asyncio locks keep ordering writers as before. Readers and
+writers of ``menu.json``/``videos.json`` take it around their file I/O in
+worker threads, which is where a wait for another process belongs.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def _try_lock(fd: int) -> bool:
+        # msvcrt locks bytes from the current position: always lock byte 0.
+        os.lseek(fd, 0, os.SEEK_SET)
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _try_lock(fd: int) -> bool:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _unlock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+POLL_INTERVAL = 0.05
+
+
+class CatalogueLockTimeout(TimeoutError):
+    """Another process kept the catalogue locked for longer than allowed."""
+
+
+class CatalogueLock:
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._fd: Optional[int] = None
+        self._holders = 0
+        self._mutex = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def acquire(self, timeout: Optional[float] = None) -> None:
+        """Block until no other process holds the lock (or ``timeout`` runs out)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._mutex:
+            if self._holders == 0:
+                if self._fd is None:
+                    self._path.parent.mkdir(parents=True, exist_ok=True)
+                    self._fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+                while not _try_lock(self._fd):
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise CatalogueLockTimeout(f"{self._path} is held by another process")
+                    time.sleep(POLL_INTERVAL)
+            self._holders += 1
+
+    def release(self) -> None:
+        with self._mutex:
+            if self._holders == 0:
+                raise RuntimeError("Releasing a catalogue lock that is not held")
+            self._holders -= 1
+            if self._holders == 0:
+                _unlock(self._fd)
+
+    def close(self) -> None:
+        with self._mutex:
+            if self._fd is not None and self._holders == 0:
+                os.close(self._fd)
+                self._fd = None
+
+    def __enter__(self) -> "CatalogueLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    async def __aenter__(self) -> "CatalogueLock":
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self.acquire))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The worker thread cannot be interrupted: release once it gets the lock.
+            acquiring.add_done_callback(self._release_acquired)
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+    def _release_acquired(self, acquiring: asyncio.Future) -> None:
+        if not acquiring.cancelled() and acquiring.exception() is None:
+            self.release()
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ..config import MenuMode, MenuSection
+from .catalogue import Catalogue
+from .storage import VideoSnapshot, VideoValue
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 200
+
+
+@dataclass(frozen=True)
+class Version:
+    number: int
+    created_at: float
+    change: str
+    sections: Tuple[MenuSection, ...]
+    videos: VideoSnapshot
+
+
+class MenuHistory:
+    """Versions of the menu and video mapping with instant rollback.
+
+    A version holds references to the repositories' immutable sections and
+    per-section video dicts, so consecutive versions share everything that did
+    not change. The history file is JSON lines with one delta per version:
+    only changed sections, the section order when it changed, and changed or
+    removed video sections. It is rewritten with only the kept versions on
+    load and once it holds twice as many lines.
+
+    A version is recorded after each complete edit: a catalogue commit, a
+    video edit of the storage alone, or (through
+    ``CatalogueReloader.add_listener``) a reload of both files. The stores do
+    not report the intermediate steps of a reload, where the menu may
+    already be renamed while the videos are still keyed by old names.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        catalogue: Catalogue,
+        limit: int = DEFAULT_LIMIT,
+    ) -> None:
+        self._path = path
+        self._catalogue = catalogue
+        self._menu_repo = catalogue.menu_repo
+        self._storage = catalogue.storage
+        self._versions: deque[Version] = deque(maxlen=limit)
+        self._limit = limit
+        self._lines = 0
+        self._lock = asyncio.Lock()
+
+    async def load(self) -> None:
+        async with self._lock:
+            versions, line_count = await asyncio.to_thread(self._read_versions)
+            self._versions.extend(versions)
+            self._lines = line_count
+            if line_count > len(self._versions):
+                await asyncio.to_thread(self._rewrite)
+                self._lines = len(self._versions)
+        await self._record("Загрузка данных", only_if_changed=True)
+        self._menu_repo.add_listener(self.record)
+        self._storage.add_listener(self.record)
+
+    def recent(self, limit: int = 10) -> List[Version]:
+        return list(reversed(self._versions))[:limit]
+
+    def get(self, number: int) -> Optional[Version]:
+        for version in reversed(self._versions):
+            if version.number == number:
+                return version
+        return None
+
+    async def record(self, change: str) -> None:
+        await self._record(change)
+
+    async def rollback(self, number: int) -> Version:
+        """Restore both stores in one catalogue commit; it records the new version.
+
+        Raises ``CatalogueConflict`` if the catalogue is being edited meanwhile.
+        """
+        version = self.get(number)
+        if version is None:
+            raise KeyError(f"Version {number} not found")
+        work = self._catalogue.begin()
+        work.restore(version.sections, version.videos, f"Откат к версии #{number}")
+        await work.commit()
+        return self._versions[-1]
+
+    async def _record(self, change: str, only_if_changed: bool = False) -> None:
+        async with self._lock:
+            previous = self._versions[-1] if self._versions else None
+            sections = self._menu_repo.snapshot()
+            videos = self._storage.snapshot()
+            if (
+                only_if_changed
+                and previous is not None
+                and previous.sections == sections
+                and previous.videos == videos
+            ):
+                # Same content: adopt the live objects so later deltas stay small.
+                self._versions[-1] = replace(previous, sections=sections, videos=videos)
+                return
+            version = Version(
+                number=previous.number + 1 if previous else 1,
+                created_at=time.time(),
+                change=change,
+                sections=sections,
+                videos=videos,
+            )
+            line = json.dumps(_delta(previous, version), ensure_ascii=False) + "\n"
+            self._versions.append(version)
+            await asyncio.to_thread(self._append, line)
+            self._lines += 1
+            if self._lines > 2 * self._limit:
+                await asyncio.to_thread(self._rewrite)
+                self._lines = len(self._versions)
+
+    def _read_versions(self) -> Tuple[List[Version], int]:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        if not self._path.exists():
+            return [], 0
+
+        versions: deque[Version] = deque(maxlen=self._limit)
+        sections: Dict[str, MenuSection] = {}
+        order: List[str] = []
+        videos: Dict[str, Dict[str, VideoValue]] = {}
+        line_count = 0
+        with self._path.open("r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                line_count += 1
+                try:
+                    entry = json.loads(line)
+                    for raw in entry.get("sections", []):
+                        modes = [MenuMode(id=m["id"], name=m["name"]) for m in raw["modes"]]
+                        sections[raw["id"]] = MenuSection(id=raw["id"], name=raw["name"], modes=modes)
+                    if "order" in entry:
+                        order = list(entry["order"])
+                    for name, modes in entry.get("videos", {}).items():
+                        videos[name] = modes
+                    for name in entry.get("removed_videos", []):
+                        videos.pop(name, None)
+                    versions.append(
+                        Version(
+                            number=int(entry["version"]),
+                            created_at=float(entry["at"]),
+                            change=str(entry["change"]),
+                            sections=tuple(sections[section_id] for section_id in order),
+                            videos=dict(videos),
+                        )
+                    )
+                except (ValueError, KeyError, TypeError):
+                    logger.warning("Stopping history replay at a malformed line")
+                    break
+        return list(versions), line_count
+
+    def _append(self, line: str) -> None:
+        with self._path.open("a", encoding="utf-8") as f:
+            f.write(line)
+
+    def _rewrite(self) -> None:
+        # Drop versions beyond the limit: the oldest kept one becomes a full delta.
+        lines = []
+        previous = None
+        for version in self._versions:
+            lines.append(json.dumps(_delta(previous, version), ensure_ascii=False) + "\n")
+            previous = version
+        temporary = self._path.with_name(self._path.name + ".tmp")
+        temporary.write_text("".join(lines), encoding="utf-8")
+        temporary.replace(self._path)
+
+
+def _delta(previous: Optional[Version], version: Version) -> dict:
+    entry: dict = {"version": version.number, "at": version.created_at, "change": version.change}
+
+    previous_sections = {s.id: s for s in previous.sections} if previous else {}
+    changed_sections = [
+        {
+            "id": section.id,
+            "name": section.name,
+            "modes": [{"id": mode.id, "name": mode.name} for mode in section.modes],
+        }
+        for section in version.sections
+        if previous_sections.get(section.id) is not section
+    ]
+    if changed_sections:
+        entry["sections"] = changed_sections
+    order = [section.id for section in version.sections]
+    if previous is None or order != [section.id for section in previous.sections]:
+        entry["order"] = order
+
+    previous_videos = previous.videos if previous else {}
+    changed_videos = {
+        name: dict(modes)
+        for name, modes in version.videos.items()
+        if previous_videos.get(name) is not modes
+    }
+    if changed_videos:
+        entry["videos"] = changed_videos
+    removed_videos = [name for name in previous_videos if name not in version.videos]
+    if removed_videos:
+        entry["removed_videos"] = removed_videos
+    return entry
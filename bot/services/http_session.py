@@ -0,0 +1,189 @@
+import asyncio
+import ssl
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, Tuple, cast
+
+import certifi
+from aiohttp import ClientError, ClientSession, ClientTimeout, FormData, TCPConnector, TraceConfig
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramNetworkError
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import InputFile
+
+from . import tracing
+from ..config import HttpSettings, PoolSettings
+
+CONTROL = "control"
+UPLOAD = "upload"
+POLLING = "polling"
+
+
+@dataclass
+class PoolStats:
+    requests: int = 0
+    errors: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    total_seconds: float = 0.0
+    connections_created: int = 0
+    connections_reused: int = 0
+    queued: int = 0
+    queued_seconds: float = 0.0
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_seconds / self.requests * 1000 if self.requests else 0.0
+
+
+class PooledSession(AiohttpSession):
+    """``AiohttpSession`` with separate keepalive pools for control calls,
+    uploads and long polling, per-method timeouts and pool usage counters.
+
+    Talks to ``settings.api_url`` instead of api.telegram.org when it is set.
+    """
+
+    def __init__(self, settings: Optional[HttpSettings] = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.settings = settings or HttpSettings()
+        if self.settings.api_url:
+            self.api = TelegramAPIServer.from_base(
+                self.settings.api_url, is_local=self.settings.api_local
+            )
+        self.stats: Dict[str, PoolStats] = {
+            CONTROL: PoolStats(),
+            UPLOAD: PoolStats(),
+            POLLING: PoolStats(),
+        }
+        self._pools: Dict[str, ClientSession] = {}
+        self._ssl = ssl.create_default_context(cafile=certifi.where())
+
+    def _pool_settings(self, pool: str) -> PoolSettings:
+        return cast(PoolSettings, getattr(self.settings, pool))
+
+    async def create_pool(self, pool: str) -> ClientSession:
+        session = self._pools.get(pool)
+        if session is None or session.closed:
+            settings = self._pool_settings(pool)
+            connector = TCPConnector(
+                ssl=self._ssl,
+                limit=settings.limit,
+                limit_per_host=settings.limit,
+                keepalive_timeout=self.settings.keepalive,
+                ttl_dns_cache=self.settings.dns_ttl,
+                use_dns_cache=True,
+            )
+            session = ClientSession(
+                connector=connector,
+                trace_configs=[self._trace_config(self.stats[pool])],
+            )
+            self._pools[pool] = session
+        return session
+
+    async def create_session(self) -> ClientSession:
+        # File downloads (``stream_content``) share the upload pool.
+        return await self.create_pool(UPLOAD)
+
+    async def close(self) -> None:
+        pools = [session for session in self._pools.values() if not session.closed]
+        self._pools.clear()
+        if pools:
+            await asyncio.gather(*(session.close() for session in pools))
+            # Give the SSL transports a moment to close, as AiohttpSession does.
+            await asyncio.sleep(0.25)
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[TelegramType], timeout: Optional[int] = None
+    ) -> TelegramType:
+        form, has_files = self._build_form(bot, method)
+        api_method = method.__api_method__
+        if api_method == "getUpdates":
+            pool = POLLING
+        else:
+            pool = UPLOAD if has_files else CONTROL
+
+        if timeout is None:
+            timeout = self.settings.method_timeouts.get(
+                api_method, self._pool_settings(pool).timeout
+            )
+
+        session = await self.create_pool(pool)
+        stats = self.stats[pool]
+        url = self.api.api_url(token=bot.token, method=api_method)
+        stats.requests += 1
+        stats.in_flight += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        started = time.perf_counter()
+        try:
+            with tracing.span(f"bot_api.{api_method}", pool=pool):
+                async with session.post(
+                    url, data=form, timeout=ClientTimeout(total=timeout)
+                ) as resp:
+                    raw_result = await resp.text()
+                    tracing.set_attribute("http.status_code", resp.status)
+        except asyncio.TimeoutError:
+            stats.errors += 1
+            raise TelegramNetworkError(method=method, message="Request timeout error")
+        except ClientError as e:
+            stats.errors += 1
+            raise TelegramNetworkError(method=method, message=f"{type(e).__name__}: {e}")
+        finally:
+            stats.in_flight -= 1
+            stats.total_seconds += time.perf_counter() - started
+
+        response = self.check_response(
+            bot=bot, method=method, status_code=resp.status, content=raw_result
+        )
+        return cast(TelegramType, response.result)
+
+    def _build_form(self, bot: Bot, method: TelegramMethod[TelegramType]) -> Tuple[FormData, bool]:
+        form = FormData(quote_fields=False)
+        files: Dict[str, InputFile] = {}
+        local_files = False
+        for key, value in method.model_dump(warnings=False).items():
+            # A local server uploads file:// paths to Telegram before it
+            # answers, so such calls take as long as a regular upload.
+            local_files = local_files or (self.api.is_local and _has_local_path(value))
+            value = self.prepare_value(value, bot=bot, files=files)
+            if not value:
+                continue
+            form.add_field(key, value)
+        for key, value in files.items():
+            form.add_field(key, value.read(bot), filename=value.filename or key)
+        return form, bool(files) or local_files
+
+    @staticmethod
+    def _trace_config(stats: PoolStats) -> TraceConfig:
+        trace = TraceConfig()
+
+        async def on_queued_start(_, context: SimpleNamespace, __) -> None:
+            context.queued_at = time.perf_counter()
+
+        async def on_queued_end(_, context: SimpleNamespace, __) -> None:
+            stats.queued += 1
+            stats.queued_seconds += time.perf_counter() - context.queued_at
+
+        async def on_create_end(*_) -> None:
+            stats.connections_created += 1
+
+        async def on_reuse(*_) -> None:
+            stats.connections_reused += 1
+
+        trace.on_connection_queued_start.append(on_queued_start)
+        trace.on_connection_queued_end.append(on_queued_end)
+        trace.on_connection_create_end.append(on_create_end)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+
+def _has_local_path(value: Any) -> bool:
+    """A ``file://`` source, directly or in the ``media`` entries of an album."""
+    if isinstance(value, str):
+        return value.startswith("file://")
+    if isinstance(value, list):
+        return any(isinstance(item, dict) and _has_local_path(item.get("media")) for item in value)
+    return False
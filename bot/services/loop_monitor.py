@@ -0,0 +1,206 @@
+import asyncio
+import builtins
+import io
+import linecache
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 0.1
+DEFAULT_THRESHOLD = 0.25
+LAG_WINDOW = 600
+STACK_LIMIT = 30
+
+_PACKAGE_DIR = str(Path(__file__).resolve().parent.parent) + os.sep
+_ROOT_DIR = os.path.dirname(_PACKAGE_DIR.rstrip(os.sep))
+# asyncio debug mode stats source files via linecache to build tracebacks.
+_IGNORED_FILES = {linecache.__file__, traceback.__file__}
+# Filesystem calls that block the calling thread. pathlib and ``open`` go
+# through these module attributes, so patching them covers both.
+_BLOCKING_CALLS = {
+    os: ("stat", "lstat", "mkdir", "listdir", "scandir", "replace", "rename", "remove", "unlink"),
+    io: ("open",),
+    builtins: ("open",),
+}
+
+
+@dataclass(frozen=True)
+class LagSummary:
+    samples: int
+    avg_ms: float
+    p95_ms: float
+    max_ms: float
+    stalls: int
+
+
+class LoopMonitor:
+    """Watchdog that measures how late the event loop runs its callbacks.
+
+    A task sleeps ``interval`` seconds and records how much later than that
+    it woke up. A daemon thread watches the task's heartbeat: once the loop
+    has been stuck for ``threshold`` seconds it logs the loop thread's stack,
+    i.e. the code that is blocking it right now.
+
+    With ``debug`` the filesystem functions in ``os``/``open`` are wrapped to
+    log, once per call site, every call made on the loop thread from code in
+    the ``bot`` package, and asyncio's own slow-callback warnings are enabled.
+    """
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_INTERVAL,
+        threshold: float = DEFAULT_THRESHOLD,
+        debug: bool = False,
+        window: int = LAG_WINDOW,
+    ) -> None:
+        self._interval = interval
+        self._threshold = threshold
+        self._debug = debug
+        self._lags: deque[float] = deque(maxlen=window)
+        self._max_lag = 0.0
+        self._samples = 0
+        self.stalls = 0
+        self._heartbeat = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread = 0
+        self._originals: Dict[Tuple[Any, str], Callable] = {}
+        self._reported: Set[Tuple[str, int]] = set()
+
+    @property
+    def debug(self) -> bool:
+        return self._debug
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        if self._debug:
+            loop.set_debug(True)
+            loop.slow_callback_duration = self._threshold
+            self._patch()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._unpatch()
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+    def summary(self) -> Optional[LagSummary]:
+        if not self._lags:
+            return None
+        ordered = sorted(self._lags)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return LagSummary(
+            samples=self._samples,
+            avg_ms=sum(ordered) / len(ordered) * 1000,
+            p95_ms=p95 * 1000,
+            max_ms=self._max_lag * 1000,
+            stalls=self.stalls,
+        )
+
+    async def _measure(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self._interval)
+            now = time.monotonic()
+            lag = max(0.0, now - started - self._interval)
+            self._heartbeat = now
+            self._lags.append(lag)
+            self._samples += 1
+            if lag > self._max_lag:
+                self._max_lag = lag
+
+    def _watch(self) -> None:
+        reported = 0.0
+        while not self._stopped.wait(self._threshold / 2):
+            heartbeat = self._heartbeat
+            stuck = time.monotonic() - heartbeat - self._interval
+            if stuck < self._threshold or heartbeat == reported:
+                continue
+            # One report per stall: the heartbeat moves once the loop is free.
+            reported = heartbeat
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT))
+            del frame
+            logger.warning(
+                "Event loop blocked for %.0f ms so far, loop thread stack:\n%s",
+                stuck * 1000,
+                stack,
+            )
+
+    def _patch(self) -> None:
+        for module, names in _BLOCKING_CALLS.items():
+            for name in names:
+                original = getattr(module, name)
+                self._originals[(module, name)] = original
+                setattr(module, name, self._wrap(name, original))
+
+    def _unpatch(self) -> None:
+        for (module, name), original in self._originals.items():
+            setattr(module, name, original)
+        self._originals.clear()
+
+    def _wrap(self, name: str, original: Callable) -> Callable:
+        loop_thread = self._loop_thread
+        reported = self._reported
+
+        def blocking_call(*args: Any, **kwargs: Any) -> Any:
+            if threading.get_ident() == loop_thread and _in_task():
+                frame = sys._getframe(1)
+                while frame is not None:
+                    filename = frame.f_code.co_filename
+                    if filename.startswith(_PACKAGE_DIR) or filename in _IGNORED_FILES:
+                        break
+                    frame = frame.f_back
+                if frame is not None and frame.f_code.co_filename in _IGNORED_FILES:
+                    frame = None
+                if frame is not None:
+                    site = (frame.f_code.co_filename, frame.f_lineno)
+                    if site not in reported:
+                        reported.add(site)
+                        logger.warning(
+                            "Blocking %s() on the event loop at %s:%s",
+                            name,
+                            os.path.relpath(site[0], _ROOT_DIR),
+                            site[1],
+                        )
+                del frame
+            return original(*args, **kwargs)
+
+        return blocking_call
+
+
+def _in_task() -> bool:
+    try:
+        return asyncio.current_task() is not None
+    except RuntimeError:
+        return False
@@ -1,41 +1,166 @@
 import asyncio
+import hashlib
 import json
+from contextlib import nullcontext
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable, List, Optional, Tuple
+from typing import Awaitable, Callable, ContextManager, Dict, Iterable, List, Optional, Tuple
 from uuid import uuid4
 
 from ..config import MenuMode, MenuSection
+from . import snapshot, tracing
+from .file_lock import CatalogueLock
+from .tracing import TracedLock
+
+ChangeListener = Callable[[str], Awaitable[None]]
+Resolved = Tuple[MenuSection, Optional[MenuMode]]
+
+
+@dataclass
+class MenuDiff:
+    added: List[MenuSection] = field(default_factory=list)
+    removed: List[MenuSection] = field(default_factory=list)
+    changed: List[Tuple[MenuSection, MenuSection]] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
 
 
 class MenuRepository:
-    def __init__(self, menu_path: Path) -> None:
+    def __init__(self, menu_path: Path, file_lock: Optional[CatalogueLock] = None) -> None:
         self._path = menu_path
+        self._file_lock = file_lock if file_lock is not None else nullcontext()
+        self._snapshot_path = snapshot.snapshot_path(menu_path)
         self._sections: List[MenuSection] = []
-        self._lock = asyncio.Lock()
+        self._lock = TracedLock("menu_repository.lock_wait")
+        self._fingerprint: Optional[str] = None
+        self._listeners: List[ChangeListener] = []
+        # Section and mode IDs to their records; rebuilt on first use after a change.
+        self._ids: Optional[Dict[str, Resolved]] = None
+        self._version = 0
 
     async def load(self) -> None:
         async with self._lock:
-            self._path.parent.mkdir(parents=True, exist_ok=True)
-            if not self._path.exists():
+            loaded = await asyncio.to_thread(self._read_sections)
+            if loaded is None:
                 self._sections = []
                 await self._write_locked()
                 return
 
-            content = await asyncio.to_thread(self._path.read_text, encoding="utf-8")
-            data = json.loads(content)
-            sections, needs_save = self._deserialize(data)
+            sections, needs_save, fingerprint = loaded
             self._sections = sections
+            self._changed()
+            self._fingerprint = fingerprint
             if needs_save:
                 await self._write_locked()
 
+    async def reload(self) -> Optional[MenuDiff]:
+        """Re-read the menu file after an external change and apply the difference.
+
+        Parsing happens in a worker thread; the lock is only held to swap the
+        changed sections in. Returns ``None`` when the file matches what the
+        repository last loaded or wrote itself.
+        """
+        loaded = await asyncio.to_thread(self._read_sections)
+        if loaded is None:
+            return None
+        sections, needs_save, fingerprint = loaded
+        async with self._lock:
+            if fingerprint == self._fingerprint:
+                return None
+            current = {section.id: section for section in self._sections}
+            diff = MenuDiff()
+            merged: List[MenuSection] = []
+            for section in sections:
+                previous = current.pop(section.id, None)
+                if previous is None:
+                    diff.added.append(section)
+                    merged.append(section)
+                elif previous == section:
+                    merged.append(previous)
+                else:
+                    diff.changed.append((previous, section))
+                    merged.append(section)
+            diff.removed.extend(current.values())
+
+            self._sections = merged
+            self._changed()
+            self._fingerprint = fingerprint
+            if needs_save:
+                await self._write_locked()
+            # Listeners are not called: the videos may still be keyed by old
+            # names. ``CatalogueReloader`` reports the reload once it is done.
+            return diff
+
+    def _read_sections(self) -> Optional[Tuple[List[MenuSection], bool, str]]:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        # The snapshot is written from here too, so it is kept under the lock.
+        with self._file_lock:
+            try:
+                content = self._path.read_bytes()
+            except FileNotFoundError:
+                return None
+            digest = hashlib.sha1(content).digest()
+            sections = snapshot.load_menu(self._snapshot_path, digest)
+            if sections is not None:
+                return sections, False, digest.hex()
+            data = json.loads(content.decode("utf-8"))
+            sections, needs_save = self._deserialize(data)
+            if not needs_save:
+                snapshot.save_menu(self._snapshot_path, digest, sections)
+            return sections, needs_save, digest.hex()
+
+    @property
+    def version(self) -> int:
+        """Bumped on every change of the sections, for optimistic checks."""
+        return self._version
+
+    def add_listener(self, listener: ChangeListener) -> None:
+        """Register a coroutine called with a description after each mutation."""
+        self._listeners.append(listener)
+
+    def snapshot(self) -> Tuple[MenuSection, ...]:
+        """Current sections; they are never mutated in place, so they can be shared."""
+        return tuple(self._sections)
+
+    # Used by ``Catalogue`` to commit the menu together with the videos: it
+    # takes ``file_lock`` and then ``lock``, writes the encoded menu if it
+    # differs from ``snapshot()``, and then installs it.
+
+    @property
+    def lock(self) -> TracedLock:
+        return self._lock
+
+    @property
+    def file_lock(self) -> ContextManager:
+        return self._file_lock
+
+    @property
+    def listeners(self) -> Tuple[ChangeListener, ...]:
+        return tuple(self._listeners)
+
+    def changed_on_disk(self) -> bool:
+        """Whether another process rewrote the file since it was last read or written."""
+        try:
+            with self._file_lock:
+                current = hashlib.sha1(self._path.read_bytes()).hexdigest()
+        except FileNotFoundError:
+            return False
+        return self._fingerprint is not None and current != self._fingerprint
+
+    def install(self, sections: Iterable[MenuSection], digest: bytes) -> None:
+        """Adopt sections already written with :meth:`write_files`; hold ``lock``."""
+        self._sections = list(sections)
+        self._changed(digest)
+
     async def get_sections(self) -> List[MenuSection]:
         async with self._lock:
-            return [self._clone_section(section) for section in self._sections]
+            return list(self._sections)
 
     async def get_section(self, section_id: str) -> Optional[MenuSection]:
         async with self._lock:
             section = self._find_section(section_id)
-            return self._clone_section(section) if section else None
+            return section
 
     async def get_mode(self, section_id: str, mode_id: str) -> Optional[Tuple[MenuSection, MenuMode]]:
         async with self._lock:
@@ -44,96 +169,22 @@ class MenuRepository:
                 return None
             for mode in section.modes:
                 if mode.id == mode_id:
-                    return self._clone_section(section), mode
+                    return section, mode
             return None
 
-    async def add_section(self, name: str) -> MenuSection:
-        async with self._lock:
-            section = MenuSection(id=self._generate_section_id(), name=name, modes=[])
-            self._sections.append(section)
-            await self._write_locked()
-            return self._clone_section(section)
-
-    async def rename_section(self, section_id: str, new_name: str) -> MenuSection:
+    async def resolve(self, entity_id: str) -> Optional[Resolved]:
+        """Section or mode by its ID alone, in O(1); ``None`` for unknown or deleted IDs."""
         async with self._lock:
-            index = self._index_section(section_id)
-            if index is None:
-                raise KeyError(f"Section '{section_id}' not found")
-            section = self._sections[index]
-            updated = MenuSection(id=section.id, name=new_name, modes=list(section.modes))
-            self._sections[index] = updated
-            await self._write_locked()
-            return self._clone_section(updated)
-
-    async def delete_section(self, section_id: str) -> MenuSection:
-        async with self._lock:
-            index = self._index_section(section_id)
-            if index is None:
-                raise KeyError(f"Section '{section_id}' not found")
-            section = self._sections.pop(index)
-            await self._write_locked()
-            return section
-
-    async def add_mode(self, section_id: str, name: str) -> Tuple[MenuSection, MenuMode]:
-        async with self._lock:
-            index = self._index_section(section_id)
-            if index is None:
-                raise KeyError(f"Section '{section_id}' not found")
-
-            section = self._sections[index]
-            new_mode = MenuMode(id=self._generate_mode_id(section), name=name)
-            updated_modes = list(section.modes) + [new_mode]
-            updated_section = MenuSection(id=section.id, name=section.name, modes=updated_modes)
-            self._sections[index] = updated_section
-            await self._write_locked()
-            return self._clone_section(updated_section), new_mode
-
-    async def rename_mode(self, section_id: str, mode_id: str, new_name: str) -> Tuple[MenuSection, MenuMode]:
-        async with self._lock:
-            index = self._index_section(section_id)
-            if index is None:
-                raise KeyError(f"Section '{section_id}' not found")
-
-            section = self._sections[index]
-            updated_modes: List[MenuMode] = []
-            target_mode: Optional[MenuMode] = None
-            for mode in section.modes:
-                if mode.id == mode_id:
-                    target_mode = MenuMode(id=mode.id, name=new_name)
-                    updated_modes.append(target_mode)
-                else:
-                    updated_modes.append(mode)
-
-            if target_mode is None:
-                raise KeyError(f"Mode '{mode_id}' not found in section '{section_id}'")
-
-            updated_section = MenuSection(id=section.id, name=section.name, modes=updated_modes)
-            self._sections[index] = updated_section
-            await self._write_locked()
-            return self._clone_section(updated_section), target_mode
-
-    async def delete_mode(self, section_id: str, mode_id: str) -> Tuple[MenuSection, MenuMode]:
-        async with self._lock:
-            index = self._index_section(section_id)
-            if index is None:
-                raise KeyError(f"Section '{section_id}' not found")
-
-            section = self._sections[index]
-            remaining_modes: List[MenuMode] = []
-            deleted_mode: Optional[MenuMode] = None
-            for mode in section.modes:
-                if mode.id == mode_id:
-                    deleted_mode = mode
-                else:
-                    remaining_modes.append(mode)
-
-            if deleted_mode is None:
-                raise KeyError(f"Mode '{mode_id}' not found in section '{section_id}'")
-
-            updated_section = MenuSection(id=section.id, name=section.name, modes=remaining_modes)
-            self._sections[index] = updated_section
-            await self._write_locked()
-            return self._clone_section(updated_section), deleted_mode
+            if self._ids is None:
+                ids: Dict[str, Resolved] = {}
+                for section in self._sections:
+                    for mode in section.modes:
+                        ids[mode.id] = (section, mode)
+                for section in self._sections:
+                    # A section wins if a hand-edited file reuses its ID for a mode.
+                    ids[section.id] = (section, None)
+                self._ids = ids
+            return self._ids.get(entity_id)
 
     def _deserialize(self, raw_data) -> Tuple[List[MenuSection], bool]:
         if not isinstance(raw_data, list):
@@ -151,10 +202,10 @@ class MenuRepository:
                     raise ValueError("Section name must be a string")
                 section_id = entry.get("id")
                 if not isinstance(section_id, str):
-                    section_id = self._generate_section_id(used_section_ids)
+                    section_id = self.new_section_id(used_section_ids)
                     needs_save = True
                 if section_id in used_section_ids:
-                    section_id = self._generate_section_id(used_section_ids)
+                    section_id = self.new_section_id(used_section_ids)
                     needs_save = True
                 used_section_ids.add(section_id)
 
@@ -168,12 +219,12 @@ class MenuRepository:
                                 raise ValueError("Mode name must be a string")
                             mode_id = mode_entry.get("id")
                             if not isinstance(mode_id, str) or mode_id in used_mode_ids:
-                                mode_id = self._generate_mode_id(None, used_mode_ids)
+                                mode_id = self.new_mode_id(None, used_mode_ids)
                                 needs_save = True
                             used_mode_ids.add(mode_id)
                             modes.append(MenuMode(id=mode_id, name=mode_name))
                         elif isinstance(mode_entry, str):
-                            mode_id = self._generate_mode_id(None, used_mode_ids)
+                            mode_id = self.new_mode_id(None, used_mode_ids)
                             used_mode_ids.add(mode_id)
                             modes.append(MenuMode(id=mode_id, name=mode_entry))
                             needs_save = True
@@ -185,9 +236,9 @@ class MenuRepository:
                 sections.append(MenuSection(id=section_id, name=name, modes=modes))
             elif isinstance(entry, str):
                 # Legacy format: list of section names without details
-                section_id = self._generate_section_id(used_section_ids)
+                section_id = self.new_section_id(used_section_ids)
                 used_section_ids.add(section_id)
-                sections.append(MenuSection(id=section_id, name=entry, modes=[]))
+                sections.append(MenuSection(id=section_id, name=entry))
                 needs_save = True
             else:
                 raise ValueError("Unsupported menu entry format")
@@ -204,7 +255,7 @@ class MenuRepository:
         index = self._index_section(section_id)
         return self._sections[index] if index is not None else None
 
-    def _generate_section_id(self, used: Optional[Iterable[str]] = None) -> str:
+    def new_section_id(self, used: Optional[Iterable[str]] = None) -> str:
         used_ids = set(used or [])
         used_ids.update(section.id for section in self._sections)
         while True:
@@ -212,7 +263,7 @@ class MenuRepository:
             if candidate not in used_ids:
                 return candidate
 
-    def _generate_mode_id(
+    def new_mode_id(
         self, section: Optional[MenuSection] = None, used: Optional[Iterable[str]] = None
     ) -> str:
         used_ids = set(used or [])
@@ -225,22 +276,40 @@ class MenuRepository:
             if candidate not in used_ids:
                 return candidate
 
-    async def _write_locked(self) -> None:
-        serialized = json.dumps(self._serialize_sections(), ensure_ascii=False, indent=2)
-        await asyncio.to_thread(self._path.write_text, serialized, encoding="utf-8")
-
-    def _serialize_sections(self) -> List[dict]:
-        return [
-            {
-                "id": section.id,
-                "name": section.name,
-                "modes": [
-                    {"id": mode.id, "name": mode.name} for mode in section.modes
-                ],
-            }
-            for section in self._sections
-        ]
+    async def _write_locked(self, change: Optional[str] = None) -> None:
+        content, digest = self.encode(self._sections)
+        self._changed(digest)
+        with tracing.span("menu_repository.write", bytes=len(content)):
+            await asyncio.to_thread(self.write_files, content, digest, tuple(self._sections))
+        if change is not None:
+            for listener in self._listeners:
+                await listener(change)
+
+    def _changed(self, digest: Optional[bytes] = None) -> None:
+        if digest is not None:
+            # Remember our own write so the file watcher does not reload it.
+            self._fingerprint = digest.hex()
+        self._ids = None
+        self._version += 1
 
     @staticmethod
-    def _clone_section(section: MenuSection) -> MenuSection:
-        return MenuSection(id=section.id, name=section.name, modes=list(section.modes))
+    def encode(sections: Iterable[MenuSection]) -> Tuple[bytes, bytes]:
+        serialized = json.dumps(_serialize_sections(sections), ensure_ascii=False, indent=2)
+        content = serialized.encode("utf-8")
+        return content, hashlib.sha1(content).digest()
+
+    def write_files(self, content: bytes, digest: bytes, sections: Tuple[MenuSection, ...]) -> None:
+        with self._file_lock:
+            self._path.write_bytes(content)
+            snapshot.save_menu(self._snapshot_path, digest, sections)
+
+
+def _serialize_sections(sections: Iterable[MenuSection]) -> List[dict]:
+    return [
+        {
+            "id": section.id,
+            "name": section.name,
+            "modes": [{"id": mode.id, "name": mode.name} for mode in section.modes],
+        }
+        for section in sections
+    ]
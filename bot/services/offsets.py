@@ -0,0 +1,119 @@
+"""Position of a bot in its update stream, kept across restarts.
+
+Telegram keeps an update until ``getUpdates`` is called with a larger
+offset, so a restarted bot only has to say where it stopped. The offset
+saved here is the first update that is not finished yet: updates of other
+chats may finish earlier, but the offset never moves past one still being
+handled. It is committed at most once per ``commit_interval`` (one small
+fsync'ed file) and once more on stop, after the handlers have drained.
+
+Updates fetched by the previous run and still queued when it crashed were
+already confirmed to Telegram and are lost; the ones it fetched but never
+queued, and everything sent while it was down, are delivered on restart.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMMIT_INTERVAL = 1.0
+# After a week without updates Telegram may restart update IDs at a random
+# value, possibly below the saved offset, which would confirm new updates.
+MAX_OFFSET_AGE = 6 * 24 * 3600
+
+
+class UpdateOffset:
+    def __init__(self, path: Path, commit_interval: float = DEFAULT_COMMIT_INTERVAL) -> None:
+        self._path = path
+        self._commit_interval = commit_interval
+        self._loaded: Optional[int] = None
+        self._fetched: Optional[int] = None
+        # Unfinished update IDs in arrival (ascending) order.
+        self._in_flight: "OrderedDict[int, None]" = OrderedDict()
+        self._committed: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self.commits = 0
+
+    async def load(self) -> None:
+        self._loaded = self._committed = await asyncio.to_thread(self._read_file)
+
+    @property
+    def offset(self) -> Optional[int]:
+        """ID of the first update not handled yet; ``None`` before the first update."""
+        if self._in_flight:
+            return next(iter(self._in_flight))
+        if self._fetched is not None:
+            return self._fetched + 1
+        return self._loaded
+
+    def started(self, update_id: int) -> None:
+        self._in_flight[update_id] = None
+        if self._fetched is None or update_id > self._fetched:
+            self._fetched = update_id
+
+    def finished(self, update_id: int) -> None:
+        self._in_flight.pop(update_id, None)
+
+    def skipped(self, update_id: int) -> None:
+        self.started(update_id)
+        self.finished(update_id)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._commit_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.commit()
+
+    async def commit(self) -> None:
+        offset = self.offset
+        if offset is None or offset == self._committed:
+            return
+        await asyncio.to_thread(self._write_file, offset)
+        self._committed = offset
+        self.commits += 1
+
+    async def _commit_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._commit_interval)
+            try:
+                await self.commit()
+            except OSError:
+                logger.exception("Failed to save the update offset")
+
+    def _read_file(self) -> Optional[int]:
+        try:
+            raw = json.loads(self._path.read_text(encoding="utf-8"))
+            offset, saved_at = int(raw["offset"]), int(raw["saved_at"])
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError, KeyError):
+            logger.warning("Ignoring malformed %s", self._path)
+            return None
+        if time.time() - saved_at > MAX_OFFSET_AGE:
+            logger.info("Ignoring %s: update IDs may have been reset since", self._path)
+            return None
+        return offset
+
+    def _write_file(self, offset: int) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self._path.with_name(self._path.name + ".tmp")
+        with temporary.open("w", encoding="utf-8") as f:
+            json.dump({"offset": offset, "saved_at": int(time.time())}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        temporary.replace(self._path)
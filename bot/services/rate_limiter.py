@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+
+class RateLimiter:
+    """Token bucket shared by concurrent senders.
+
+    ``acquire`` waits until a token is available, so any number of workers can
+    share one limiter without exceeding ``rate`` calls per second.
+    """
+
+    def __init__(self, rate: float, burst: int | None = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self._rate = rate
+        self._capacity = float(burst if burst is not None else max(1, int(rate)))
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._capacity, self._tokens + (now - self._updated) * self._rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+    def pause(self, seconds: float) -> None:
+        """Drain the bucket so that nobody sends for ``seconds`` (e.g. after a 429)."""
+        self._tokens = min(self._tokens, 0.0) - seconds * self._rate
+        self._updated = time.monotonic()
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from contextlib import nullcontext
+from pathlib import Path
+from typing import List, Optional
+
+from .file_lock import CatalogueLock
+from .menu_repository import ChangeListener, MenuDiff, MenuRepository
+from .storage import VideoStorage
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogueReloader:
+    """Applies external edits of ``menu.json`` and ``videos.json`` to the running bot."""
+
+    def __init__(
+        self,
+        menu_repo: MenuRepository,
+        storage: VideoStorage,
+        menu_path: Path,
+        videos_path: Path,
+        file_lock: Optional[CatalogueLock] = None,
+    ) -> None:
+        self._menu_repo = menu_repo
+        self._storage = storage
+        self._menu_path = menu_path
+        self._videos_path = videos_path
+        self._file_lock = file_lock if file_lock is not None else nullcontext()
+        self._lock = asyncio.Lock()
+        self._listeners: List[ChangeListener] = []
+
+    def add_listener(self, listener: ChangeListener) -> None:
+        """Register a coroutine called once per applied reload, with both stores updated."""
+        self._listeners.append(listener)
+
+    async def handle(self, path: Path) -> None:
+        if path not in (self._menu_path, self._videos_path):
+            return
+        try:
+            # Both files are re-read on either event, menu first, one event at a
+            # time: a videos reload against the old menu would drop renamed
+            # entries. The file lock keeps bot.cli from writing in between.
+            async with self._lock, self._file_lock:
+                change = await self._reload()
+                # Still under the lock: a listener sees both files applied.
+                if change:
+                    for listener in self._listeners:
+                        await listener(change)
+        except ValueError:
+            # Half-written or invalid JSON: keep the current state, the next
+            # change event will trigger another attempt.
+            logger.warning("Ignoring invalid content in %s", path, exc_info=True)
+
+    async def _reload(self) -> str:
+        diff = await self._menu_repo.reload()
+        menu = await self._menu_repo.get_sections()
+        changed = await self._storage.reload(menu)
+        if diff:
+            # An edit of both files (bot.cli) has already moved the videos.
+            if changed is None:
+                await self._carry_renames(diff)
+            await self._storage.sync(menu)
+            logger.info(
+                "Menu reloaded: %s added, %s changed, %s removed",
+                len(diff.added),
+                len(diff.changed),
+                len(diff.removed),
+            )
+        if changed:
+            logger.info("Videos reloaded: %s section(s) changed", len(changed))
+        changes = []
+        if diff:
+            changes.append("Меню: изменен файл menu.json")
+        if changed:
+            changes.append("Видео: изменен файл videos.json")
+        return "; ".join(changes)
+
+    async def _carry_renames(self, diff: MenuDiff) -> None:
+        # Videos are keyed by names, so renames keep their file_id only if
+        # they are applied to the storage before it is synced with the menu.
+        for previous, section in diff.changed:
+            try:
+                if previous.name != section.name:
+                    await self._storage.rename_section(previous.name, section.name)
+                previous_modes = {mode.id: mode for mode in previous.modes}
+                for mode in section.modes:
+                    old_mode = previous_modes.get(mode.id)
+                    if old_mode is not None and old_mode.name != mode.name:
+                        await self._storage.rename_mode(section.name, old_mode.name, mode.name)
+            except ValueError:
+                logger.warning("Could not carry rename of section %s", section.id)
@@ -0,0 +1,78 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup, Message
+
+DEFAULT_MAX_ENTRIES = 10_000
+
+MessageKey = Tuple[int, int]
+
+
+class RenderCache:
+    """Remembers what each bot message currently shows.
+
+    Stores a hash of the text and inline keyboard per ``(chat_id, message_id)``
+    in a bounded LRU, so re-rendering an unchanged screen (double taps, "back"
+    to the menu that is already shown) skips the ``editMessageText`` call.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self._max_entries = max_entries
+        self._entries: OrderedDict[MessageKey, int] = OrderedDict()
+        self.edits_performed = 0
+        self.edits_saved = 0
+        self.not_modified_errors = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def remember(
+        self, message: Message, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None
+    ) -> None:
+        self._store((message.chat.id, message.message_id), self._fingerprint(text, reply_markup))
+
+    def forget(self, message: Message) -> None:
+        self._entries.pop((message.chat.id, message.message_id), None)
+
+    async def edit_text(
+        self,
+        message: Message,
+        text: str,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+    ) -> bool:
+        """Edit ``message`` unless it already shows ``text`` and ``reply_markup``.
+
+        Returns ``True`` when an edit was sent to Telegram.
+        """
+        key = (message.chat.id, message.message_id)
+        fingerprint = self._fingerprint(text, reply_markup)
+        if self._entries.get(key) == fingerprint:
+            self._entries.move_to_end(key)
+            self.edits_saved += 1
+            return False
+
+        try:
+            await message.edit_text(text, reply_markup=reply_markup)
+        except TelegramBadRequest as exc:
+            if "message is not modified" not in exc.message:
+                self._entries.pop(key, None)
+                raise
+            self.not_modified_errors += 1
+            self._store(key, fingerprint)
+            return False
+
+        self.edits_performed += 1
+        self._store(key, fingerprint)
+        return True
+
+    def _store(self, key: MessageKey, fingerprint: int) -> None:
+        self._entries[key] = fingerprint
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _fingerprint(text: str, reply_markup: Optional[InlineKeyboardMarkup]) -> int:
+        markup = reply_markup.model_dump_json(exclude_none=True) if reply_markup else ""
+        return hash((text, markup))
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import CallbackQuery
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+LATENCY_WINDOW = 256
+
+
+@dataclass(frozen=True)
+class LatencySummary:
+    count: int
+    avg_ms: float
+    p95_ms: float
+    max_ms: float
+
+
+class FeedbackLatency:
+    """Time from handler start to the first feedback the user sees, per handler."""
+
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        self._window = window
+        self._samples: Dict[str, deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._max: Dict[str, float] = {}
+
+    def observe(self, handler: str, seconds: float) -> None:
+        samples = self._samples.get(handler)
+        if samples is None:
+            samples = self._samples[handler] = deque(maxlen=self._window)
+        samples.append(seconds)
+        self._counts[handler] = self._counts.get(handler, 0) + 1
+        self._max[handler] = max(self._max.get(handler, 0.0), seconds)
+
+    def summary(self) -> Dict[str, LatencySummary]:
+        result = {}
+        for handler, samples in self._samples.items():
+            ordered = sorted(samples)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            result[handler] = LatencySummary(
+                count=self._counts[handler],
+                avg_ms=sum(ordered) / len(ordered) * 1000,
+                p95_ms=p95 * 1000,
+                max_ms=self._max[handler] * 1000,
+            )
+        return result
+
+
+class Response:
+    """Feedback for a single callback: answered at most once, as early as possible."""
+
+    def __init__(self, pipeline: "ResponsePipeline", handler: str, callback: CallbackQuery) -> None:
+        self._pipeline = pipeline
+        self._handler = handler
+        self._callback = callback
+        self._started = time.perf_counter()
+        self._ack: Optional[asyncio.Task] = None
+
+    def ack(self, text: Optional[str] = None, show_alert: bool = False) -> None:
+        """Start answering the callback without waiting for the API call."""
+        if self._ack is None:
+            # Tracked like other background work: its errors are logged even
+            # if the handler fails before ``finish``.
+            self._ack = self._pipeline.run_in_background(self._answer(text, show_alert))
+
+    async def finish(self) -> None:
+        """Wait for the answer; a failed answer is logged, not raised into the handler."""
+        self.ack()
+        await asyncio.wait([self._ack])
+
+    async def _answer(self, text: Optional[str], show_alert: bool) -> None:
+        try:
+            await self._callback.answer(text, show_alert=show_alert)
+        except TelegramAPIError as exc:
+            # Typically "query is too old": the work is done, only the spinner stays.
+            logger.warning("Failed to answer callback in %s: %s", self._handler, exc)
+            return
+        self._pipeline.latency.observe(self._handler, time.perf_counter() - self._started)
+
+
+class ResponsePipeline:
+    """Shared plumbing for fast user feedback.
+
+    Handlers acknowledge callbacks immediately through :class:`Response`, hand
+    slow work (local uploads) to tracked background tasks and coalesce
+    identical slow operations that are already in flight.
+    """
+
+    def __init__(self) -> None:
+        self.latency = FeedbackLatency()
+        self._tasks: set[asyncio.Task] = set()
+        self._shared: Dict[str, asyncio.Task] = {}
+
+    def begin(self, handler: str, callback: CallbackQuery) -> Response:
+        return Response(self, handler, callback)
+
+    def observe(self, handler: str, started: float) -> None:
+        self.latency.observe(handler, time.perf_counter() - started)
+
+    def run_in_background(self, coro: Awaitable[None]) -> asyncio.Task:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_background_done)
+        return task
+
+    async def shared(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """Run ``factory()`` once per ``key``; concurrent callers await the same result."""
+        task = self._shared.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._shared[key] = task
+            task.add_done_callback(lambda _: self._shared.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def drain(self) -> None:
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _on_background_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Background response task failed", exc_info=task.exception())
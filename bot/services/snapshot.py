@@ -0,0 +1,186 @@
+"""Checksummed binary snapshot of ``menu.json``.
+
+JSON stays the source of truth. A snapshot stores the SHA-1 of the JSON it was
+built from; when the JSON bytes still hash to it, the state is rebuilt from
+flat ``uint32`` tables and one UTF-8 string blob instead of parsing and
+validating JSON. Any mismatch (edited JSON, damaged or foreign file) makes the
+loader return ``None`` and the caller falls back to JSON and rewrites the
+snapshot.
+
+Layout, little-endian::
+
+    header   magic "VBSN", format version, kind, source SHA-1, payload CRC32, payload size
+    strings  count, byte length, NUL-separated utf-8 blob
+    sections (id, name, first mode, mode count) as uint32
+    modes    (id, name) as uint32 string indexes
+
+``videos.json`` has no snapshot: it is a plain mapping without validation,
+and the C JSON parser already loads it faster than a Python decoder could.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..config import MenuMode, MenuSection
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"VBSN"
+_VERSION = 1
+_KIND_MENU = 1
+_HEADER = struct.Struct("<4sHH20sIQ")
+_COUNT = struct.Struct("<I")
+
+# array("I") is native-endian and must be 4 bytes wide for the layout above.
+SUPPORTED = sys.byteorder == "little" and array("I").itemsize == 4
+
+
+def snapshot_path(source: Path) -> Path:
+    return source.with_name(source.name + ".snap")
+
+
+def load_menu(path: Path, source_sha1: bytes) -> Optional[List[MenuSection]]:
+    payload = _read(path, _KIND_MENU, source_sha1)
+    if payload is None:
+        return None
+    try:
+        strings, offset = _unpack_strings(payload, 0)
+        sections_table, offset = _unpack_table(payload, offset)
+        modes_table, _ = _unpack_table(payload, offset)
+        # The strings are interned already: ``_make`` skips the constructor.
+        modes = list(
+            map(
+                MenuMode._make,
+                zip(
+                    [strings[index] for index in modes_table[0::2]],
+                    [strings[index] for index in modes_table[1::2]],
+                ),
+            )
+        )
+        sections = []
+        for i in range(0, len(sections_table), 4):
+            section_id, name, first, count = sections_table[i : i + 4]
+            if first + count > len(modes):
+                raise ValueError("Section points past the mode table")
+            section_modes = tuple(modes[first : first + count])
+            sections.append(MenuSection(id=strings[section_id], name=strings[name], modes=section_modes))
+        return sections
+    except (IndexError, ValueError, struct.error, UnicodeDecodeError):
+        logger.warning("Ignoring malformed snapshot %s", path)
+        return None
+
+
+def save_menu(path: Path, source_sha1: bytes, sections: Sequence[MenuSection]) -> None:
+    strings = _StringTable()
+    sections_table = array("I")
+    modes_table = array("I")
+    for section in sections:
+        first = len(modes_table) // 2
+        sections_table.extend(
+            (strings.add(section.id), strings.add(section.name), first, len(section.modes))
+        )
+        for mode in section.modes:
+            modes_table.extend((strings.add(mode.id), strings.add(mode.name)))
+    packed = strings.pack()
+    if packed is not None:
+        payload = packed + _pack_table(sections_table) + _pack_table(modes_table)
+        _write(path, _KIND_MENU, source_sha1, payload)
+
+
+class _StringTable:
+    def __init__(self) -> None:
+        self._index: Dict[str, int] = {}
+        self._strings: List[str] = []
+
+    def add(self, value: str) -> int:
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self._strings)
+            self._strings.append(value)
+        return index
+
+    def pack(self) -> Optional[bytes]:
+        blob = "\0".join(self._strings).encode("utf-8")
+        if len(self._strings) > 1 and blob.count(b"\0") != len(self._strings) - 1:
+            # A NUL inside a string would break the split on load.
+            return None
+        return _COUNT.pack(len(self._strings)) + _COUNT.pack(len(blob)) + blob
+
+
+def _unpack_strings(payload: memoryview, offset: int) -> Tuple[List[str], int]:
+    (count,) = _COUNT.unpack_from(payload, offset)
+    (length,) = _COUNT.unpack_from(payload, offset + _COUNT.size)
+    offset += 2 * _COUNT.size
+    text = str(payload[offset : offset + length], "utf-8")
+    strings = text.split("\0") if count else []
+    if len(strings) != count:
+        raise ValueError("String table does not match its count")
+    # Identical strings are stored once, so interning them here is cheap.
+    return list(map(sys.intern, strings)), offset + length
+
+
+def _pack_table(table: array) -> bytes:
+    return _COUNT.pack(len(table)) + table.tobytes()
+
+
+def _unpack_table(payload: memoryview, offset: int) -> Tuple[array, int]:
+    (count,) = _COUNT.unpack_from(payload, offset)
+    offset += _COUNT.size
+    table = array("I")
+    table.frombytes(payload[offset : offset + 4 * count])
+    if len(table) != count:
+        raise ValueError("Truncated table")
+    return table, offset + 4 * count
+
+
+def _read(path: Path, kind: int, source_sha1: bytes) -> Optional[memoryview]:
+    if not SUPPORTED:
+        return None
+    try:
+        with path.open("rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                magic, version, stored_kind, stored_sha1, crc, length = _HEADER.unpack_from(mapped)
+                if (
+                    magic != _MAGIC
+                    or version != _VERSION
+                    or stored_kind != kind
+                    or stored_sha1 != source_sha1
+                    or length != size - _HEADER.size
+                ):
+                    return None
+                payload = mapped[_HEADER.size :]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        logger.warning("Cannot read snapshot %s", path)
+        return None
+    if zlib.crc32(payload) != crc:
+        logger.warning("Snapshot %s failed its checksum, rebuilding", path)
+        return None
+    return memoryview(payload)
+
+
+def _write(path: Path, kind: int, source_sha1: bytes, payload: bytes) -> None:
+    if not SUPPORTED:
+        return
+    header = _HEADER.pack(_MAGIC, _VERSION, kind, source_sha1, zlib.crc32(payload), len(payload))
+    temporary = path.with_name(path.name + ".tmp")
+    try:
+        with temporary.open("wb") as f:
+            f.write(header)
+            f.write(payload)
+        os.replace(temporary, path)
+    except OSError:
+        # The snapshot is only a cache: JSON is still written and authoritative.
+        logger.warning("Cannot write snapshot %s", path, exc_info=True)
+
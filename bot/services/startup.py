@@ -0,0 +1,43 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Iterator, List, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class StartupTimer:
+    """Collects how long each startup phase took; phases may overlap."""
+
+    def __init__(self) -> None:
+        self._started = time.perf_counter()
+        self._phases: List[Tuple[str, float]] = []
+
+    @property
+    def phases(self) -> List[Tuple[str, float]]:
+        return list(self._phases)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases.append((name, time.perf_counter() - started))
+
+    async def track(self, name: str, awaitable: Awaitable[T]) -> T:
+        with self.phase(name):
+            return await awaitable
+
+    def report(self) -> str:
+        parts = ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in self._phases)
+        return f"Startup finished in {self.elapsed * 1000:.1f} ms ({parts})"
+
+    def log_report(self) -> None:
+        logger.info(self.report())
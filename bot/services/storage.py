@@ -1,46 +1,181 @@
 import asyncio
+import hashlib
 import json
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict, Iterable, Optional
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 from ..config import MenuSection
+from . import tracing
+from .file_lock import CatalogueLock
+from .tracing import TracedLock
+
+ChangeListener = Callable[[str], Awaitable[None]]
+# A mode holds nothing, one video (the original format) or an ordered list of
+# videos. Each video is a Telegram file_id, an HTTP(S) URL or a local path.
+VideoValue = Union[None, str, List[str]]
+VideoSnapshot = Mapping[str, Mapping[str, VideoValue]]
 
 
 class VideoStorage:
-    def __init__(self, storage_path: Path) -> None:
+    def __init__(self, storage_path: Path, file_lock: Optional[CatalogueLock] = None) -> None:
         self._path = storage_path
-        self._data: Dict[str, Dict[str, Optional[str]]] = {}
-        self._lock = asyncio.Lock()
+        self._file_lock = file_lock if file_lock is not None else nullcontext()
+        self._data: Dict[str, Dict[str, VideoValue]] = {}
+        self._lock = TracedLock("video_storage.lock_wait")
+        self._fingerprint: Optional[str] = None
+        self._listeners: List[ChangeListener] = []
+        self._version = 0
 
     async def load(self, menu: Iterable[MenuSection]) -> None:
         async with self._lock:
-            if self._path.exists():
-                with self._path.open("r", encoding="utf-8") as f:
-                    raw: Dict[str, Dict[str, Optional[str]]] = json.load(f)
-                self._data = raw
+            loaded = await asyncio.to_thread(self._read_file)
+            self._version += 1
+            if loaded is not None:
+                self._data, self._fingerprint = loaded
             else:
-                self._path.parent.mkdir(parents=True, exist_ok=True)
                 self._data = self._make_default_data(menu)
                 await self._write_locked()
 
             if self._merge_with_defaults(menu):
                 await self._write_locked()
 
-    async def get_video(self, category: str, mode: str) -> Optional[str]:
+    async def reload(self, menu: Iterable[MenuSection]) -> Optional[set[str]]:
+        """Apply an external edit of the videos file; returns the changed sections.
+
+        Returns ``None`` when the file matches what the storage last loaded or
+        wrote itself. Only sections whose mapping differs are replaced.
+        Like ``sync`` and the rename helpers, which only the reloader uses,
+        it does not call the listeners; ``CatalogueReloader`` does.
+        """
+        loaded = await asyncio.to_thread(self._read_file)
+        if loaded is None:
+            return None
+        raw, fingerprint = loaded
+        async with self._lock:
+            if fingerprint == self._fingerprint:
+                return None
+            changed = {
+                name for name, modes in raw.items() if self._data.get(name) != modes
+            }
+            changed.update(name for name in self._data if name not in raw)
+            for name in changed:
+                if name in raw:
+                    self._data[name] = raw[name]
+                else:
+                    self._data.pop(name, None)
+            self._fingerprint = fingerprint
+            self._version += 1
+            if self._merge_with_defaults(menu):
+                await self._write_locked()
+            return changed
+
+    async def sync(self, menu: Iterable[MenuSection]) -> bool:
+        """Add and drop entries so the storage matches ``menu``."""
+        async with self._lock:
+            if not self._merge_with_defaults(menu):
+                return False
+            await self._write_locked()
+            return True
+
+    @property
+    def version(self) -> int:
+        """Bumped on every change of the mapping, for optimistic checks."""
+        return self._version
+
+    def add_listener(self, listener: ChangeListener) -> None:
+        """Register a coroutine called with a description after each mutation."""
+        self._listeners.append(listener)
+
+    def snapshot(self) -> VideoSnapshot:
+        """Current mapping; inner dicts are never mutated, so they can be shared."""
+        return dict(self._data)
+
+    # Used by ``Catalogue`` to commit the videos together with the menu; see
+    # ``MenuRepository`` for the protocol.
+
+    @property
+    def lock(self) -> TracedLock:
+        return self._lock
+
+    @property
+    def listeners(self) -> Tuple[ChangeListener, ...]:
+        return tuple(self._listeners)
+
+    def changed_on_disk(self) -> bool:
+        """Whether another process rewrote the file since it was last read or written."""
+        try:
+            with self._file_lock:
+                current = hashlib.sha1(self._path.read_bytes()).hexdigest()
+        except FileNotFoundError:
+            return False
+        return self._fingerprint is not None and current != self._fingerprint
+
+    def install(self, data: Dict[str, Dict[str, VideoValue]], content: bytes) -> None:
+        """Adopt a mapping already written with :meth:`write_file`; hold ``lock``."""
+        self._data = data
+        self._changed(content)
+
+    def _read_file(self) -> Optional[Tuple[Dict[str, Dict[str, VideoValue]], str]]:
+        try:
+            with self._file_lock:
+                content = self._path.read_bytes()
+        except FileNotFoundError:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            return None
+        return json.loads(content.decode("utf-8")), hashlib.sha1(content).hexdigest()
+
+    async def get_videos(self, category: str, mode: str) -> List[str]:
+        async with self._lock:
+            return _as_list(self._data.get(category, {}).get(mode))
+
+    async def set_videos(self, category: str, mode: str, videos: Sequence[str]) -> None:
         async with self._lock:
-            return self._data.get(category, {}).get(mode)
+            self._check_mode(category, mode)
+            value: VideoValue = None
+            if len(videos) == 1:
+                # A single video keeps the original one-string format.
+                value = videos[0]
+            elif videos:
+                value = list(videos)
+            self._data[category] = {**self._data[category], mode: value}
+            await self._write_locked(f"Видео: обновлено «{category} · {mode}» ({len(videos)} шт.)")
 
     async def set_video(self, category: str, mode: str, file_id: str) -> None:
+        await self.set_videos(category, mode, [file_id])
+
+    async def replace_videos(self, category: str, mode: str, replacements: Mapping[str, str]) -> bool:
+        """Swap entries (e.g. local paths for their uploaded file_ids), keeping the order."""
         async with self._lock:
-            if category not in self._data:
-                raise KeyError(f"Unknown category: {category}")
-            if mode not in self._data[category]:
-                raise KeyError(f"Unknown mode '{mode}' for category '{category}'")
+            self._check_mode(category, mode)
+            current = self._data[category][mode]
+            videos = _as_list(current)
+            if not any(video in replacements for video in videos):
+                return False
+            videos = [replacements.get(video, video) for video in videos]
+            value: VideoValue = videos if isinstance(current, list) else videos[0]
+            self._data[category] = {**self._data[category], mode: value}
+            await self._write_locked(f"Видео: обновлено «{category} · {mode}»")
+            return True
 
-            self._data[category][mode] = file_id
-            await self._write_locked()
+    def _check_mode(self, category: str, mode: str) -> None:
+        if category not in self._data:
+            raise KeyError(f"Unknown category: {category}")
+        if mode not in self._data[category]:
+            raise KeyError(f"Unknown mode '{mode}' for category '{category}'")
 
-    def _make_default_data(self, menu: Iterable[MenuSection]) -> Dict[str, Dict[str, Optional[str]]]:
+    def _make_default_data(self, menu: Iterable[MenuSection]) -> Dict[str, Dict[str, VideoValue]]:
         return {
             section.name: {mode.name: None for mode in section.modes}
             for section in menu
@@ -52,11 +187,11 @@ class VideoStorage:
         for category, modes in defaults.items():
             if category not in self._data:
                 changed = True
-            stored = self._data.setdefault(category, {})
-            for mode, default_value in modes.items():
-                if mode not in stored:
-                    stored[mode] = default_value
-                    changed = True
+            stored = self._data.get(category, {})
+            missing = {mode: value for mode, value in modes.items() if mode not in stored}
+            if missing or category not in self._data:
+                self._data[category] = {**stored, **missing}
+                changed = True
 
         # Drop obsolete categories/modes if menu changed
         to_remove = [category for category in self._data if category not in defaults]
@@ -65,20 +200,14 @@ class VideoStorage:
             changed = True
         for category, modes in list(self._data.items()):
             valid_modes = defaults[category]
-            obsolete_modes = [mode for mode in modes if mode not in valid_modes]
-            for mode in obsolete_modes:
-                modes.pop(mode, None)
+            if any(mode not in valid_modes for mode in modes):
+                self._data[category] = {
+                    mode: value for mode, value in modes.items() if mode in valid_modes
+                }
                 changed = True
 
         return changed
 
-    async def add_section(self, section: MenuSection) -> None:
-        async with self._lock:
-            self._data.setdefault(
-                section.name, {mode.name: None for mode in section.modes}
-            )
-            await self._write_locked()
-
     async def rename_section(self, old_name: str, new_name: str) -> None:
         async with self._lock:
             if old_name not in self._data:
@@ -88,19 +217,6 @@ class VideoStorage:
             self._data[new_name] = self._data.pop(old_name)
             await self._write_locked()
 
-    async def delete_section(self, section_name: str) -> None:
-        async with self._lock:
-            if section_name in self._data:
-                self._data.pop(section_name, None)
-                await self._write_locked()
-
-    async def add_mode(self, section_name: str, mode_name: str) -> None:
-        async with self._lock:
-            section = self._data.setdefault(section_name, {})
-            if mode_name not in section:
-                section[mode_name] = None
-                await self._write_locked()
-
     async def rename_mode(self, section_name: str, old_mode: str, new_mode: str) -> None:
         async with self._lock:
             section = self._data.get(section_name)
@@ -108,16 +224,37 @@ class VideoStorage:
                 return
             if new_mode in section and new_mode != old_mode:
                 raise ValueError("Target mode name already exists")
-            section[new_mode] = section.pop(old_mode)
+            renamed = {mode: value for mode, value in section.items() if mode != old_mode}
+            renamed[new_mode] = section[old_mode]
+            self._data[section_name] = renamed
             await self._write_locked()
 
-    async def delete_mode(self, section_name: str, mode_name: str) -> None:
-        async with self._lock:
-            section = self._data.get(section_name)
-            if section and mode_name in section:
-                section.pop(mode_name, None)
-                await self._write_locked()
+    async def _write_locked(self, change: Optional[str] = None) -> None:
+        content = self.encode(self._data)
+        self._changed(content)
+        with tracing.span("video_storage.write", bytes=len(content)):
+            await asyncio.to_thread(self.write_file, content)
+        if change is not None:
+            for listener in self._listeners:
+                await listener(change)
+
+    def write_file(self, content: bytes) -> None:
+        with self._file_lock:
+            self._path.write_bytes(content)
+
+    def _changed(self, content: bytes) -> None:
+        # Remember our own write so the file watcher does not reload it.
+        self._fingerprint = hashlib.sha1(content).hexdigest()
+        self._version += 1
+
+    @staticmethod
+    def encode(data: VideoSnapshot) -> bytes:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
 
-    async def _write_locked(self) -> None:
-        serialized = json.dumps(self._data, ensure_ascii=False, indent=2)
-        await asyncio.to_thread(self._path.write_text, serialized, encoding="utf-8")
+def _as_list(value: VideoValue) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return [video for video in value if isinstance(video, str) and video]
@@ -0,0 +1,302 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 5.0
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUPS = 3
+DEFAULT_MAX_PENDING = 1000
+SERVICE_NAME = "telegram-video-bot"
+
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+_current: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: str, attributes: Dict[str, Any]) -> None:
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        trace.spans.append(self)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+class Trace:
+    __slots__ = ("trace_id", "sampled", "spans")
+
+    def __init__(self, sampled: bool) -> None:
+        self.trace_id = os.urandom(16).hex()
+        self.sampled = sampled
+        self.spans: List[Span] = []
+
+
+class _NoopScope:
+    """Returned by :func:`span` outside a recorded trace."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NOOP = _NoopScope()
+
+
+class _SpanScope:
+    __slots__ = ("_parent", "_name", "_attributes", "_span", "_token")
+
+    def __init__(self, parent: Span, name: str, attributes: Dict[str, Any]) -> None:
+        self._parent = parent
+        self._name = name
+        self._attributes = attributes
+
+    def __enter__(self) -> Span:
+        self._span = Span(self._parent.trace, self._name, self._parent.span_id, self._attributes)
+        self._token = _current.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self._span.end_ns = time.time_ns()
+        if exc is not None and not isinstance(exc, asyncio.CancelledError):
+            self._span.error = f"{exc_type.__name__}: {exc}"
+        _current.reset(self._token)
+
+
+def span(name: str, **attributes: Any):
+    """Child span of the current one; a shared no-op when nothing is being traced."""
+    parent = _current.get()
+    if parent is None:
+        return _NOOP
+    return _SpanScope(parent, name, attributes)
+
+
+def set_attribute(key: str, value: Any) -> None:
+    current = _current.get()
+    if current is not None:
+        current.attributes[key] = value
+
+
+class TracedLock:
+    """``asyncio.Lock`` that records the time spent waiting for it as a span."""
+
+    __slots__ = ("_lock", "_name")
+
+    def __init__(self, name: str) -> None:
+        self._lock = asyncio.Lock()
+        self._name = name
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    async def __aenter__(self) -> None:
+        parent = _current.get()
+        if parent is None or not self._lock.locked():
+            await self._lock.acquire()
+            return
+        waited = Span(parent.trace, self._name, parent.span_id, {})
+        try:
+            await self._lock.acquire()
+        finally:
+            waited.end_ns = time.time_ns()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._lock.release()
+
+
+class Tracer:
+    """Per-update traces written to a rotating OTLP/JSON lines file.
+
+    A trace is recorded when it is head-sampled (``sample_rate``) or, if
+    ``slow_threshold`` is set, when the whole update took at least that many
+    seconds. With neither configured :meth:`trace` returns a no-op and the
+    :func:`span` calls across the code base reduce to one context variable
+    lookup.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        sample_rate: float = 0.0,
+        slow_threshold: Optional[float] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backups: int = DEFAULT_BACKUPS,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ) -> None:
+        self._path = path
+        self._sample_rate = sample_rate
+        self._slow_ns = int(slow_threshold * 1e9) if slow_threshold is not None else None
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        self._pending: List[Trace] = []
+        self._task: Optional[asyncio.Task] = None
+        self.exported = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._sample_rate > 0 or self._slow_ns is not None
+
+    def trace(self, name: str, **attributes: Any):
+        """Open the root span of a new trace in the current context."""
+        if not self.enabled:
+            return _NOOP
+        sampled = self._sample_rate >= 1 or random.random() < self._sample_rate
+        if not sampled and self._slow_ns is None:
+            return _NOOP
+        return _RootScope(self, Trace(sampled), name, attributes)
+
+    def start(self) -> None:
+        if self._task is None and self.enabled:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        traces, self._pending = self._pending, []
+        lines = "".join(json.dumps(_encode(trace), ensure_ascii=False) + "\n" for trace in traces)
+        await asyncio.to_thread(self._append, lines)
+        self.exported += len(traces)
+
+    def _finish(self, trace: Trace, root: Span) -> None:
+        keep = trace.sampled or (
+            self._slow_ns is not None and root.end_ns - root.start_ns >= self._slow_ns
+        )
+        if not keep:
+            return
+        if len(self._pending) >= self._max_pending:
+            self.dropped += 1
+            return
+        self._pending.append(trace)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                await self.flush()
+            except OSError:
+                logger.exception("Failed to write traces")
+
+    def _append(self, lines: str) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            size = self._path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if size and size + len(lines) > self._max_bytes:
+            self._rotate()
+        with self._path.open("a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def _rotate(self) -> None:
+        # traces.jsonl -> traces.jsonl.1 -> ... -> traces.jsonl.<backups>
+        if self._backups <= 0:
+            self._path.unlink(missing_ok=True)
+            return
+        for index in range(self._backups - 1, 0, -1):
+            source = self._path.with_name(f"{self._path.name}.{index}")
+            if source.exists():
+                os.replace(source, self._path.with_name(f"{self._path.name}.{index + 1}"))
+        os.replace(self._path, self._path.with_name(f"{self._path.name}.1"))
+
+
+class _RootScope:
+    __slots__ = ("_tracer", "_trace", "_name", "_attributes", "_span", "_token")
+
+    def __init__(self, tracer: Tracer, trace: Trace, name: str, attributes: Dict[str, Any]) -> None:
+        self._tracer = tracer
+        self._trace = trace
+        self._name = name
+        self._attributes = attributes
+
+    def __enter__(self) -> Span:
+        self._span = Span(self._trace, self._name, "", self._attributes)
+        self._token = _current.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self._span.end_ns = time.time_ns()
+        if exc is not None and not isinstance(exc, asyncio.CancelledError):
+            self._span.error = f"{exc_type.__name__}: {exc}"
+        _current.reset(self._token)
+        self._tracer._finish(self._trace, self._span)
+
+
+def _encode(trace: Trace) -> dict:
+    # OTLP/JSON ExportTraceServiceRequest, one per line.
+    spans = []
+    for item in trace.spans:
+        if not item.end_ns:
+            # Background work that outlived the update is not exported.
+            continue
+        encoded = {
+            "traceId": trace.trace_id,
+            "spanId": item.span_id,
+            "name": item.name,
+            "kind": 1,
+            "startTimeUnixNano": str(item.start_ns),
+            "endTimeUnixNano": str(item.end_ns),
+            "attributes": [_attribute(key, value) for key, value in item.attributes.items()],
+            "status": (
+                {"code": _STATUS_ERROR, "message": item.error}
+                if item.error
+                else {"code": _STATUS_OK}
+            ),
+        }
+        if item.parent_id:
+            encoded["parentSpanId"] = item.parent_id
+        spans.append(encoded)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{"scope": {"name": "bot"}, "spans": spans}],
+            }
+        ]
+    }
+
+
+def _attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
@@ -0,0 +1,186 @@
+import asyncio
+import struct
+from array import array
+from pathlib import Path
+from typing import Iterator, Optional
+
+_RECORD = struct.Struct("<bq")
+_OP_ADD = 1
+_OP_REMOVE = 0
+_EMPTY = 0
+_MIN_CAPACITY = 1024
+# Fibonacci hashing: ``hash()`` of an int is the int itself, so sequential or
+# evenly spaced chat IDs would fill neighbouring slots and make long probes.
+_FIBONACCI = 0x9E3779B97F4A7C15
+_WORD = (1 << 64) - 1
+COMPACT_MIN_RECORDS = 10_000
+
+
+class UserRegistry:
+    """Append-only registry of chat IDs that have pressed /start.
+
+    Chat IDs live in a flat ``array('q')`` and are indexed by an open-addressing
+    hash table stored in another array, so membership checks are O(1) and no
+    per-user Python objects are kept. Every change is appended to the journal
+    file as a fixed-size binary record; the journal is compacted on load and
+    whenever it grows past ``max(COMPACT_MIN_RECORDS, 2 * size)`` records.
+    Compaction keeps every known chat in its position (an add, plus a remove
+    for inactive ones), because broadcasts checkpoint their progress by position.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._ids = array("q")
+        self._active = bytearray()
+        self._slots = array("q", bytes(8 * _MIN_CAPACITY))
+        self._shift = 64 - _MIN_CAPACITY.bit_length() + 1
+        self._active_count = 0
+        self._journal_records = 0
+        self._lock = asyncio.Lock()
+
+    async def load(self) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._replay_journal)
+            if self._journal_records > self._compact_threshold():
+                await self._compact_locked()
+
+    def _replay_journal(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        if not self._path.exists():
+            self._path.touch()
+            return
+        content = self._path.read_bytes()
+        usable = len(content) - len(content) % _RECORD.size
+        for op, chat_id in _RECORD.iter_unpack(memoryview(content)[:usable]):
+            if op == _OP_ADD:
+                self._add_locked(chat_id)
+            else:
+                self._remove_locked(chat_id)
+        self._journal_records = usable // _RECORD.size
+
+    def __len__(self) -> int:
+        return self._active_count
+
+    def __contains__(self, chat_id: int) -> bool:
+        index = self._lookup(chat_id)
+        return index is not None and bool(self._active[index])
+
+    @property
+    def size(self) -> int:
+        """Number of positions in the registry, including removed users."""
+        return len(self._ids)
+
+    def chat_id_at(self, position: int) -> Optional[int]:
+        if position >= len(self._ids) or not self._active[position]:
+            return None
+        return self._ids[position]
+
+    def iter_from(self, position: int) -> Iterator[tuple[int, int]]:
+        """Yield ``(position, chat_id)`` for active users starting at ``position``."""
+        while position < len(self._ids):
+            if self._active[position]:
+                yield position, self._ids[position]
+            position += 1
+
+    async def add(self, chat_id: int) -> bool:
+        if chat_id in self:
+            return False
+        async with self._lock:
+            if not self._add_locked(chat_id):
+                return False
+            await self._append_locked(_OP_ADD, chat_id)
+            return True
+
+    async def remove(self, chat_id: int) -> bool:
+        if chat_id not in self:
+            return False
+        async with self._lock:
+            if not self._remove_locked(chat_id):
+                return False
+            await self._append_locked(_OP_REMOVE, chat_id)
+            return True
+
+    def _add_locked(self, chat_id: int) -> bool:
+        index = self._lookup(chat_id)
+        if index is not None:
+            if self._active[index]:
+                return False
+            self._active[index] = 1
+            self._active_count += 1
+            return True
+
+        if (len(self._ids) + 1) * 2 > len(self._slots):
+            self._rehash(len(self._slots) * 2)
+        self._ids.append(chat_id)
+        self._active.append(1)
+        self._active_count += 1
+        self._insert_slot(chat_id, len(self._ids) - 1)
+        return True
+
+    def _remove_locked(self, chat_id: int) -> bool:
+        index = self._lookup(chat_id)
+        if index is None or not self._active[index]:
+            return False
+        self._active[index] = 0
+        self._active_count -= 1
+        return True
+
+    def _home_slot(self, chat_id: int) -> int:
+        return ((chat_id * _FIBONACCI) & _WORD) >> self._shift
+
+    def _lookup(self, chat_id: int) -> Optional[int]:
+        mask = len(self._slots) - 1
+        slot = self._home_slot(chat_id)
+        while True:
+            stored = self._slots[slot]
+            if stored == _EMPTY:
+                return None
+            if self._ids[stored - 1] == chat_id:
+                return stored - 1
+            slot = (slot + 1) & mask
+
+    def _insert_slot(self, chat_id: int, index: int) -> None:
+        mask = len(self._slots) - 1
+        slot = self._home_slot(chat_id)
+        while self._slots[slot] != _EMPTY:
+            slot = (slot + 1) & mask
+        self._slots[slot] = index + 1
+
+    def _rehash(self, capacity: int) -> None:
+        self._slots = array("q", bytes(8 * capacity))
+        self._shift = 64 - capacity.bit_length() + 1
+        for index, chat_id in enumerate(self._ids):
+            self._insert_slot(chat_id, index)
+
+    async def _append_locked(self, op: int, chat_id: int) -> None:
+        record = _RECORD.pack(op, chat_id)
+        await asyncio.to_thread(self._append_record, record)
+        self._journal_records += 1
+        if self._journal_records > self._compact_threshold():
+            await self._compact_locked()
+
+    def _compact_threshold(self) -> int:
+        return max(COMPACT_MIN_RECORDS, 2 * len(self._ids))
+
+    async def _compact_locked(self) -> None:
+        # Writers wait for the lock, so the arrays do not change meanwhile.
+        self._journal_records = await asyncio.to_thread(self._compact_file)
+
+    def _compact_file(self) -> int:
+        records = bytearray()
+        for chat_id in self._ids:
+            records += _RECORD.pack(_OP_ADD, chat_id)
+        for index, chat_id in enumerate(self._ids):
+            if not self._active[index]:
+                records += _RECORD.pack(_OP_REMOVE, chat_id)
+        self._rewrite(bytes(records))
+        return len(records) // _RECORD.size
+
+    def _append_record(self, record: bytes) -> None:
+        with self._path.open("ab") as f:
+            f.write(record)
+
+    def _rewrite(self, content: bytes) -> None:
+        temporary = self._path.with_name(self._path.name + ".tmp")
+        temporary.write_bytes(content)
+        temporary.replace(self._path)
@@ -0,0 +1,204 @@
+"""Duration and size of every video the bot sends.
+
+Telegram clients only stream a video (start playing before the download ends)
+when it was sent with ``supports_streaming`` and its dimensions and duration
+are known up front. :class:`VideoMetadata` keeps them per ``file_id`` in
+``video_meta.json`` (``{"file_id": [duration, width, height]}``): they are
+taken from the ``Video`` Telegram returns for an admin upload or for the
+first send of a local file, and local files are probed before that upload
+with :func:`probe`.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from aiogram.types import Message, Video
+
+logger = logging.getLogger(__name__)
+
+# Largest ``moov`` box read into memory; it holds the sample tables and stays
+# well under this for hours of video.
+MAX_MOOV_SIZE = 64 * 1024 * 1024
+# Telegram uses a thumbnail only if it is a JPEG of at most 200 kB.
+MAX_THUMBNAIL_SIZE = 200 * 1024
+
+_BOX = struct.Struct(">I4s")
+_LARGE_SIZE = struct.Struct(">Q")
+_CONTAINERS = {b"trak", b"mdia", b"minf"}
+_SUFFIXES = {".mp4", ".m4v", ".mov"}
+
+
+@dataclass(frozen=True, slots=True)
+class VideoMeta:
+    duration: int
+    width: int
+    height: int
+    # A JPEG next to a local file; Telegram does not accept thumbnails by file_id.
+    thumbnail: Optional[Path] = None
+
+    @classmethod
+    def from_video(cls, video: Video) -> "VideoMeta":
+        return cls(duration=video.duration, width=video.width, height=video.height)
+
+
+class VideoMetadata:
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._entries: Dict[str, VideoMeta] = {}
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def load(self) -> None:
+        async with self._lock:
+            raw = await asyncio.to_thread(self._read_file)
+            entries = {}
+            for file_id, value in raw.items():
+                try:
+                    duration, width, height = map(int, value)
+                except (TypeError, ValueError):
+                    continue
+                entries[file_id] = VideoMeta(duration, width, height)
+            self._entries = entries
+
+    def get(self, file_id: str) -> Optional[VideoMeta]:
+        return self._entries.get(file_id)
+
+    def lookup(self, videos: Iterable[str]) -> List[Optional[VideoMeta]]:
+        return [self._entries.get(video) for video in videos]
+
+    async def remember(self, videos: Iterable[Video]) -> None:
+        """Store the metadata of ``videos``; the file is written once per call."""
+        async with self._lock:
+            changed = False
+            for video in videos:
+                meta = VideoMeta.from_video(video)
+                if self._entries.get(video.file_id) != meta:
+                    self._entries[video.file_id] = meta
+                    changed = True
+            if changed:
+                await self._write_locked()
+
+    async def remember_sent(self, messages: Sequence[Message]) -> None:
+        await self.remember(message.video for message in messages if message.video)
+
+    async def _write_locked(self) -> None:
+        content = json.dumps(
+            {
+                file_id: [meta.duration, meta.width, meta.height]
+                for file_id, meta in self._entries.items()
+            },
+            separators=(",", ":"),
+        )
+        await asyncio.to_thread(self._write_file, content)
+
+    def _read_file(self) -> dict:
+        try:
+            raw = json.loads(self._path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning("Ignoring malformed %s", self._path)
+            return {}
+        return raw if isinstance(raw, dict) else {}
+
+    def _write_file(self, content: str) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self._path.with_name(self._path.name + ".tmp")
+        temporary.write_text(content, encoding="utf-8")
+        temporary.replace(self._path)
+
+
+def probe(path: Path) -> Optional[VideoMeta]:
+    """Read duration and size from an MP4/MOV header; ``None`` for other files.
+
+    Blocking: call it from a worker thread.
+    """
+    if path.suffix.lower() not in _SUFFIXES:
+        return None
+    try:
+        with path.open("rb") as f:
+            moov = _read_box(f, b"moov", os.fstat(f.fileno()).st_size)
+        if moov is None:
+            return None
+        duration, width, height = _parse_moov(moov)
+    except (OSError, ValueError, struct.error) as exc:
+        logger.warning("Cannot probe video %s: %s", path, exc)
+        return None
+    if not width or not height:
+        return None
+    thumbnail = path.with_suffix(".jpg")
+    try:
+        if thumbnail.stat().st_size > MAX_THUMBNAIL_SIZE:
+            thumbnail = None
+    except OSError:
+        thumbnail = None
+    return VideoMeta(duration, width, height, thumbnail)
+
+
+def _read_box(f: BinaryIO, kind: bytes, end: int) -> Optional[bytes]:
+    position = 0
+    while position + _BOX.size <= end:
+        f.seek(position)
+        size, box = _BOX.unpack(f.read(_BOX.size))
+        header = _BOX.size
+        if size == 1:
+            (size,) = _LARGE_SIZE.unpack(f.read(_LARGE_SIZE.size))
+            header += _LARGE_SIZE.size
+        elif size == 0:
+            size = end - position
+        if size < header:
+            raise ValueError(f"Invalid {box!r} box size")
+        if box == kind:
+            if size > MAX_MOOV_SIZE:
+                raise ValueError(f"{box!r} box is too large")
+            return f.read(size - header)
+        position += size
+    return None
+
+
+def _iter_boxes(data: bytes, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    position = start
+    while position + _BOX.size <= end:
+        size, box = _BOX.unpack_from(data, position)
+        header = _BOX.size
+        if size == 1:
+            (size,) = _LARGE_SIZE.unpack_from(data, position + header)
+            header += _LARGE_SIZE.size
+        elif size == 0:
+            size = end - position
+        if size < header or position + size > end:
+            raise ValueError(f"Invalid {box!r} box size")
+        yield box, position + header, position + size
+        position += size
+
+
+def _parse_moov(moov: bytes) -> Tuple[int, int, int]:
+    duration = width = height = 0
+    pending = [(0, len(moov))]
+    while pending:
+        start, end = pending.pop()
+        for box, body, box_end in _iter_boxes(moov, start, end):
+            if box == b"mvhd":
+                version = moov[body]
+                if version == 1:
+                    timescale, length = struct.unpack_from(">IQ", moov, body + 20)
+                else:
+                    timescale, length = struct.unpack_from(">II", moov, body + 12)
+                if timescale and length != 0xFFFFFFFF:
+                    duration = round(length / timescale)
+            elif box == b"tkhd" and not width:
+                # Width and height are 16.16 fixed point at the end of the box;
+                # audio tracks have zeros there.
+                track_width, track_height = struct.unpack_from(">II", moov, box_end - 8)
+                width, height = track_width >> 16, track_height >> 16
+            elif box in _CONTAINERS:
+                pending.append((body, box_end))
+    return duration, width, height
@@ -0,0 +1,167 @@
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ChangeHandler = Callable[[Path], Awaitable[None]]
+
+DEFAULT_DEBOUNCE = 0.3
+DEFAULT_POLL_INTERVAL = 1.0
+
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_EVENT = struct.Struct("iIII")
+
+
+class FileWatcher:
+    """Calls ``handler(path)`` after one of ``paths`` changes on disk.
+
+    Uses inotify on Linux (watching parent directories, so atomic
+    rename-over writes are seen) and falls back to polling ``st_mtime_ns``.
+    Bursts of events are debounced, and handlers for one file never overlap.
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[Path],
+        handler: ChangeHandler,
+        debounce: float = DEFAULT_DEBOUNCE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ) -> None:
+        self._paths = {path.resolve(): path for path in paths}
+        self._handler = handler
+        self._debounce = debounce
+        self._poll_interval = poll_interval
+        self._pending: Dict[Path, asyncio.TimerHandle] = {}
+        self._running: Dict[Path, asyncio.Task] = {}
+        self._dirty: set[Path] = set()
+        self._fd: Optional[int] = None
+        self._watch_dirs: Dict[int, Path] = {}
+        self._poll_task: Optional[asyncio.Task] = None
+
+    @property
+    def backend(self) -> str:
+        if self._fd is not None:
+            return "inotify"
+        return "polling" if self._poll_task is not None else "stopped"
+
+    def start(self) -> None:
+        if self._fd is not None or self._poll_task is not None:
+            return
+        if not self._start_inotify():
+            self._poll_task = asyncio.create_task(self._poll())
+        logger.info("Watching %s via %s", ", ".join(map(str, self._paths)), self.backend)
+
+    async def stop(self) -> None:
+        for handle in self._pending.values():
+            handle.cancel()
+        self._pending.clear()
+        if self._fd is not None:
+            asyncio.get_running_loop().remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        if self._running:
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
+
+    def _start_inotify(self) -> bool:
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return False
+        if fd < 0:
+            return False
+
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        for directory in {path.parent for path in self._paths}:
+            wd = libc.inotify_add_watch(fd, os.fsencode(directory), mask)
+            if wd < 0:
+                os.close(fd)
+                self._watch_dirs.clear()
+                return False
+            self._watch_dirs[wd] = directory
+
+        self._fd = fd
+        asyncio.get_running_loop().add_reader(fd, self._on_inotify)
+        return True
+
+    def _on_inotify(self) -> None:
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _IN_EVENT.size <= len(buffer):
+            wd, _, _, length = _IN_EVENT.unpack_from(buffer, offset)
+            offset += _IN_EVENT.size
+            name = buffer[offset : offset + length].rstrip(b"\0")
+            offset += length
+            directory = self._watch_dirs.get(wd)
+            if directory is None or not name:
+                continue
+            changed = (directory / os.fsdecode(name)).resolve()
+            if changed in self._paths:
+                self._schedule(changed)
+
+    async def _poll(self) -> None:
+        signatures = {path: self._signature(path) for path in self._paths}
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            current = await asyncio.to_thread(
+                lambda: {path: self._signature(path) for path in self._paths}
+            )
+            for path, signature in current.items():
+                if signature != signatures.get(path):
+                    signatures[path] = signature
+                    self._schedule(path)
+
+    @staticmethod
+    def _signature(path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _schedule(self, path: Path) -> None:
+        handle = self._pending.pop(path, None)
+        if handle is not None:
+            handle.cancel()
+        loop = asyncio.get_running_loop()
+        self._pending[path] = loop.call_later(self._debounce, self._fire, path)
+
+    def _fire(self, path: Path) -> None:
+        self._pending.pop(path, None)
+        if path in self._running:
+            # Re-run once the current handler finishes.
+            self._dirty.add(path)
+            return
+        task = asyncio.create_task(self._handler(self._paths[path]))
+        self._running[path] = task
+        task.add_done_callback(lambda done: self._on_handled(path, done))
+
+    def _on_handled(self, path: Path, task: asyncio.Task) -> None:
+        self._running.pop(path, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Reload of %s failed", path, exc_info=task.exception())
+        if path in self._dirty:
+            self._dirty.discard(path)
+            self._fire(path)
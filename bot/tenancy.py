@@ -0,0 +1,39 @@
+from dataclasses import dataclass
+
+from aiogram import Bot
+
+from .config import Config
+from .services.analytics import Analytics
+from .services.broadcast import Broadcaster
+from .services.catalogue import Catalogue
+from .services.drip import DripScheduler
+from .services.file_lock import CatalogueLock
+from .services.history import MenuHistory
+from .services.menu_repository import MenuRepository
+from .services.offsets import UpdateOffset
+from .services.render_cache import RenderCache
+from .services.response import ResponsePipeline
+from .services.storage import VideoStorage
+from .services.users import UserRegistry
+from .services.video_meta import VideoMetadata
+
+
+@dataclass
+class Tenant:
+    """One bot token together with the repositories and services it owns."""
+
+    config: Config
+    bot: Bot
+    menu_repo: MenuRepository
+    storage: VideoStorage
+    metadata: VideoMetadata
+    catalogue: Catalogue
+    file_lock: CatalogueLock
+    users: UserRegistry
+    analytics: Analytics
+    history: MenuHistory
+    broadcaster: Broadcaster
+    drip: DripScheduler
+    offset: UpdateOffset
+    render_cache: RenderCache
+    pipeline: ResponsePipeline
@@ -1,37 +1,239 @@
 import asyncio
+import importlib
 import logging
+from typing import Optional, Sequence
 
-from aiogram import Bot, Dispatcher
+from aiogram import Bot
 from aiogram.enums import ParseMode
 
 from bot import (
+    Analytics,
+    Broadcaster,
+    Catalogue,
+    CatalogueLock,
+    CatalogueReloader,
+    Config,
+    DripScheduler,
+    ExecutorSettings,
+    FileWatcher,
+    LoopMonitor,
+    MenuHistory,
     MenuRepository,
+    OrderedDispatcher,
+    PooledSession,
+    RenderCache,
+    ResponsePipeline,
+    StartupTimer,
+    Tracer,
+    Tenant,
+    UpdateExecutor,
+    UpdateOffset,
+    UserRegistry,
+    VideoMetadata,
     VideoStorage,
-    create_admin_router,
-    create_user_router,
     load_config,
+    load_executor_settings,
+    load_http_settings,
+    load_monitor_settings,
+    load_tracing_settings,
 )
 
 
+async def load_tenant(config: Config, bot: Bot, timer: StartupTimer) -> Tenant:
+    file_lock = CatalogueLock(config.lock_path)
+
+    async def load_catalogue() -> Catalogue:
+        menu_repo = MenuRepository(config.menu_path, file_lock)
+        storage = VideoStorage(config.videos_path, file_lock)
+        catalogue = Catalogue(
+            menu_repo, storage, config.menu_path, config.videos_path, config.journal_path
+        )
+        await catalogue.recover()
+        await timer.track(f"{config.name}.menu", menu_repo.load())
+        initial_menu = await menu_repo.get_sections()
+        await timer.track(f"{config.name}.videos", storage.load(initial_menu))
+        return catalogue
+
+    users = UserRegistry(config.users_path)
+    analytics = Analytics(config.analytics_path)
+    metadata = VideoMetadata(config.video_meta_path)
+    offset = UpdateOffset(config.offset_path)
+    catalogue, _, _, _, _ = await asyncio.gather(
+        load_catalogue(),
+        timer.track(f"{config.name}.users", users.load()),
+        timer.track(f"{config.name}.analytics", analytics.load()),
+        timer.track(f"{config.name}.video_meta", metadata.load()),
+        timer.track(f"{config.name}.offset", offset.load()),
+    )
+    menu_repo, storage = catalogue.menu_repo, catalogue.storage
+    history = MenuHistory(config.history_path, catalogue)
+    drip = DripScheduler(bot, menu_repo, storage, metadata, config.drip_path)
+    await asyncio.gather(
+        timer.track(f"{config.name}.history", history.load()),
+        timer.track(f"{config.name}.drip", drip.load()),
+    )
+    return Tenant(
+        config=config,
+        bot=bot,
+        menu_repo=menu_repo,
+        storage=storage,
+        metadata=metadata,
+        catalogue=catalogue,
+        file_lock=file_lock,
+        users=users,
+        analytics=analytics,
+        history=history,
+        broadcaster=Broadcaster(bot, users, config.broadcast_path),
+        drip=drip,
+        offset=offset,
+        render_cache=RenderCache(),
+        pipeline=ResponsePipeline(),
+    )
+
+
+def build_dispatcher(
+    tenants: Sequence[Tenant],
+    tracer: Optional[Tracer] = None,
+    monitor: Optional[LoopMonitor] = None,
+    executor: Optional[UpdateExecutor] = None,
+    settings: ExecutorSettings = ExecutorSettings(),
+) -> OrderedDispatcher:
+    from bot.handlers import create_tenant_router
+    from bot.middlewares import ThrottlingMiddleware, TracingMiddleware
+    from bot.services.profiler import SamplingProfiler
+
+    dp = OrderedDispatcher(
+        executor or UpdateExecutor(settings.concurrency, settings.queue_limit),
+        settings.drain_timeout,
+        offsets={tenant.bot.id: tenant.offset for tenant in tenants},
+        callback_ttl=settings.callback_ttl,
+    )
+    profiler = SamplingProfiler()
+    if tracer is not None and tracer.enabled:
+        dp.update.outer_middleware(TracingMiddleware(tracer))
+    dp.callback_query.outer_middleware(ThrottlingMiddleware())
+    for tenant in tenants:
+        dp.include_router(create_tenant_router(tenant, profiler, monitor, dp.executor))
+    return dp
+
+
 async def main() -> None:
     logging.basicConfig(level=logging.INFO)
+    timer = StartupTimer()
 
-    config = load_config()
-    bot = Bot(token=config.bot_token, parse_mode=ParseMode.HTML)
+    with timer.phase("config"):
+        configs = load_config()
+        tracing_settings = load_tracing_settings()
+        tracer = Tracer(
+            tracing_settings.path,
+            sample_rate=tracing_settings.sample_rate,
+            slow_threshold=tracing_settings.slow_threshold,
+            max_bytes=tracing_settings.max_bytes,
+            backups=tracing_settings.backups,
+        )
+        monitor_settings = load_monitor_settings()
+        monitor = LoopMonitor(
+            interval=monitor_settings.interval,
+            threshold=monitor_settings.threshold,
+            debug=monitor_settings.debug,
+        )
+        # Started before the data files are read so that slow startup I/O is caught too.
+        monitor.start()
+        executor_settings = load_executor_settings()
+        executor = UpdateExecutor(executor_settings.concurrency, executor_settings.queue_limit)
+        # All bots share one HTTP session and its connection pools.
+        session = PooledSession(load_http_settings())
+        bots = [
+            Bot(token=config.bot_token, session=session, parse_mode=ParseMode.HTML)
+            for config in configs
+        ]
 
-    menu_repo = MenuRepository(config.menu_path)
-    await menu_repo.load()
+    # Handlers and their callback models are imported in a worker thread
+    # while the data files are being read.
+    *tenants, _ = await asyncio.gather(
+        *(load_tenant(config, bot, timer) for config, bot in zip(configs, bots)),
+        timer.track(
+            "import_handlers",
+            asyncio.to_thread(importlib.import_module, "bot.handlers"),
+        ),
+    )
 
-    initial_menu = await menu_repo.get_sections()
-    storage = VideoStorage(config.videos_path)
-    await storage.load(initial_menu)
+    with timer.phase("routers"):
+        dp = build_dispatcher(tenants, tracer, monitor, executor, executor_settings)
 
-    dp = Dispatcher()
-    dp.include_router(create_user_router(menu_repo, storage))
-    dp.include_router(create_admin_router(config.admin_ids, menu_repo, storage))
+    # Updates sent while the bot was down are kept: polling resumes from the saved offset.
+    await timer.track(
+        "delete_webhook", asyncio.gather(*(bot.delete_webhook() for bot in bots))
+    )
+    timer.log_report()
 
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    watchers = []
+    for tenant in tenants:
+        reloader = CatalogueReloader(
+            tenant.menu_repo,
+            tenant.storage,
+            tenant.config.menu_path,
+            tenant.config.videos_path,
+            tenant.file_lock,
+        )
+        reloader.add_listener(tenant.history.record)
+        watcher = FileWatcher(
+            [tenant.config.menu_path, tenant.config.videos_path], reloader.handle
+        )
+        watchers.append(watcher)
+        await tenant.broadcaster.resume()
+        tenant.analytics.start()
+        tenant.drip.start()
+        tenant.offset.start()
+        watcher.start()
+    tracer.start()
+    try:
+        # Updates are awaited into the executor, which blocks polling while it is full.
+        # The shared session stays open until background uploads and broadcasts finish.
+        await dp.start_polling(*bots, handle_as_tasks=False, close_bot_session=False)
+    finally:
+        for watcher, tenant in zip(watchers, tenants):
+            await watcher.stop()
+            await tenant.pipeline.drain()
+            await tenant.offset.stop()
+            await tenant.broadcaster.stop()
+            await tenant.drip.stop()
+            await tenant.analytics.stop()
+        await tracer.stop()
+        await monitor.stop()
+        lag = monitor.summary()
+        if lag is not None:
+            logging.info(
+                "Event loop lag: avg %.1f ms, p95 %.1f ms, max %.1f ms, %d stalls",
+                lag.avg_ms,
+                lag.p95_ms,
+                lag.max_ms,
+                lag.stalls,
+            )
+        updates = executor.stats()
+        logging.info(
+            "Updates: %d processed, %d failed, peak %d queued, avg wait %.1f ms, "
+            "max wait %.1f ms, polling held back %d times",
+            updates.processed,
+            updates.failed,
+            updates.peak_pending,
+            updates.avg_wait_ms,
+            updates.max_wait_ms,
+            updates.throttled,
+        )
+        for pool, stats in session.stats.items():
+            logging.info(
+                "HTTP pool %s: %d requests, %d errors, avg %.1f ms, peak %d in flight, "
+                "%d connections opened, %d reused",
+                pool,
+                stats.requests,
+                stats.errors,
+                stats.avg_ms,
+                stats.peak_in_flight,
+                stats.connections_created,
+                stats.connections_reused,
+            )
+        await session.close()
 
 
 if __name__ == "__main__":
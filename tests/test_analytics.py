@@ -0,0 +1,30 @@
+"""``Analytics`` flushes and runtime compaction."""
+
+import asyncio
+from pathlib import Path
+
+from bot.services import analytics
+from bot.services.analytics import MODE_OPEN, VIDEO_SENT, Analytics
+
+
+def test_flushes_are_compacted_while_running(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(analytics, "COMPACT_MIN_LINES", 10)
+    path = tmp_path / "analytics.jsonl"
+
+    async def scenario() -> None:
+        counters = Analytics(path)
+        await counters.load()
+        for _ in range(25):
+            counters.record(VIDEO_SENT, "s1", "m1")
+            counters.record(MODE_OPEN, "s1", "m2")
+            await counters.flush()
+            # Each flush appends a line for the current bucket; compaction
+            # folds them back before the file passes the threshold.
+            assert len(path.read_text(encoding="utf-8").splitlines()) <= 11
+
+        reloaded = Analytics(path)
+        await reloaded.load()
+        assert reloaded.total(VIDEO_SENT) == 25
+        assert reloaded.top(MODE_OPEN) == [("s1", "m2", 25)]
+
+    asyncio.run(scenario())
@@ -0,0 +1,138 @@
+"""``Catalogue`` commits: version conflicts, the redo journal and recovery."""
+
+import asyncio
+import json
+from pathlib import Path
+from typing import Tuple
+
+import pytest
+
+from bot.services.catalogue import Catalogue, CatalogueConflict
+from bot.services.file_lock import CatalogueLock
+from bot.services.menu_repository import MenuRepository
+from bot.services.storage import VideoStorage
+
+MENU = [{"id": "s1", "name": "Шея", "modes": [{"id": "m1", "name": "Лёгкий"}]}]
+VIDEOS = {"Шея": {"Лёгкий": "file-1"}}
+
+
+def _prepare(data_dir: Path) -> None:
+    (data_dir / "menu.json").write_text(json.dumps(MENU, ensure_ascii=False), encoding="utf-8")
+    (data_dir / "videos.json").write_text(json.dumps(VIDEOS, ensure_ascii=False), encoding="utf-8")
+
+
+async def _open(data_dir: Path) -> Tuple[Catalogue, bool]:
+    lock = CatalogueLock(data_dir / "catalogue.lock")
+    menu_repo = MenuRepository(data_dir / "menu.json", lock)
+    storage = VideoStorage(data_dir / "videos.json", lock)
+    catalogue = Catalogue(
+        menu_repo,
+        storage,
+        data_dir / "menu.json",
+        data_dir / "videos.json",
+        data_dir / "catalogue.journal",
+    )
+    recovered = await catalogue.recover()
+    await menu_repo.load()
+    await storage.load(await menu_repo.get_sections())
+    return catalogue, recovered
+
+
+def test_concurrent_units_of_work_conflict(tmp_path: Path) -> None:
+    _prepare(tmp_path)
+
+    async def scenario() -> None:
+        catalogue, _ = await _open(tmp_path)
+        first, second = catalogue.begin(), catalogue.begin()
+        first.rename_section("s1", "Плечи")
+        second.add_section("Спина")
+        await first.commit()
+        with pytest.raises(CatalogueConflict):
+            await second.commit()
+        assert [section.name for section in catalogue.menu_repo.snapshot()] == ["Плечи"]
+        assert catalogue.storage.snapshot() == {"Плечи": {"Лёгкий": "file-1"}}
+        assert (catalogue.commits, catalogue.conflicts) == (1, 1)
+
+    asyncio.run(scenario())
+
+
+def test_file_changed_by_another_process_conflicts(tmp_path: Path) -> None:
+    _prepare(tmp_path)
+
+    async def scenario() -> None:
+        catalogue, _ = await _open(tmp_path)
+        (tmp_path / "videos.json").write_text('{"Шея": {"Лёгкий": "file-2"}}', encoding="utf-8")
+        work = catalogue.begin()
+        work.rename_section("s1", "Плечи")
+        with pytest.raises(CatalogueConflict):
+            await work.commit()
+        assert json.loads((tmp_path / "menu.json").read_text(encoding="utf-8")) == MENU
+
+    asyncio.run(scenario())
+
+
+def test_interrupted_commit_is_finished_on_recovery(tmp_path: Path, monkeypatch) -> None:
+    _prepare(tmp_path)
+
+    async def crash() -> None:
+        catalogue, _ = await _open(tmp_path)
+
+        def fail(content: bytes) -> None:
+            raise OSError("disk unplugged")
+
+        # The journal and menu.json are written, videos.json is not.
+        monkeypatch.setattr(catalogue.storage, "write_file", fail)
+        work = catalogue.begin()
+        work.rename_section("s1", "Плечи")
+        with pytest.raises(OSError):
+            await work.commit()
+
+    asyncio.run(crash())
+    assert (tmp_path / "catalogue.journal").exists()
+    monkeypatch.undo()
+
+    async def restart() -> None:
+        catalogue, recovered = await _open(tmp_path)
+        assert recovered
+        assert not (tmp_path / "catalogue.journal").exists()
+        assert [section.name for section in catalogue.menu_repo.snapshot()] == ["Плечи"]
+        assert catalogue.storage.snapshot() == {"Плечи": {"Лёгкий": "file-1"}}
+
+    asyncio.run(restart())
+
+
+def test_torn_journal_is_discarded(tmp_path: Path) -> None:
+    _prepare(tmp_path)
+
+    async def scenario() -> None:
+        catalogue, _ = await _open(tmp_path)
+        catalogue._write_journal(b'[{"id": "s2", "name": "X", "modes": []}]', b'{"X": {}}')
+        journal = tmp_path / "catalogue.journal"
+        journal.write_bytes(journal.read_bytes()[:-3])
+
+        catalogue, recovered = await _open(tmp_path)
+        assert not recovered
+        assert not journal.exists()
+        assert [section.name for section in catalogue.menu_repo.snapshot()] == ["Шея"]
+
+    asyncio.run(scenario())
+
+
+def test_single_file_edit_skips_the_journal(tmp_path: Path, monkeypatch) -> None:
+    _prepare(tmp_path)
+
+    async def scenario() -> None:
+        catalogue, _ = await _open(tmp_path)
+        menu_before = (tmp_path / "menu.json").read_bytes()
+
+        def fail(*args) -> None:
+            raise AssertionError("journal written for a one-file edit")
+
+        monkeypatch.setattr(catalogue, "_write_journal", fail)
+        work = catalogue.begin()
+        work.set_videos("s1", "m1", ["file-2", "file-3"])
+        await work.commit()
+        assert await catalogue.storage.get_videos("Шея", "Лёгкий") == ["file-2", "file-3"]
+        assert (tmp_path / "menu.json").read_bytes() == menu_before
+
+    asyncio.run(scenario())
@@ -0,0 +1,41 @@
+"""``python -m bot.cli``: local video paths round-trip to the bot."""
+
+import asyncio
+import json
+from pathlib import Path
+
+from bot import cli
+from bot.config import BASE_DIR
+from bot.handlers import user
+from bot.services.menu_repository import MenuRepository
+from bot.services.storage import VideoStorage
+
+VIDEO = BASE_DIR / "videos" / "щадящий режим.mp4"
+
+
+def _stored_videos(data_dir: Path):
+    async def load():
+        menu_repo = MenuRepository(data_dir / "menu.json")
+        storage = VideoStorage(data_dir / "videos.json")
+        await menu_repo.load()
+        await storage.load(await menu_repo.get_sections())
+        return await storage.get_videos("Шея", "Щадящий режим")
+
+    return asyncio.run(load())
+
+
+def test_attached_local_video_is_found_by_the_bot(tmp_path: Path, monkeypatch) -> None:
+    # Run from elsewhere: the path must not depend on the working directory.
+    monkeypatch.chdir(tmp_path)
+    data = ["--data", str(tmp_path / "data")]
+    assert cli.main([*data, "add-section", "Шея"]) == 0
+    assert cli.main([*data, "add-mode", "Шея", "Щадящий режим"]) == 0
+    relative = VIDEO.relative_to(BASE_DIR).as_posix()
+    assert cli.main([*data, "attach", "Шея/Щадящий режим", relative, str(VIDEO)]) == 0
+
+    videos = _stored_videos(tmp_path / "data")
+    assert videos == [relative, relative]
+    stored = json.loads((tmp_path / "data" / "videos.json").read_text(encoding="utf-8"))
+    assert stored == {"Шея": {"Щадящий режим": [relative, relative]}}
+    # The same base directory the handler resolves against.
+    assert user._local_video_paths(videos, user.BASE_DIR) == [VIDEO, VIDEO]
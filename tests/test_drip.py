@@ -0,0 +1,134 @@
+"""``DripScheduler``: due-time order, retries after a failed send, restarts."""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from aiogram.exceptions import TelegramNetworkError
+
+from bot.services.drip import DripScheduler
+from bot.services.menu_repository import MenuRepository
+from bot.services.storage import VideoStorage
+from bot.services.video_meta import VideoMetadata
+
+MENU = [
+    {
+        "id": "s1",
+        "name": "Шея",
+        "modes": [{"id": "m1", "name": "Лёгкий"}, {"id": "m2", "name": "Растяжка"}],
+    }
+]
+VIDEOS = {"Шея": {"Лёгкий": "file-1", "Растяжка": "file-2"}}
+
+
+class FakeBot:
+    """Records sent videos; the first ``failures`` sends raise a network error."""
+
+    def __init__(self, failures: int = 0) -> None:
+        self.failures = failures
+        self.videos: List[Tuple[int, str]] = []
+        self.messages: List[Tuple[int, str]] = []
+
+    async def send_video(self, chat_id: int, video: str, **kwargs) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise TelegramNetworkError(None, "connection reset")
+        self.videos.append((chat_id, video))
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        self.messages.append((chat_id, text))
+
+
+async def _open(data_dir: Path, bot=None) -> DripScheduler:
+    menu_path, videos_path = data_dir / "menu.json", data_dir / "videos.json"
+    if not menu_path.exists():
+        menu_path.write_text(json.dumps(MENU, ensure_ascii=False), encoding="utf-8")
+        videos_path.write_text(json.dumps(VIDEOS, ensure_ascii=False), encoding="utf-8")
+    menu_repo = MenuRepository(menu_path)
+    storage = VideoStorage(videos_path)
+    await menu_repo.load()
+    await storage.load(await menu_repo.get_sections())
+    metadata = VideoMetadata(data_dir / "video_meta.json")
+    scheduler = DripScheduler(bot, menu_repo, storage, metadata, data_dir / "drip.jsonl", rate=1000)
+    await scheduler.load()
+    return scheduler
+
+
+def test_due_subscriptions_pop_in_due_order(tmp_path: Path) -> None:
+    now = int(time.time())
+    records = [[101, "s1", 0, now - 10], [102, "s1", 0, now - 30], [103, "s1", 0, now + 3600]]
+    records.append([104, "s1", 0, now - 20])
+    lines = [json.dumps(record) for record in records]
+    (tmp_path / "drip.jsonl").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    async def scenario() -> None:
+        scheduler = await _open(tmp_path)
+        batch = scheduler._pop_due(now)
+        assert [scheduler._chat[slot] for slot, _ in batch] == [102, 104, 101]
+        assert [due for _, due in batch] == [now - 30, now - 20, now - 10]
+        # Not yet due, and nothing is popped twice.
+        assert scheduler._pop_due(now) == []
+        assert [scheduler._chat[slot] for slot, _ in scheduler._pop_due(now + 3600)] == [103]
+
+    asyncio.run(scenario())
+
+
+def test_failed_send_is_retried_with_the_same_mode(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        bot = FakeBot(failures=1)
+        scheduler = await _open(tmp_path, bot)
+        await scheduler.subscribe(7, "s1")
+
+        [(slot, due)] = scheduler._pop_due(2**31)
+        await scheduler._deliver_safely(slot, due)
+        assert bot.videos == [] and scheduler.failed == 1
+        assert scheduler._step[slot] == 0
+        assert scheduler._due[slot] == scheduler.next_delivery(due)
+
+        [(slot, due)] = scheduler._pop_due(2**31)
+        await scheduler._deliver_safely(slot, due)
+        assert bot.videos == [(7, "file-1")] and scheduler.sent == 1
+        assert scheduler._step[slot] == 1
+
+        [(slot, due)] = scheduler._pop_due(2**31)
+        await scheduler._deliver_safely(slot, due)
+        assert bot.videos == [(7, "file-1"), (7, "file-2")]
+        # The last mode finishes the programme and ends the subscription.
+        assert len(bot.messages) == 1 and scheduler.finished == 1
+        assert not scheduler.is_subscribed(7, "s1")
+        await scheduler.flush()
+
+    asyncio.run(scenario())
+
+
+def test_subscriptions_survive_a_restart(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        bot = FakeBot()
+        scheduler = await _open(tmp_path, bot)
+        first_due = await scheduler.subscribe(7, "s1")
+        await scheduler.subscribe(8, "s1")
+        await scheduler.subscribe(9, "s1")
+        await scheduler.unsubscribe(9, "s1")
+
+        # Chat 8 is popped too but the bot stops before its send: it stays due.
+        [(slot, due), _] = scheduler._pop_due(2**31)
+        assert scheduler._chat[slot] == 7
+        await scheduler._deliver_safely(slot, due)
+        await scheduler.stop()
+
+        restarted = await _open(tmp_path, bot)
+        assert len(restarted) == 2
+        assert restarted.is_subscribed(7, "s1") and restarted.is_subscribed(8, "s1")
+        assert not restarted.is_subscribed(9, "s1")
+        steps = {
+            restarted._chat[slot]: (restarted._step[slot], restarted._due[slot])
+            for slot in restarted._slots.values()
+        }
+        assert steps[7] == (1, restarted.next_delivery(first_due))
+        assert steps[8] == (0, first_due)
+        # Loading compacts the journal down to one line per subscription.
+        assert len((tmp_path / "drip.jsonl").read_text(encoding="utf-8").splitlines()) == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,92 @@
+"""``UpdateExecutor`` ordering and queue bound; ``OrderedDispatcher`` catch-up."""
+
+import asyncio
+from pathlib import Path
+from typing import List, Optional
+
+from aiogram.types import Update
+from aiogram.utils.backoff import BackoffConfig
+
+from bot.services.executor import OrderedDispatcher, UpdateExecutor
+from bot.services.offsets import UpdateOffset
+
+
+def test_queue_never_exceeds_limit() -> None:
+    async def scenario() -> None:
+        executor = UpdateExecutor(concurrency=1, queue_limit=2)
+        gate = asyncio.Semaphore(0)
+        done: List[int] = []
+
+        def job(number: int):
+            async def run() -> None:
+                await gate.acquire()
+                done.append(number)
+
+            return run
+
+        submitters = [
+            asyncio.create_task(executor.submit(number % 3, job(number))) for number in range(12)
+        ]
+        for _ in range(12):
+            await asyncio.sleep(0)
+            assert executor.stats().pending <= executor.queue_limit
+            gate.release()
+            for _ in range(5):
+                await asyncio.sleep(0)
+                assert executor.stats().pending <= executor.queue_limit
+        await asyncio.gather(*submitters)
+        assert await executor.drain(timeout=1)
+        stats = executor.stats()
+        assert stats.peak_pending <= executor.queue_limit
+        assert stats.processed == 12
+        # Jobs of one key keep their submission order.
+        for key in range(3):
+            assert [n for n in done if n % 3 == key] == list(range(key, 12, 3))
+
+    asyncio.run(scenario())
+
+
+class _FlakyBot:
+    """Serves updates 10..14 in batches of two and fails the second request."""
+
+    id = 1
+
+    def __init__(self) -> None:
+        self.offsets: List[Optional[int]] = []
+
+    async def get_updates(self, offset: Optional[int] = None, **kwargs) -> List[Update]:
+        self.offsets.append(offset)
+        if len(self.offsets) == 2:
+            raise ConnectionError("connection reset")
+        start = max(offset or 0, 10)
+        return [
+            Update.model_validate(
+                {
+                    "update_id": update_id,
+                    "message": {
+                        "message_id": update_id,
+                        "date": 0,
+                        "chat": {"id": 1, "type": "private"},
+                        "text": "hi",
+                    },
+                }
+            )
+            for update_id in range(start, min(start + 2, 15))
+        ]
+
+
+def test_catch_up_resumes_after_a_failed_request(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        bot = _FlakyBot()
+        offset = UpdateOffset(tmp_path / "offset.json")
+        dispatcher = OrderedDispatcher(UpdateExecutor(), offsets={bot.id: offset})
+        backoff = BackoffConfig(min_delay=0.01, max_delay=0.02, factor=1.5, jitter=0.0)
+        fed = [
+            update.update_id
+            async for update in dispatcher._catch_up(bot, offset, backoff, None)  # type: ignore[arg-type]
+        ]
+        assert fed == [10, 11, 12, 13, 14]
+        # The retry confirms the first batch; the final empty request confirms the rest.
+        assert bot.offsets == [None, 12, 12, 14, 15]
+
+    asyncio.run(scenario())
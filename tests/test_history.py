@@ -0,0 +1,84 @@
+"""``MenuHistory`` versions around reloads, rollback and file compaction."""
+
+import asyncio
+import json
+from pathlib import Path
+
+from bot.services.catalogue import Catalogue
+from bot.services.history import MenuHistory
+from bot.services.menu_repository import MenuRepository
+from bot.services.reload import CatalogueReloader
+from bot.services.storage import VideoStorage
+
+MENU = [{"id": "s1", "name": "Шея", "modes": [{"id": "m1", "name": "Лёгкий"}]}]
+
+
+async def _open(data_dir: Path, limit: int = 200):
+    menu_path, videos_path = data_dir / "menu.json", data_dir / "videos.json"
+    menu_repo = MenuRepository(menu_path)
+    storage = VideoStorage(videos_path)
+    journal_path = data_dir / "catalogue.journal"
+    catalogue = Catalogue(menu_repo, storage, menu_path, videos_path, journal_path)
+    await menu_repo.load()
+    await storage.load(await menu_repo.get_sections())
+    history = MenuHistory(data_dir / "history.jsonl", catalogue, limit=limit)
+    await history.load()
+    reloader = CatalogueReloader(menu_repo, storage, menu_path, videos_path)
+    reloader.add_listener(history.record)
+    return catalogue, history, reloader
+
+
+def _consistent(version) -> bool:
+    """Videos are keyed by exactly the section and mode names of the menu."""
+    names = {section.name: {mode.name for mode in section.modes} for section in version.sections}
+    return names == {name: set(modes) for name, modes in version.videos.items()}
+
+
+def test_reload_records_one_consistent_version(tmp_path: Path) -> None:
+    (tmp_path / "menu.json").write_text(json.dumps(MENU, ensure_ascii=False), encoding="utf-8")
+    (tmp_path / "videos.json").write_text('{"Шея": {"Лёгкий": "file-1"}}', encoding="utf-8")
+
+    async def scenario() -> None:
+        catalogue, history, reloader = await _open(tmp_path)
+        assert [version.number for version in history.recent()] == [1]
+
+        modes = [{"id": "m1", "name": "Мягкий"}]
+        renamed = json.dumps([{"id": "s1", "name": "Плечи", "modes": modes}], ensure_ascii=False)
+        (tmp_path / "menu.json").write_text(renamed, encoding="utf-8")
+        await reloader.handle(tmp_path / "menu.json")
+
+        latest, loaded = history.recent(2)
+        assert (latest.number, latest.change) == (2, "Меню: изменен файл menu.json")
+        assert all(_consistent(version) for version in history.recent())
+        assert latest.videos == {"Плечи": {"Мягкий": "file-1"}}
+
+        await history.rollback(loaded.number)
+        assert catalogue.storage.snapshot() == {"Шея": {"Лёгкий": "file-1"}}
+        assert [section.name for section in catalogue.menu_repo.snapshot()] == ["Шея"]
+        assert history.recent(1)[0].change == "Откат к версии #1"
+
+    asyncio.run(scenario())
+
+
+def test_history_file_is_compacted_while_running(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        catalogue, history, _ = await _open(tmp_path, limit=3)
+        work = catalogue.begin()
+        section = work.add_section("Шея")
+        await work.commit()
+        for number in range(10):
+            work = catalogue.begin()
+            work.rename_section(section.id, f"Шея {number}")
+            await work.commit()
+            lines = (tmp_path / "history.jsonl").read_text(encoding="utf-8").splitlines()
+            assert len(lines) <= 6
+
+        _, reloaded, _ = await _open(tmp_path, limit=3)
+        assert [version.change for version in reloaded.recent()] == [
+            "Меню: раздел «Шея 8» → «Шея 9»",
+            "Меню: раздел «Шея 7» → «Шея 8»",
+            "Меню: раздел «Шея 6» → «Шея 7»",
+        ]
+        assert reloaded.recent(1)[0].sections[0].name == "Шея 9"
+
+    asyncio.run(scenario())
@@ -0,0 +1,114 @@
+"""``PooledSession`` against a stand-in Bot API server in ``--local`` mode."""
+
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+from aiohttp import web
+from aiogram import Bot
+from aiogram.types import InputMediaVideo
+
+from bot.config import HttpSettings
+from bot.services.delivery import local_source
+from bot.services.http_session import CONTROL, UPLOAD, PooledSession
+
+TOKEN = "123456:TEST"
+
+
+def _message(chat_id: int, **fields: Any) -> Dict[str, Any]:
+    return {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": chat_id, "type": "private"},
+        **fields,
+    }
+
+
+async def _start_stub(requests: List[Dict[str, Any]]) -> web.AppRunner:
+    async def handle(request: web.Request) -> web.Response:
+        fields: Dict[str, Any] = {}
+        if request.content_type.startswith("multipart/"):
+            async for part in await request.multipart():
+                fields[part.name] = (
+                    ("file", part.filename) if part.filename else await part.text()
+                )
+        else:
+            fields.update(await request.post())
+        method = request.match_info["method"]
+        requests.append({"method": method, **fields})
+        chat_id = int(fields["chat_id"])
+        video = {
+            "file_id": "VIDEO",
+            "file_unique_id": "V",
+            "width": 1,
+            "height": 1,
+            "duration": 1,
+        }
+        if method == "sendVideo":
+            result = _message(chat_id, video=video)
+        elif method == "sendMediaGroup":
+            result = [_message(chat_id, video=video) for _ in json.loads(fields["media"])]
+        else:
+            result = _message(chat_id, text=fields.get("text", ""))
+        return web.json_response({"ok": True, "result": result})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+
+async def _send_local_video(tmp_path: Path, api_local: bool, album: bool = False) -> tuple:
+    video = tmp_path / "warmup.mp4"
+    video.write_bytes(b"\0" * 1024)
+    requests: List[Dict[str, Any]] = []
+    runner = await _start_stub(requests)
+    port = runner.addresses[0][1]
+    session = PooledSession(
+        HttpSettings(api_url=f"http://127.0.0.1:{port}", api_local=api_local)
+    )
+    bot = Bot(TOKEN, session=session)
+    try:
+        await bot.send_message(42, "hello")
+        if album:
+            media = [InputMediaVideo(media=local_source(session.api, video)) for _ in range(2)]
+            await bot.send_media_group(42, media=media)
+        else:
+            await bot.send_video(42, video=local_source(session.api, video))
+    finally:
+        await session.close()
+        await runner.cleanup()
+    return video, requests, session.stats
+
+
+def test_local_mode_sends_file_paths_through_the_upload_pool(tmp_path: Path) -> None:
+    video, requests, stats = asyncio.run(_send_local_video(tmp_path, api_local=True))
+
+    send_video = next(request for request in requests if request["method"] == "sendVideo")
+    assert send_video["video"] == video.resolve().as_uri()
+    assert send_video["video"].startswith("file://")
+    assert stats[UPLOAD].requests == 1
+    assert stats[CONTROL].requests == 1
+
+
+def test_remote_mode_uploads_file_contents(tmp_path: Path) -> None:
+    video, requests, stats = asyncio.run(_send_local_video(tmp_path, api_local=False))
+
+    send_video = next(request for request in requests if request["method"] == "sendVideo")
+    assert send_video["video"].startswith("attach://")
+    assert any(value == ("file", video.name) for value in send_video.values())
+    assert stats[UPLOAD].requests == 1
+    assert stats[CONTROL].requests == 1
+
+
+def test_local_mode_sends_albums_through_the_upload_pool(tmp_path: Path) -> None:
+    video, requests, stats = asyncio.run(_send_local_video(tmp_path, api_local=True, album=True))
+
+    album = next(request for request in requests if request["method"] == "sendMediaGroup")
+    media = json.loads(album["media"])
+    assert [entry["media"] for entry in media] == [video.resolve().as_uri()] * 2
+    assert stats[UPLOAD].requests == 1
+    assert stats[CONTROL].requests == 1
@@ -0,0 +1,67 @@
+"""Hot reload of ``menu.json`` and ``videos.json`` edited outside the bot."""
+
+import asyncio
+import json
+from pathlib import Path
+from typing import Callable
+
+from bot.services.file_lock import CatalogueLock
+from bot.services.menu_repository import MenuRepository
+from bot.services.reload import CatalogueReloader
+from bot.services.storage import VideoStorage
+from bot.services.watcher import FileWatcher
+
+MENU = [{"id": "s1", "name": "Шея", "modes": [{"id": "m1", "name": "Лёгкий"}]}]
+
+
+async def _until(condition: Callable[[], bool], timeout: float = 5.0) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "reload did not happen"
+        await asyncio.sleep(0.02)
+
+
+def _write_json(path: Path, data) -> None:
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def test_external_edits_are_reloaded(tmp_path: Path) -> None:
+    menu_path, videos_path = tmp_path / "menu.json", tmp_path / "videos.json"
+    _write_json(menu_path, MENU)
+    _write_json(videos_path, {"Шея": {"Лёгкий": "file-1"}})
+
+    async def scenario() -> None:
+        lock = CatalogueLock(tmp_path / "catalogue.lock")
+        menu_repo = MenuRepository(menu_path, lock)
+        storage = VideoStorage(videos_path, lock)
+        await menu_repo.load()
+        await storage.load(await menu_repo.get_sections())
+        reloader = CatalogueReloader(menu_repo, storage, menu_path, videos_path, lock)
+        watcher = FileWatcher(
+            [menu_path, videos_path], reloader.handle, debounce=0.05, poll_interval=0.05
+        )
+        watcher.start()
+        try:
+            # A hand edit that renames the section and the mode by their IDs:
+            # the video follows the rename instead of being dropped.
+            modes = [{"id": "m1", "name": "Мягкий"}]
+            _write_json(menu_path, [{"id": "s1", "name": "Шейный отдел", "modes": modes}])
+            await _until(lambda: "Шейный отдел" in storage.snapshot())
+            assert storage.snapshot() == {"Шейный отдел": {"Мягкий": "file-1"}}
+            section = await menu_repo.get_section("s1")
+            assert section is not None and section.modes[0].name == "Мягкий"
+
+            _write_json(videos_path, {"Шейный отдел": {"Мягкий": ["file-2", "file-3"]}})
+            await _until(lambda: storage.snapshot()["Шейный отдел"]["Мягкий"] != "file-1")
+            assert await storage.get_videos("Шейный отдел", "Мягкий") == ["file-2", "file-3"]
+
+            # Invalid JSON is ignored and the last good state stays.
+            menu_path.write_text("[{", encoding="utf-8")
+            await reloader.handle(menu_path)
+            assert [section.name for section in menu_repo.snapshot()] == ["Шейный отдел"]
+        finally:
+            await watcher.stop()
+            lock.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,88 @@
+"""Binary menu snapshot: round trip and fallback to ``menu.json``."""
+
+import asyncio
+import hashlib
+import json
+from pathlib import Path
+
+import pytest
+
+from bot.config import MenuMode, MenuSection
+from bot.services import snapshot
+from bot.services.menu_repository import MenuRepository
+
+pytestmark = pytest.mark.skipif(
+    not snapshot.SUPPORTED, reason="snapshots need little-endian uint32"
+)
+
+SECTIONS = [
+    MenuSection(
+        id="s1",
+        name="Шея",
+        modes=(MenuMode("m1", "Щадящий режим"), MenuMode("m2", "Растяжка")),
+    ),
+    MenuSection(id="s2", name="Спина", modes=(MenuMode("m3", "Щадящий режим"),)),
+    MenuSection(id="s3", name="Пустой"),
+]
+
+
+def test_round_trip(tmp_path: Path) -> None:
+    path = tmp_path / "menu.json.snap"
+    digest = hashlib.sha1(b"menu").digest()
+    snapshot.save_menu(path, digest, SECTIONS)
+    loaded = snapshot.load_menu(path, digest)
+    assert loaded == SECTIONS
+    # Repeated names come back as one object.
+    assert loaded[0].modes[0].name is loaded[1].modes[0].name
+
+
+def test_bad_checksum_is_rejected(tmp_path: Path) -> None:
+    path = tmp_path / "menu.json.snap"
+    digest = hashlib.sha1(b"menu").digest()
+    snapshot.save_menu(path, digest, SECTIONS)
+    content = bytearray(path.read_bytes())
+    content[-1] ^= 0xFF
+    path.write_bytes(bytes(content))
+    assert snapshot.load_menu(path, digest) is None
+
+
+def test_stale_source_hash_is_rejected(tmp_path: Path) -> None:
+    path = tmp_path / "menu.json.snap"
+    snapshot.save_menu(path, hashlib.sha1(b"old menu").digest(), SECTIONS)
+    assert snapshot.load_menu(path, hashlib.sha1(b"new menu").digest()) is None
+
+
+def _load(menu_path: Path):
+    async def load():
+        repo = MenuRepository(menu_path)
+        await repo.load()
+        return await repo.get_sections()
+
+    return asyncio.run(load())
+
+
+def test_repository_falls_back_to_json(tmp_path: Path) -> None:
+    menu_path = tmp_path / "menu.json"
+    snap_path = snapshot.snapshot_path(menu_path)
+    menu = [{"id": "s1", "name": "Шея", "modes": [{"id": "m1", "name": "Растяжка"}]}]
+    menu_path.write_text(json.dumps(menu, ensure_ascii=False), encoding="utf-8")
+    assert [section.name for section in _load(menu_path)] == ["Шея"]
+    assert snap_path.exists()
+
+    # Stale: menu.json edited by hand, the snapshot still describes the old file.
+    menu[0]["name"] = "Плечи"
+    menu_path.write_text(json.dumps(menu, ensure_ascii=False), encoding="utf-8")
+    assert [section.name for section in _load(menu_path)] == ["Плечи"]
+    digest = hashlib.sha1(menu_path.read_bytes()).digest()
+    assert snapshot.load_menu(snap_path, digest) is not None
+
+    # Corrupt: same source, damaged payload. JSON is parsed and the snapshot rebuilt.
+    content = bytearray(snap_path.read_bytes())
+    content[-1] ^= 0xFF
+    snap_path.write_bytes(bytes(content))
+    assert snapshot.load_menu(snap_path, digest) is None
+    sections = _load(menu_path)
+    assert [(section.name, [mode.name for mode in section.modes]) for section in sections] == [
+        ("Плечи", ["Растяжка"])
+    ]
+    assert snapshot.load_menu(snap_path, digest) == sections
@@ -0,0 +1,46 @@
+"""Two tenants in one dispatcher: each one handles only its own bot's updates."""
+
+import asyncio
+from pathlib import Path
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Update
+
+from benchmarks.mock_bot_api import MockBotAPI
+from bot.config import config_for_data_dir
+from bot.services.startup import StartupTimer
+from main import build_dispatcher, load_tenant
+
+
+def test_tenant_handlers_ignore_other_bots(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        api = MockBotAPI()
+        url = await api.start()
+        session = AiohttpSession(api=TelegramAPIServer.from_base(url))
+        timer = StartupTimer()
+        tenants = []
+        for name, token in (("a", "1001:TOKEN-A"), ("b", "1002:TOKEN-B")):
+            config = config_for_data_dir(name, token, {7}, tmp_path / name)
+            tenants.append(await load_tenant(config, Bot(token, session=session), timer))
+        first, second = tenants
+        dispatcher = build_dispatcher(tenants)
+        try:
+            for tenant, chat_id in ((first, 100), (second, 200)):
+                update = Update.model_validate(
+                    {"update_id": chat_id, **api.message_update(chat_id, "/start")}
+                )
+                reply = api.wait_reply(chat_id)
+                await dispatcher.feed_update(tenant.bot, update)
+                await asyncio.wait_for(reply, 5)
+            assert await dispatcher.executor.drain(5)
+
+            assert 100 in first.users and 100 not in second.users
+            assert 200 in second.users and 200 not in first.users
+            assert len(first.users) == len(second.users) == 1
+        finally:
+            await session.close()
+            await api.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,62 @@
+"""``UserRegistry`` probing table and journal compaction."""
+
+import asyncio
+from pathlib import Path
+
+from bot.services import users
+from bot.services.users import UserRegistry
+
+
+def _longest_probe(registry: UserRegistry) -> int:
+    mask = len(registry._slots) - 1
+    longest = 0
+    for slot, stored in enumerate(registry._slots):
+        if stored:
+            home = registry._home_slot(registry._ids[stored - 1])
+            longest = max(longest, (slot - home) & mask)
+    return longest
+
+
+def test_spaced_ids_do_not_cluster(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        registry = UserRegistry(tmp_path / "users.bin")
+        await registry.load()
+        # Multiples of the table size all hit slot 0 under identity hashing.
+        ids = [n << 20 for n in range(1, 3001)] + [-100_000_000_000 - n for n in range(3000)]
+        for chat_id in ids:
+            assert await registry.add(chat_id)
+        assert len(registry) == len(ids)
+        assert all(chat_id in registry for chat_id in ids)
+        assert (1 << 20) + 1 not in registry
+        assert _longest_probe(registry) < 64
+
+    asyncio.run(scenario())
+
+
+def test_compaction_keeps_positions(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(users, "COMPACT_MIN_RECORDS", 50)
+    path = tmp_path / "users.bin"
+
+    async def scenario() -> None:
+        registry = UserRegistry(path)
+        await registry.load()
+        for chat_id in range(1, 21):
+            await registry.add(chat_id)
+        for _ in range(10):
+            for chat_id in range(1, 11):
+                await registry.remove(chat_id)
+                await registry.add(chat_id)
+        await registry.remove(5)
+        # 20 adds and one remove survive compaction, instead of 241 records.
+        assert path.stat().st_size < 50 * users._RECORD.size
+
+        reloaded = UserRegistry(path)
+        await reloaded.load()
+        assert len(reloaded) == 19
+        assert 5 not in reloaded
+        assert [reloaded.chat_id_at(position) for position in range(20)] == [
+            registry.chat_id_at(position) for position in range(20)
+        ]
+        assert reloaded.chat_id_at(4) is None and reloaded.chat_id_at(5) == 6
+
+    asyncio.run(scenario())